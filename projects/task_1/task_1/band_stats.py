@@ -0,0 +1,150 @@
+import numpy as np
+
+
+def update_stats(existing_mean, existing_var, count, new_data):
+    """
+    Incrementally updates the mean and variance based on new data.
+
+    The whole batch is folded into the running statistics in one vectorized step:
+    the batch mean and sum of squared deviations (M2) are computed with NumPy and then
+    combined with the existing values using the parallel formula of Chan et al.
+    The result is the same as feeding every element through Welford's method one by one.
+
+    Args:
+        existing_mean (float): Current mean value.
+        existing_var (float): Current sum of squared deviations (M2).
+        count (int): Current count of observations.
+        new_data (np.ndarray): New batch of data points.
+
+    Returns:
+        tuple: Updated mean, sum of squared deviations (M2), and count.
+    """
+    # Nothing to fold in, keep the running statistics unchanged
+    new_count = int(np.size(new_data))
+    if new_count == 0:
+        return existing_mean, existing_var, count
+
+    # Statistics of the new batch, computed in float64 to avoid overflow of integer bands
+    new_data = np.asarray(new_data, dtype=np.float64)
+    new_mean = float(new_data.mean())
+    new_var = float(np.square(new_data - new_mean).sum())
+
+    return merge_stats(existing_mean, existing_var, count, new_mean, new_var, new_count)
+
+
+def merge_stats(mean_a, var_a, count_a, mean_b, var_b, count_b):
+    """
+    Merges two partial results of mean and sum of squared deviations (M2) exactly,
+    using the parallel formula of Chan et al.
+
+    Partial results can come from different batches, files, workers or runs; the order
+    of merging does not change the result (up to floating-point rounding).
+
+    Args:
+        mean_a (float): Mean of the first partial result.
+        var_a (float): Sum of squared deviations (M2) of the first partial result.
+        count_a (int): Count of observations of the first partial result.
+        mean_b (float): Mean of the second partial result.
+        var_b (float): Sum of squared deviations (M2) of the second partial result.
+        count_b (int): Count of observations of the second partial result.
+
+    Returns:
+        tuple: Merged mean, sum of squared deviations (M2), and count.
+    """
+    # One side is empty, the other one is the result
+    if count_a == 0:
+        return mean_b, var_b, count_b
+    if count_b == 0:
+        return mean_a, var_a, count_a
+
+    count = count_a + count_b
+    delta = mean_b - mean_a
+    mean = mean_a + delta * count_b / count
+    var = var_a + var_b + delta * delta * count_a * count_b / count
+    return mean, var, count
+
+
+# Number of bins of a band histogram, one bin for each uint16 value
+HISTOGRAM_BINS = 65536
+
+
+def update_histogram(histogram, new_data):
+    """
+    Adds a batch of uint16 data points to an integer histogram with one bin per value.
+
+    Histograms are exactly mergeable: the histogram of several batches is the sum of
+    their histograms, independent of the order.
+
+    The counts of the batch are added to the histogram in place, only for the bins up to the
+    largest value of the batch, so no histogram of all HISTOGRAM_BINS bins is allocated per batch.
+
+    Args:
+        histogram (np.ndarray): Current histogram (HISTOGRAM_BINS int64 counts), updated in place,
+            or None to start a new one.
+        new_data (np.ndarray): New batch of uint16 data points.
+
+    Returns:
+        np.ndarray: Updated histogram.
+    """
+    # Ensure the data fits into the bins of the histogram
+    assert np.issubdtype(new_data.dtype, np.unsignedinteger) and new_data.dtype.itemsize <= 2, f"Data type {new_data.dtype} is not supported, uint16 is expected."
+
+    if histogram is None:
+        histogram = np.zeros(HISTOGRAM_BINS, dtype=np.int64)
+
+    # Counts of the values 0 ... max(new_data)
+    new_counts = np.bincount(new_data.ravel())
+    histogram[:len(new_counts)] += new_counts
+    return histogram
+
+
+def histogram_stats(histogram, percentiles=(2, 98)):
+    """
+    Derives exact statistics of the data points from their histogram.
+
+    The standard deviation is the sample standard deviation (like in milestone01_task_1_4_2),
+    the median and the percentiles are interpolated linearly between the closest data points
+    (like np.percentile).
+
+    Args:
+        histogram (np.ndarray): Histogram with one bin per value.
+        percentiles (tuple): Percentiles (0-100) to derive.
+
+    Returns:
+        dict: count, mean, std-dev, min, max, median and percentiles (dict percentile -> value).
+            All statistics are 0 if the histogram is empty.
+    """
+    values = np.arange(histogram.size, dtype=np.float64)
+    count = int(histogram.sum())
+
+    # Default values if there are no data points
+    if count == 0:
+        return {"count": 0, "mean": 0, "std-dev": 0, "min": 0, "max": 0, "median": 0, "percentiles": {p: 0 for p in percentiles}}
+
+    mean = float(np.dot(values, histogram)) / count
+    var = float(np.dot(np.square(values - mean), histogram))
+    std_dev = np.sqrt(var / (count - 1)) if count > 1 else 0.0
+
+    # Value at each rank, found by a binary search in the cumulative histogram
+    cumulative = np.cumsum(histogram)
+
+    def value_at_rank(rank):
+        return int(np.searchsorted(cumulative, rank, side="right"))
+
+    def percentile(p):
+        position = p / 100 * (count - 1)
+        lower = int(np.floor(position))
+        value_lower = value_at_rank(lower)
+        value_upper = value_at_rank(min(lower + 1, count - 1))
+        return value_lower + (value_upper - value_lower) * (position - lower)
+
+    nonzero = np.flatnonzero(histogram)
+    return {
+        "count": count,
+        "mean": mean,
+        "std-dev": std_dev,
+        "min": int(nonzero[0]),
+        "max": int(nonzero[-1]),
+        "median": percentile(50),
+        "percentiles": {p: percentile(p) for p in percentiles},
+    }
@@ -0,0 +1,23 @@
+# List of Sentinel-2 bands of a BigEarthNet patch
+BANDS = ["B01", "B02", "B03", "B04", "B05", "B06", "B07", "B08", "B8A", "B09", "B11", "B12"]
+
+# Expected resolutions for each band (in pixels)
+EXPECTED_RESOLUTIONS = {
+    "B02": (120, 120), "B03": (120, 120), "B04": (120, 120), "B08": (120, 120),
+    "B05": (60, 60), "B06": (60, 60), "B07": (60, 60), "B8A": (60, 60), "B11": (60, 60), "B12": (60, 60),
+    "B01": (20, 20), "B09": (20, 20),
+}
+
+
+def get_band(filename: str) -> str:
+    """
+    Extract the band name from the filename of a patch band, e.g.
+    "S2B_MSIL2A_20170808T094029_N9999_R036_T35ULA_33_29_B02.tif" -> "B02".
+
+    Args:
+        filename (str): Filename of the .tif file.
+
+    Returns:
+        str: Band name.
+    """
+    return filename.split(".")[0].split("_")[-1]
@@ -0,0 +1,121 @@
+import io
+import os
+import time
+import tempfile
+import pandas as pd
+from contextlib import redirect_stdout
+from task_1.milestone01_task_1_3 import milestone01_task_1_3
+from task_1.milestone01_task_1_4 import (
+    milestone01_task_1_4_1,
+    milestone01_task_1_4_2,
+    milestone01_task_1_4_2_histogram,
+    milestone01_task_1_4_3,
+    milestone01_task_1_4_fused,
+)
+from task_1.milestone01_task_1_5 import milestone01_task_1_5_1, milestone01_task_1_5_2
+from task_1.milestone01_task_1_6 import milestone01_task_1_6
+from task_1.metadata_catalog import clear_metadata_catalogs
+from task_1.synthetic_dataset import generate_dataset
+
+
+# Tasks timed by the benchmark, by name
+BENCHMARK_TASKS = {
+    "milestone01_task_1_3": milestone01_task_1_3,
+    "milestone01_task_1_4_1": milestone01_task_1_4_1,
+    "milestone01_task_1_4_2": milestone01_task_1_4_2,
+    "milestone01_task_1_4_2_histogram": milestone01_task_1_4_2_histogram,
+    "milestone01_task_1_4_fused": milestone01_task_1_4_fused,
+    "milestone01_task_1_4_3": milestone01_task_1_4_3,
+    "milestone01_task_1_5_1": milestone01_task_1_5_1,
+    "milestone01_task_1_5_2": milestone01_task_1_5_2,
+    "milestone01_task_1_6": milestone01_task_1_6,
+}
+
+# Default scales (number of patches) of the benchmark
+BENCHMARK_SCALES = [1000, 10000, 100000]
+
+
+def run_benchmarks(
+    scales: list[int] = BENCHMARK_SCALES,
+    tasks: list[str] | None = None,
+    path_work_dir: str | None = None,
+    path_results_csv: str | None = None,
+    repeat: int = 1,
+    seed: int = 42,
+) -> pd.DataFrame:
+    """
+    Times the milestone01 tasks on synthetic datasets of increasing size (see generate_dataset).
+
+    For every scale a dataset is generated (or reused, if it exists in path_work_dir) and every
+    task is run with the dataset directory as working directory and its output suppressed. The
+    metadata catalogs are cleared before each run, so every task is timed with a cold catalog.
+
+    Args:
+        scales (list[int]): Numbers of patches of the datasets.
+        tasks (list[str] | None): Names of the tasks to time (see BENCHMARK_TASKS), all if None.
+        path_work_dir (str | None): Directory of the datasets (one subdirectory per scale), kept
+            for later runs. A temporary directory (removed afterwards) if None.
+        path_results_csv (str | None): Path to a CSV file the results are appended to.
+        repeat (int): Number of runs per task and scale, the fastest run is reported.
+        seed (int): Seed of the datasets.
+
+    Returns:
+        pd.DataFrame: One row per task and scale with the columns task, patches, seconds
+            (fastest run) and patches_per_second (throughput).
+
+    Raises:
+        AssertionError: If a task is unknown.
+    """
+    tasks = list(BENCHMARK_TASKS) if tasks is None else tasks
+
+    # Ensure the tasks are known
+    for task in tasks:
+        assert task in BENCHMARK_TASKS, f"Unknown task: {task}"
+
+    tmp_dir = tempfile.TemporaryDirectory(prefix="benchmark_") if path_work_dir is None else None
+    path_work_dir = tmp_dir.name if tmp_dir is not None else path_work_dir
+    path_cwd = os.getcwd()
+
+    results = []
+    try:
+        for num_patches in scales:
+            # Generate the dataset of the scale, unless it exists from an earlier run
+            path_root = os.path.join(path_work_dir, f"patches_{num_patches}")
+            if not os.path.isfile(os.path.join(path_root, "untracked-files", "milestone01", "metadata.parquet")):
+                generate_dataset(path_root, num_patches=num_patches, seed=seed)
+
+            os.chdir(path_root)
+            for task in tasks:
+                seconds = []
+                for _ in range(repeat):
+                    clear_metadata_catalogs()
+                    time_start = time.perf_counter()
+                    with redirect_stdout(io.StringIO()):
+                        BENCHMARK_TASKS[task]()
+                    seconds.append(time.perf_counter() - time_start)
+                results.append({
+                    "task": task,
+                    "patches": num_patches,
+                    "seconds": min(seconds),
+                    "patches_per_second": num_patches / min(seconds),
+                })
+            os.chdir(path_cwd)
+    finally:
+        os.chdir(path_cwd)
+        clear_metadata_catalogs()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+    results = pd.DataFrame(results, columns=["task", "patches", "seconds", "patches_per_second"])
+
+    # Append the results to the CSV file, so the runs of different versions can be compared
+    if path_results_csv is not None:
+        results.assign(timestamp=pd.Timestamp.now().isoformat(timespec="seconds")).to_csv(
+            path_results_csv, mode="a", index=False, header=not os.path.isfile(path_results_csv)
+        )
+
+    return results
+
+
+if __name__ == "__main__":
+    print(run_benchmarks(path_work_dir="untracked-files/benchmark", path_results_csv="untracked-files/benchmark.csv").to_string(index=False))
@@ -0,0 +1,361 @@
+import os
+import numpy as np
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from task_1.bands import BANDS, EXPECTED_RESOLUTIONS, get_band
+from task_1.band_stats import update_stats, merge_stats
+from task_1.raster_reader import iter_bands
+from task_1.metrics import timer, map_with_metrics
+from task_1.dataset_source import DatasetSource
+
+
+class ScanConsumer(ABC):
+    """
+    Abstract base class of the consumers of scan_dataset().
+
+    The scan decodes every band once and passes it to consume_band() of all consumers,
+    after the last band of a patch consume_patch() is called. A consumer must be mergeable
+    with another consumer of the same kind (merge()), because in the parallel mode every
+    worker feeds its own copy of the consumer and the copies are merged at the end.
+    Subclasses must implement merge() and report(), a consumer missing one of them can not
+    be instantiated.
+    """
+
+    def consume_band(self, patch_id: str, band: str, data: np.ndarray, nodata) -> None:
+        """
+        Consume a decoded band of a patch.
+
+        Args:
+            patch_id (str): Patch ID.
+            band (str): Band name, e.g. "B02".
+            data (np.ndarray): Pixels of the band.
+            nodata: NO_DATA value of the band.
+        """
+        pass
+
+    def consume_patch(self, patch_id: str) -> None:
+        """
+        Called after all bands of a patch were consumed.
+
+        Args:
+            patch_id (str): Patch ID.
+        """
+        pass
+
+    @abstractmethod
+    def merge(self, other: "ScanConsumer") -> None:
+        """
+        Merge the state of another consumer of the same kind into this consumer.
+
+        Args:
+            other (ScanConsumer): Consumer fed with other patches.
+        """
+
+    @abstractmethod
+    def report(self) -> dict:
+        """
+        Return the report of the consumer.
+
+        Returns:
+            dict: Results of the consumer.
+        """
+
+
+class SizeCheckConsumer(ScanConsumer):
+    """
+    Counts the patches with at least one band of unexpected size (see EXPECTED_RESOLUTIONS).
+    """
+
+    def __init__(self) -> None:
+        self.num_wrong_size = 0
+        self._wrong_size = False
+
+    def consume_band(self, patch_id: str, band: str, data: np.ndarray, nodata) -> None:
+        # Check if the band has the expected resolution (size)
+        if data.shape != EXPECTED_RESOLUTIONS[band]:
+            self._wrong_size = True
+
+    def consume_patch(self, patch_id: str) -> None:
+        self.num_wrong_size += self._wrong_size
+        self._wrong_size = False
+
+    def merge(self, other: "SizeCheckConsumer") -> None:
+        self.num_wrong_size += other.num_wrong_size
+
+    def report(self) -> dict:
+        return {"wrong-size": self.num_wrong_size}
+
+
+class NoDataCheckConsumer(ScanConsumer):
+    """
+    Counts the patches with at least one NO_DATA pixel.
+    """
+
+    def __init__(self) -> None:
+        self.num_with_no_data = 0
+        self._with_no_data = False
+
+    def consume_band(self, patch_id: str, band: str, data: np.ndarray, nodata) -> None:
+        # Check for NO_DATA values in the band, the remaining bands of the patch are not checked
+        if not self._with_no_data and (data == nodata).any():
+            self._with_no_data = True
+
+    def consume_patch(self, patch_id: str) -> None:
+        self.num_with_no_data += self._with_no_data
+        self._with_no_data = False
+
+    def merge(self, other: "NoDataCheckConsumer") -> None:
+        self.num_with_no_data += other.num_with_no_data
+
+    def report(self) -> dict:
+        return {"with-no-data": self.num_with_no_data}
+
+
+class BandStatsConsumer(ScanConsumer):
+    """
+    Accumulates the mean and sum of squared deviations (M2) of the valid (non-NO_DATA)
+    pixels of each band, see band_stats.update_stats.
+    """
+
+    def __init__(self, patch_ids=None) -> None:
+        """
+        Args:
+            patch_ids: Patch IDs to accumulate, all patches if None.
+        """
+        self.patch_ids = set(patch_ids) if patch_ids is not None else None
+        self.band_stats = {band: (0.0, 0.0, 0) for band in BANDS}
+        self.num_bands = {}
+
+    def consume_band(self, patch_id: str, band: str, data: np.ndarray, nodata) -> None:
+        if self.patch_ids is not None and patch_id not in self.patch_ids:
+            return
+
+        # Mask out NO_DATA pixels and fold them into the accumulator of the band
+        self.band_stats[band] = update_stats(*self.band_stats[band], new_data=data[data != nodata])
+        self.num_bands[patch_id] = self.num_bands.get(patch_id, 0) + 1
+
+    def merge(self, other: "BandStatsConsumer") -> None:
+        for band in BANDS:
+            self.band_stats[band] = merge_stats(*self.band_stats[band], *other.band_stats[band])
+        for patch_id, num_bands in other.num_bands.items():
+            self.num_bands[patch_id] = self.num_bands.get(patch_id, 0) + num_bands
+
+    def report(self) -> dict:
+        """
+        Returns:
+            dict: Per band a dict with mean, std-dev (sample standard deviation) and count,
+                and "patches-missing", the requested patches with missing bands.
+        """
+        report = {}
+        for band in BANDS:
+            mean, var, count = self.band_stats[band]
+            if count > 1:
+                report[band] = {"mean": mean, "std-dev": float(np.sqrt(var / (count - 1))), "count": count}
+            else:
+                # Default values if no valid data is found
+                report[band] = {"mean": 0, "std-dev": 0, "count": count}
+
+        # Requested patches which were not found or miss bands
+        report["patches-missing"] = sorted(
+            patch_id for patch_id in (self.patch_ids or [])
+            if self.num_bands.get(patch_id, 0) < len(BANDS)
+        )
+        return report
+
+
+class PatchIdsConsumer(ScanConsumer):
+    """
+    Collects the IDs of the scanned patches, e.g. to look them up in the metadata.
+    """
+
+    def __init__(self) -> None:
+        self.patch_ids = []
+
+    def consume_patch(self, patch_id: str) -> None:
+        self.patch_ids.append(patch_id)
+
+    def merge(self, other: "PatchIdsConsumer") -> None:
+        self.patch_ids.extend(other.patch_ids)
+
+    def report(self) -> dict:
+        return {"patch-ids": self.patch_ids}
+
+
+def find_patch_dirs(path_dataset: str) -> list[str]:
+    """
+    Recursively walk through a dataset directory and return the patch directories,
+    i.e. the directories containing .tif files (band data), in a deterministic order.
+
+    Args:
+        path_dataset (str): Path to the dataset directory.
+
+    Returns:
+        list[str]: Paths to the patch directories.
+
+    Raises:
+        AssertionError: If the dataset directory is not found.
+    """
+    # Ensure the dataset directory exists before proceeding; raise an error if not found.
+    assert os.path.isdir(path_dataset), f"Directory not found: {path_dataset}"
+
+    patch_dirs = []
+    for dirpath, dirnames, filenames in os.walk(path_dataset):
+        dirnames.sort()
+        if any(f.endswith(".tif") for f in filenames):
+            patch_dirs.append(dirpath)
+    return patch_dirs
+
+
+def scan_dataset(
+    path_dataset: str,
+    consumers: list[ScanConsumer],
+    num_workers: int = 1,
+    patch_dirs: list[str] | None = None,
+    num_threads: int = 1,
+) -> list[ScanConsumer]:
+    """
+    Walks the dataset once, decodes every band of every patch exactly once and feeds it to all consumers.
+
+    Checks which used to open the same .tif files independently (size check, NO_DATA check,
+    band statistics, ...) share a single read and decode of every file. Bands unknown to
+    EXPECTED_RESOLUTIONS are skipped.
+
+    Args:
+        path_dataset (str): Path to the dataset directory.
+        consumers (list[ScanConsumer]): Fresh (not yet fed) consumers.
+        num_workers (int): Number of worker processes. With more than 1, the patches are split into
+            chunks, every chunk is scanned with its own copy of the consumers and the copies are
+            merged into the given consumers.
+        patch_dirs (list[str] | None): Patch directories to scan, found with find_patch_dirs if None.
+        num_threads (int): Number of reader threads (per worker process) prefetching the bands.
+
+    Returns:
+        list[ScanConsumer]: The given consumers, fed with all patches.
+
+    Raises:
+        AssertionError: If essential files or directories are not found.
+    """
+    if patch_dirs is None:
+        patch_dirs = find_patch_dirs(path_dataset)
+
+    if num_workers > 1 and len(patch_dirs) > 1:
+        # Scan chunks of patches in worker processes, each with a (pickled) copy of the fresh consumers
+        num_chunks = min(len(patch_dirs), num_workers * 4)
+        chunks = [patch_dirs[idx::num_chunks] for idx in range(num_chunks)]
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            results = list(map_with_metrics(executor, scan_patches, chunks, [consumers] * num_chunks, [num_threads] * num_chunks))
+
+        # Merge only after all chunks were scanned, the consumers are pickled lazily for the workers
+        for chunk_consumers in results:
+            for consumer, chunk_consumer in zip(consumers, chunk_consumers):
+                consumer.merge(chunk_consumer)
+    else:
+        scan_patches(patch_dirs, consumers, num_threads)
+
+    return consumers
+
+
+def scan_patches(patch_dirs: list[str], consumers: list[ScanConsumer], num_threads: int = 1) -> list[ScanConsumer]:
+    """
+    Decodes the bands of the given patches and feeds them to the consumers.
+    Runs in a worker process in the parallel mode of scan_dataset.
+
+    The bands are read with the prefetching reader (see raster_reader.iter_bands), so the
+    next bands are read while the consumers process the current one.
+
+    Args:
+        patch_dirs (list[str]): Paths to the patch directories.
+        consumers (list[ScanConsumer]): Consumers to feed.
+        num_threads (int): Number of reader threads.
+
+    Returns:
+        list[ScanConsumer]: The fed consumers.
+    """
+    # Band files of each patch, bands unknown to EXPECTED_RESOLUTIONS are skipped
+    patches = []
+    for dirpath in patch_dirs:
+        band_files = []
+        for tif_file in sorted(os.listdir(dirpath)):
+            # Extract band from filename
+            band = get_band(tif_file) if tif_file.endswith(".tif") else None
+            if band in EXPECTED_RESOLUTIONS:
+                band_files.append((band, os.path.join(dirpath, tif_file)))
+
+        # Extract patch ID from the directory name
+        patches.append((os.path.basename(dirpath), band_files))
+
+    # Read the bands in order, the prefetch queue holds a few patches
+    bands = iter_bands(
+        ((patch_id, band, path_tif) for patch_id, band_files in patches for band, path_tif in band_files),
+        num_threads=num_threads,
+        prefetch=4 * num_threads,
+    )
+
+    for patch_id, band_files in patches:
+        for _ in band_files:
+            _, band, data, nodata = next(bands)
+            with timer("scan.consumers", items=1):
+                for consumer in consumers:
+                    consumer.consume_band(patch_id, band, data, nodata)
+
+        for consumer in consumers:
+            consumer.consume_patch(patch_id)
+
+    return consumers
+
+
+def scan_source(source: DatasetSource, consumers: list[ScanConsumer], num_threads: int = 1) -> list[ScanConsumer]:
+    """
+    Streams the bands of a dataset source (e.g. a tar archive, see dataset_source.TarSource) in a
+    single sequential pass, decodes them in memory and feeds them to the consumers, like scan_dataset
+    does for a directory. Nothing is extracted to disk.
+
+    The patch ID is the name of the directory of a band file. The bands of a patch must be stored
+    one after another in the source, as in archives created from a directory tree.
+    Bands unknown to EXPECTED_RESOLUTIONS are skipped.
+
+    Args:
+        source (DatasetSource): Source of the band files.
+        consumers (list[ScanConsumer]): Fresh (not yet fed) consumers.
+        num_threads (int): Number of threads decoding the bands while the source is read.
+
+    Returns:
+        list[ScanConsumer]: The given consumers, fed with all patches.
+
+    Raises:
+        AssertionError: If the bands of a patch are not stored one after another.
+    """
+    def items():
+        # Band files of the source in the order they are stored
+        for name, data in source.iter_members(suffix=".tif"):
+            path_patch, _, filename = name.rpartition("/")
+            band = get_band(filename)
+            if band in EXPECTED_RESOLUTIONS:
+                yield path_patch.rpartition("/")[2], band, data
+
+    patch_ids = set()
+    patch_id_current = None
+
+    # Decode the bands in order while the next ones are read from the source
+    for patch_id, band, data, nodata in iter_bands(items(), num_threads=num_threads, prefetch=4 * num_threads):
+        if patch_id != patch_id_current:
+            # The previous patch is complete once the bands of the next patch start
+            if patch_id_current is not None:
+                for consumer in consumers:
+                    consumer.consume_patch(patch_id_current)
+
+            # Ensure the bands of the patch were not interrupted by another patch
+            assert patch_id not in patch_ids, f"Bands of patch {patch_id} are not stored one after another in the source."
+
+            patch_ids.add(patch_id)
+            patch_id_current = patch_id
+
+        with timer("scan.consumers", items=1):
+            for consumer in consumers:
+                consumer.consume_band(patch_id, band, data, nodata)
+
+    if patch_id_current is not None:
+        for consumer in consumers:
+            consumer.consume_patch(patch_id_current)
+
+    return consumers
@@ -0,0 +1,373 @@
+import os
+import time
+import tarfile
+import pandas as pd
+from abc import ABC, abstractmethod
+from task_1.metrics import record
+
+try:
+    import zstandard
+except ImportError:
+    # Optional (extra "archives"), only needed to stream .tar.zst archives
+    zstandard = None
+
+
+# Suffixes of the archives read by TarSource, tarfile detects the gz/bz2/xz compression itself
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz", ".tar.zst", ".tar.zstd")
+
+
+class DatasetSource(ABC):
+    """
+    Abstract base class of the sources serving the files of a dataset (patch bands, reference maps, ...)
+    by their name relative to the root of the source, with "/" as separator, e.g.
+    "S2B_MSIL2A_20170808T094029_N9999_R036_T35ULA/S2B_..._33_29/S2B_..._33_29_B02.tif".
+
+    The files can be streamed in a single sequential pass (iter_members) or read one by one
+    (read_member, read_members), the raster reader decodes the bands from memory (see
+    raster_reader.read_band_bytes). Sources with random_access read single files without
+    reading the files stored before them. Subclasses must implement iter_members(), list_members(),
+    read_member() and stat_member(), a source missing one of them can not be instantiated.
+    """
+
+    # Whether single files can be read without reading the files stored before them
+    random_access = True
+
+    @abstractmethod
+    def iter_members(self, suffix: str = ""):
+        """
+        Stream the files of the source in a single sequential pass.
+
+        Args:
+            suffix (str): Only the files whose name ends with this suffix, e.g. ".tif".
+
+        Yields:
+            tuple[str, bytes]: Name and content of each file.
+        """
+
+    @abstractmethod
+    def list_members(self, suffix: str = "") -> list[str]:
+        """
+        Return the names of the files of the source in sorted order.
+
+        Args:
+            suffix (str): Only the files whose name ends with this suffix.
+
+        Returns:
+            list[str]: Names of the files.
+        """
+
+    @abstractmethod
+    def read_member(self, name: str) -> bytes:
+        """
+        Read a single file of the source (random access).
+
+        Args:
+            name (str): Name of the file.
+
+        Returns:
+            bytes: Content of the file.
+        """
+
+    def read_members(self, names: list[str]):
+        """
+        Read a subset of the files of the source, e.g. the candidates of a footprint index.
+
+        Args:
+            names (list[str]): Names of the files.
+
+        Yields:
+            tuple[str, bytes]: Name and content of each file, in the order the source reads them fastest.
+        """
+        for name in names:
+            yield name, self.read_member(name)
+
+    @abstractmethod
+    def stat_member(self, name: str) -> tuple[int, int]:
+        """
+        Return the size and the modification time of a file of the source, e.g. to check whether
+        an index built from the source is still current (see footprint_index.select_overlap_candidates).
+
+        Args:
+            name (str): Name of the file.
+
+        Returns:
+            tuple[int, int]: Size (in bytes) and modification time (in nanoseconds) of the file.
+        """
+
+
+class DirectorySource(DatasetSource):
+    """
+    Serves the files of an extracted dataset directory.
+    """
+
+    def __init__(self, path_root: str) -> None:
+        """
+        Args:
+            path_root (str): Path to the root directory of the dataset.
+
+        Raises:
+            AssertionError: If the directory is not found.
+        """
+        # Ensure the root directory exists before proceeding; raise an error if not found.
+        assert os.path.isdir(path_root), f"Directory not found: {path_root}"
+
+        self.path_root = path_root
+
+    def iter_members(self, suffix: str = ""):
+        for name in self.list_members(suffix=suffix):
+            yield name, self.read_member(name)
+
+    def list_members(self, suffix: str = "") -> list[str]:
+        names = []
+        for dirpath, dirnames, filenames in os.walk(self.path_root):
+            dirnames.sort()
+            dirpath_relative = os.path.relpath(dirpath, self.path_root)
+            for filename in sorted(filenames):
+                if filename.endswith(suffix):
+                    names.append(filename if dirpath_relative == "." else f"{dirpath_relative}/{filename}".replace(os.sep, "/"))
+        return names
+
+    def read_member(self, name: str) -> bytes:
+        path_file = os.path.join(self.path_root, *name.split("/"))
+
+        # Ensure the file exists before proceeding; raise an error if not found.
+        assert os.path.isfile(path_file), f"File not found: {path_file}"
+
+        with open(path_file, "rb") as file:
+            return file.read()
+
+    def stat_member(self, name: str) -> tuple[int, int]:
+        stat = os.stat(os.path.join(self.path_root, *name.split("/")))
+        return stat.st_size, stat.st_mtime_ns
+
+
+class TarSource(DatasetSource):
+    """
+    Serves the files of a tar archive (e.g. the distributed BigEarthNet archive) without extracting it.
+
+    Streaming (iter_members) reads the archive once from start to end, which also works for
+    compressed archives: .tar.gz/.tar.bz2/.tar.xz with tarfile, .tar.zst with the optional
+    zstandard package. No file is written to disk, so hundreds of thousands of small files
+    do not touch the filesystem (inodes, directory entries).
+
+    Random access (read_member, stat_member) needs an uncompressed .tar archive: a member is
+    read with a single seek and read at its data offset, taken from the member-offset index (see
+    build_tar_index), or from an index built in memory on first use (one pass over the headers,
+    skipping the data). Compressed streams can not be seeked into without decompressing them
+    from the start, so random access is not supported for compressed archives; read_members
+    then picks the requested members from a single streaming pass.
+    """
+
+    def __init__(self, path_archive: str, path_index: str | None = None) -> None:
+        """
+        Args:
+            path_archive (str): Path to the tar archive.
+            path_index (str | None): Path to a prebuilt member-offset index of the archive (.parquet).
+
+        Raises:
+            AssertionError: If the archive or the index is not found, or the archive type is unknown.
+        """
+        # Ensure the archive exists before proceeding; raise an error if not found.
+        assert os.path.isfile(path_archive), f"File not found: {path_archive}"
+
+        # Ensure the archive type is known
+        assert path_archive.endswith(ARCHIVE_SUFFIXES), f"Unknown archive type: {path_archive}"
+
+        self.path_archive = path_archive
+        self.compressed = not path_archive.endswith(".tar")
+        self.random_access = not self.compressed
+        self._index = None
+
+        if path_index is not None:
+            # Ensure the index exists before proceeding; raise an error if not found.
+            assert os.path.isfile(path_index), f"File not found: {path_index}"
+
+            index = pd.read_parquet(path_index)
+
+            # Ensure the index has the modification times, older indexes must be rebuilt
+            assert "mtime_ns" in index.columns, f"Tar index of an older version, rebuild it with build_tar_index: {path_index}"
+
+            self._index = dict(zip(index["name"], zip(index["offset"].tolist(), index["size"].tolist(), index["mtime_ns"].tolist())))
+
+    def _open_stream(self):
+        """
+        Open the (decompressed) byte stream of the archive and the mode of tarfile to read it.
+        """
+        if self.path_archive.endswith((".tar.zst", ".tar.zstd")):
+            # Ensure the optional zstandard package is installed
+            assert zstandard is not None, f"Reading .tar.zst archives requires the zstandard package: {self.path_archive}"
+
+            return zstandard.ZstdDecompressor().stream_reader(open(self.path_archive, "rb"), closefd=True), "r|"
+        return open(self.path_archive, "rb"), "r|*"
+
+    def iter_members(self, suffix: str = ""):
+        stream, mode = self._open_stream()
+        with stream, tarfile.open(fileobj=stream, mode=mode) as tar:
+            time_start = time.perf_counter()
+            for member in tar:
+                if not member.isfile() or not member.name.endswith(suffix):
+                    continue
+                data = tar.extractfile(member).read()
+
+                # Count the member, its size and the time to decompress and read it (and skip the members before it)
+                record("source.read", files_opened=1, bytes_read=len(data), decode_seconds=time.perf_counter() - time_start, items=1)
+                yield normalize_member_name(member.name), data
+                time_start = time.perf_counter()
+
+    def list_members(self, suffix: str = "") -> list[str]:
+        if self.compressed:
+            # The names of a compressed archive are only known after a pass over the whole stream
+            stream, mode = self._open_stream()
+            with stream, tarfile.open(fileobj=stream, mode=mode) as tar:
+                return sorted(normalize_member_name(member.name) for member in tar if member.isfile() and member.name.endswith(suffix))
+        return sorted(name for name in self.get_index() if name.endswith(suffix))
+
+    def read_member(self, name: str) -> bytes:
+        with open(self.path_archive, "rb") as file:
+            return self._read_member(file, name)
+
+    def read_members(self, names: list[str]):
+        if self.compressed:
+            # Pick the members from a single pass over the stream, it ends once all members are found
+            names_missing = set(names)
+            for name, data in self.iter_members():
+                if name in names_missing:
+                    names_missing.discard(name)
+                    yield name, data
+                    if not names_missing:
+                        return
+
+            # Ensure all members are in the archive
+            assert not names_missing, f"Member not found: {sorted(names_missing)[0]} in {self.path_archive}"
+            return
+
+        # Read the members in the order of their offsets, so the archive is read forward only
+        index = self.get_index()
+        with open(self.path_archive, "rb") as file:
+            for name in sorted(names, key=lambda name: index.get(name, (-1,))[0]):
+                yield name, self._read_member(file, name)
+
+    def stat_member(self, name: str) -> tuple[int, int]:
+        # Ensure the member is in the archive
+        _, size, mtime_ns = self.get_index().get(name, (None, None, None))
+        assert size is not None, f"Member not found: {name} in {self.path_archive}"
+
+        return size, mtime_ns
+
+    def _read_member(self, file, name: str) -> bytes:
+        """
+        Read a member from the open archive with a single seek and read.
+        """
+        # Ensure the member is in the archive
+        offset, size, _ = self.get_index().get(name, (None, None, None))
+        assert offset is not None, f"Member not found: {name} in {self.path_archive}"
+
+        time_start = time.perf_counter()
+        file.seek(offset)
+        data = file.read(size)
+
+        # Count the member, its size and the time to read it
+        record("source.read", files_opened=1, bytes_read=len(data), decode_seconds=time.perf_counter() - time_start, items=1)
+        return data
+
+    def get_index(self) -> dict[str, tuple[int, int, int]]:
+        """
+        Return the member-offset index of the archive, built in memory on first use if no prebuilt index was given.
+
+        Returns:
+            dict[str, tuple[int, int, int]]: Data offset, size and modification time (in nanoseconds) of each file, by name.
+
+        Raises:
+            AssertionError: If the archive is compressed.
+        """
+        # Ensure the archive can be seeked into
+        assert not self.compressed, f"Random access requires an uncompressed .tar archive: {self.path_archive}"
+
+        if self._index is None:
+            self._index = read_tar_index(self.path_archive)
+        return self._index
+
+
+def normalize_member_name(name: str) -> str:
+    """
+    Normalize the name of an archive member, e.g. "./tile/patch/file.tif" -> "tile/patch/file.tif".
+    """
+    while name.startswith("./"):
+        name = name[2:]
+    return name
+
+
+def read_tar_index(path_archive: str) -> dict[str, tuple[int, int, int]]:
+    """
+    Read the data offset, size and modification time of each file of an uncompressed tar archive.
+    Only the headers are read, the data of the members is skipped with seeks.
+
+    Args:
+        path_archive (str): Path to the .tar archive.
+
+    Returns:
+        dict[str, tuple[int, int, int]]: Data offset, size and modification time (in nanoseconds) of each file, by name.
+    """
+    with tarfile.open(path_archive, mode="r:") as tar:
+        return {
+            normalize_member_name(member.name): (member.offset_data, member.size, round(member.mtime * 10**9))
+            for member in tar
+            if member.isfile()
+        }
+
+
+def build_tar_index(path_archive: str, path_index: str) -> int:
+    """
+    Builds the member-offset index of an uncompressed tar archive and saves it to disk,
+    so the archive can be read with random access (see TarSource) without scanning its headers again.
+
+    The index is stored as a Parquet file with the name, the data offset, the size and the
+    modification time (in nanoseconds, as stored in the archive) of each file.
+
+    Args:
+        path_archive (str): Path to the .tar archive.
+        path_index (str): Path to the .parquet file of the index.
+
+    Returns:
+        int: Number of indexed files.
+
+    Raises:
+        AssertionError: If the archive is not found or is compressed.
+    """
+    # Ensure the archive exists before proceeding; raise an error if not found.
+    assert os.path.isfile(path_archive), f"File not found: {path_archive}"
+
+    # Ensure the archive can be seeked into
+    assert path_archive.endswith(".tar"), f"Random access requires an uncompressed .tar archive: {path_archive}"
+
+    index = read_tar_index(path_archive)
+
+    # Create the directory of the index if it doesn't exist
+    os.makedirs(os.path.dirname(os.path.abspath(path_index)), exist_ok=True)
+
+    pd.DataFrame({
+        "name": list(index),
+        "offset": [offset for offset, _, _ in index.values()],
+        "size": [size for _, size, _ in index.values()],
+        "mtime_ns": [mtime_ns for _, _, mtime_ns in index.values()],
+    }).to_parquet(path_index, index=False)
+    return len(index)
+
+
+def open_dataset_source(path_source: str, path_index: str | None = None) -> DatasetSource:
+    """
+    Open a dataset source: a directory or a tar archive (see ARCHIVE_SUFFIXES).
+
+    Args:
+        path_source (str): Path to the directory or the archive.
+        path_index (str | None): Path to a prebuilt member-offset index of an archive.
+
+    Returns:
+        DatasetSource: The source.
+
+    Raises:
+        AssertionError: If the directory or archive is not found.
+    """
+    if os.path.isdir(path_source):
+        return DirectorySource(path_source)
+    return TarSource(path_source, path_index=path_index)
@@ -0,0 +1,267 @@
+import io
+import os
+import shapely
+import numpy as np
+import geopandas as gpd
+from task_1.overlap_partitions import find_overlapping_pairs
+from task_1.dataset_source import DatasetSource, open_dataset_source
+
+
+# Suffix of the reference map GeoParquet files, the prefix is the patch ID
+REFERENCE_MAP_SUFFIX = "_reference_map.parquet"
+
+# Predicates for which the index stores whether the geometries of a patch satisfy them with each other
+SELF_OVERLAP_PREDICATES = ["interior", "intersects"]
+
+
+def build_footprint_index(path_geoparquets_dir: str, path_index: str) -> int:
+    """
+    Builds the footprint index of the patches of a GeoParquet directory (or of an uncompressed tar
+    archive of the reference maps, see dataset_source.TarSource) and saves it to disk.
+
+    The footprint of a patch is the bounding box of all geometries of its reference map.
+    The index is stored as a compressed .npz file with the patch IDs, the footprint bounds
+    (minx, miny, maxx, maxy), the CRS, the number of geometries, whether the geometries of the
+    patch overlap each other (see SELF_OVERLAP_PREDICATES) and the size and modification time of
+    the file of each patch, and can be loaded in milliseconds with FootprintIndex.
+
+    Args:
+        path_geoparquets_dir (str): Directory (or .tar archive) containing the *_reference_map.parquet files.
+        path_index (str): Path to the .npz file of the index.
+
+    Returns:
+        int: Number of indexed patches.
+
+    Raises:
+        AssertionError: If essential files or directories are not found, or the archive is compressed.
+    """
+    # Ensure the geoparquet directory exists before proceeding; raise an error if not found.
+    assert os.path.isdir(path_geoparquets_dir) or os.path.isfile(path_geoparquets_dir), f"Directory not found: {path_geoparquets_dir}"
+
+    # The size and modification time of the files are only known with random access
+    source = open_dataset_source(path_geoparquets_dir)
+    assert source.random_access, f"Random access requires an uncompressed .tar archive: {path_geoparquets_dir}"
+
+    patch_ids = []
+    bounds = []
+    crs = []
+    num_geometries = []
+    self_overlaps = {predicate: [] for predicate in SELF_OVERLAP_PREDICATES}
+    sizes = []
+    mtimes_ns = []
+
+    # Loop through each GeoParquet file of the source
+    for name, data in source.read_members(source.list_members(suffix=REFERENCE_MAP_SUFFIX)):
+        # Load the geometries of the GeoParquet file and compute the footprint
+        size, mtime_ns = source.stat_member(name)
+        gdf = gpd.read_parquet(io.BytesIO(data), columns=["geometry"])
+        if gdf.empty:
+            continue
+        patch_ids.append(get_patch_id(name))
+        bounds.append(gdf.total_bounds)
+        crs.append(gdf.crs.to_string() if gdf.crs is not None else "")
+        num_geometries.append(len(gdf))
+        sizes.append(size)
+        mtimes_ns.append(mtime_ns)
+
+        # Pairs of geometries of the patch itself are counted by find_overlapping_pairs as well
+        geometries = gdf["geometry"].to_numpy()
+        for predicate in SELF_OVERLAP_PREDICATES:
+            self_overlaps[predicate].append(len(geometries) > 1 and len(find_overlapping_pairs(geometries, predicate=predicate)[0]) > 0)
+
+    # Create the directory of the index if it doesn't exist
+    os.makedirs(os.path.dirname(os.path.abspath(path_index)), exist_ok=True)
+
+    np.savez_compressed(
+        path_index,
+        patch_ids=np.array(patch_ids, dtype=str),
+        bounds=np.array(bounds, dtype=np.float64).reshape(-1, 4),
+        crs=np.array(crs, dtype=str),
+        num_geometries=np.array(num_geometries, dtype=np.int64),
+        sizes=np.array(sizes, dtype=np.int64),
+        mtimes_ns=np.array(mtimes_ns, dtype=np.int64),
+        **{f"self_overlap_{predicate}": np.array(self_overlaps[predicate], dtype=bool) for predicate in SELF_OVERLAP_PREDICATES},
+    )
+    return len(patch_ids)
+
+
+def get_patch_id(name: str) -> str:
+    """
+    Return the patch ID of a reference map, e.g. "tile/S2B_..._33_29_reference_map.parquet" -> "S2B_..._33_29".
+    """
+    return name.rpartition("/")[2][:-len(REFERENCE_MAP_SUFFIX)]
+
+
+def select_overlap_candidates(
+    source: DatasetSource,
+    names: list[str],
+    footprint_index: "FootprintIndex",
+    predicate: str = "interior",
+) -> list[str]:
+    """
+    Select the reference maps which have to be loaded to find the overlapping patches, the other
+    patches can not have geometries overlapping another geometry (see FootprintIndex.overlap_candidates).
+
+    The patches missing in the index or whose file was modified since the index was built are
+    always selected, their footprints are read to select the indexed patches near them as well,
+    so a stale index gives the same result as a current one. An index built from another source
+    (e.g. from the directory of an archive, whose files have other modification times) is stale
+    for all patches.
+
+    Args:
+        source (DatasetSource): Source of the *_reference_map.parquet files (directory or uncompressed archive).
+        names (list[str]): Names of the reference maps in the source.
+        footprint_index (FootprintIndex): Footprint index of the source.
+        predicate (str): Predicate of the overlap, see find_overlapping_pairs.
+
+    Returns:
+        list[str]: Selected names, in the given order.
+    """
+    # Patches missing in the index or modified since it was built
+    names_unindexed = set(name for name in names if not footprint_index.is_current(get_patch_id(name), *source.stat_member(name)))
+
+    # Footprints of these patches
+    bounds_unindexed = []
+    for _, data in source.read_members(sorted(names_unindexed)):
+        gdf = gpd.read_parquet(io.BytesIO(data), columns=["geometry"])
+        if not gdf.empty:
+            bounds_unindexed.append(gdf.total_bounds)
+
+    candidates = set(footprint_index.overlap_candidates(predicate=predicate, bounds_unindexed=np.array(bounds_unindexed).reshape(-1, 4)))
+    return [name for name in names if name in names_unindexed or get_patch_id(name) in candidates]
+
+
+class FootprintIndex:
+    """
+    Spatial index of the patch footprints, loaded from a file written by build_footprint_index().
+    """
+
+    def __init__(self, path_index: str) -> None:
+        """
+        Args:
+            path_index (str): Path to the .npz file of the index.
+
+        Raises:
+            AssertionError: If the index is not found or was written by an older version.
+        """
+        # Ensure the index exists before proceeding; raise an error if not found.
+        assert os.path.isfile(path_index), f"File not found: {path_index}"
+
+        with np.load(path_index) as index:
+            # Ensure the index has the self-overlaps and file stats, older indexes must be rebuilt
+            assert "mtimes_ns" in index, f"Footprint index of an older version, rebuild it with build_footprint_index: {path_index}"
+
+            self.patch_ids = index["patch_ids"]
+            self.bounds = index["bounds"]
+            self.crs = index["crs"]
+            self.num_geometries = index["num_geometries"]
+            self.sizes = index["sizes"]
+            self.mtimes_ns = index["mtimes_ns"]
+            self.self_overlaps = {predicate: index[f"self_overlap_{predicate}"] for predicate in SELF_OVERLAP_PREDICATES}
+        self.patch_rows = {patch_id: row for row, patch_id in enumerate(self.patch_ids)}
+        self.footprints = shapely.box(self.bounds[:, 0], self.bounds[:, 1], self.bounds[:, 2], self.bounds[:, 3])
+        self.tree = shapely.STRtree(self.footprints)
+
+    def __len__(self) -> int:
+        """
+        Number of patches in the index.
+        """
+        return len(self.patch_ids)
+
+    def __contains__(self, patch_id: str) -> bool:
+        """
+        Check whether a patch is part of the index.
+        """
+        return patch_id in self.patch_rows
+
+    def is_current(self, patch_id: str, size: int, mtime_ns: int) -> bool:
+        """
+        Check whether a patch is part of the index and its file was not modified since the index was built.
+
+        Args:
+            patch_id (str): Patch ID.
+            size (int): Current size of the file of the patch.
+            mtime_ns (int): Current modification time of the file of the patch.
+        """
+        row = self.patch_rows.get(patch_id)
+        return row is not None and self.sizes[row] == size and self.mtimes_ns[row] == mtime_ns
+
+    def query(self, geometry, predicate: str = "intersects", crs: str | None = None) -> list[str]:
+        """
+        Return the patches whose footprint satisfies a predicate with a bounding box or geometry.
+
+        Args:
+            geometry: Bounding box (minx, miny, maxx, maxy) or shapely geometry.
+            predicate (str): Predicate of the spatial index, e.g. "intersects" or "contains".
+            crs (str | None): CRS of the geometry (e.g. "EPSG:32635"), if given only patches of this CRS are returned.
+
+        Returns:
+            list[str]: Patch IDs, in the order of the index.
+        """
+        if isinstance(geometry, (tuple, list)):
+            geometry = shapely.box(*geometry)
+        rows = np.sort(self.tree.query(geometry, predicate=predicate))
+        if crs is not None:
+            rows = rows[self.crs[rows] == crs]
+        return self.patch_ids[rows].tolist()
+
+    def neighbors(self, patch_id: str) -> list[str]:
+        """
+        Return the patches whose footprint intersects the footprint of a patch (in the same CRS).
+
+        Args:
+            patch_id (str): Patch ID.
+
+        Returns:
+            list[str]: Patch IDs of the neighbors, without the patch itself.
+
+        Raises:
+            AssertionError: If the patch is not part of the index.
+        """
+        # Ensure the patch is part of the index
+        assert patch_id in self.patch_rows, f"Patch not found in the footprint index: {patch_id}"
+
+        row = self.patch_rows[patch_id]
+        neighbors = self.query(self.footprints[row], crs=self.crs[row])
+        return [neighbor for neighbor in neighbors if neighbor != patch_id]
+
+    def overlap_candidates(self, predicate: str = "interior", bounds_unindexed: np.ndarray | None = None) -> list[str]:
+        """
+        Return the indexed patches which can have geometries satisfying the predicate with another
+        geometry, i.e. the candidates for milestone01_task_1_5_2 (like that task, the CRS is not considered):
+            - the patches whose footprint overlaps the footprint of another indexed patch,
+            - the patches whose own geometries overlap each other (find_overlapping_pairs counts
+              pairs of geometries of the same patch as well),
+            - the patches whose footprint intersects the footprint of a patch which is not part of
+              the index (e.g. added or modified after the index was built).
+        The patches which are not part of the index are not returned, they have to be loaded anyway.
+
+        Args:
+            predicate (str): Predicate of the overlap, see find_overlapping_pairs.
+            bounds_unindexed (np.ndarray | None): Footprints (minx, miny, maxx, maxy) of the patches
+                which are not part of the index, with shape (N, 4).
+
+        Returns:
+            list[str]: Patch IDs, in the order of the index.
+        """
+        # Geometries sharing an interior point have footprints sharing an interior point,
+        # for any other predicate the geometries (and their footprints) intersect at least
+        predicate_footprints = "interior" if predicate == "interior" else "intersects"
+
+        # Patches with overlapping footprints
+        left, right = find_overlapping_pairs(self.footprints, predicate=predicate_footprints)
+        rows = [left, right]
+
+        # Patches with overlapping geometries of their own, any patch with several geometries for other predicates
+        if predicate in self.self_overlaps:
+            rows.append(np.flatnonzero(self.self_overlaps[predicate]))
+        else:
+            rows.append(np.flatnonzero(self.num_geometries > 1))
+
+        # Patches near the patches missing in the index
+        if bounds_unindexed is not None and len(bounds_unindexed):
+            bounds_unindexed = np.asarray(bounds_unindexed, dtype=np.float64).reshape(-1, 4)
+            footprints_unindexed = shapely.box(bounds_unindexed[:, 0], bounds_unindexed[:, 1], bounds_unindexed[:, 2], bounds_unindexed[:, 3])
+            rows.append(self.tree.query(footprints_unindexed, predicate="intersects")[1])
+
+        return self.patch_ids[np.unique(np.concatenate(rows))].tolist()
@@ -0,0 +1,236 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Codes of the splits in an assignment array
+UNASSIGNED = -1
+TRAIN = 0
+TEST = 1
+
+# Names of the splits in the split file, indexed by the code of the split
+SPLIT_NAMES = ["train", "test"]
+
+
+def build_label_incidence(labels: pd.Series) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Builds the sparse patch x label incidence matrix of a multi-label column in CSR form.
+
+    The labels of patch i are label_names[indices[indptr[i]:indptr[i + 1]]].
+
+    Args:
+        labels (pd.Series): Labels of each patch (list or array of label names, may be empty).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: indptr (num_patches + 1), indices (label codes)
+            and the sorted unique label names.
+    """
+    num_patches = len(labels)
+
+    # One row per (patch, label), empty label lists become a single missing value
+    flat = labels.reset_index(drop=True).explode()
+    valid = flat.notna().to_numpy()
+    rows = flat.index.to_numpy()[valid]
+    codes, label_names = pd.factorize(flat[valid], sort=True)
+
+    # Remove duplicated labels of a patch, the pairs stay sorted by patch
+    pairs = np.unique(rows.astype(np.int64) * max(len(label_names), 1) + codes)
+    rows = pairs // max(len(label_names), 1)
+    indices = pairs % max(len(label_names), 1)
+
+    indptr = np.zeros(num_patches + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_patches), out=indptr[1:])
+    return indptr, indices, np.asarray(label_names)
+
+
+def get_row_labels(indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """
+    Gathers the label codes of several patches from the CSR incidence matrix, vectorized.
+
+    Args:
+        indptr (np.ndarray): Row pointers of the incidence matrix.
+        indices (np.ndarray): Label codes of the incidence matrix.
+        rows (np.ndarray): Patches (rows) to gather.
+
+    Returns:
+        np.ndarray: Concatenated label codes of the patches.
+    """
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    if lengths.sum() == 0:
+        return np.zeros(0, dtype=indices.dtype)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return indices[offsets + np.arange(lengths.sum())]
+
+
+def stratified_split(
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    num_labels: int,
+    ratio_train: float = 0.8,
+    seed: int = 42,
+    assignment: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Splits multi-label patches into train and test with iterative stratification
+    (Sechidis et al.), vectorized per label.
+
+    At each step the label with the fewest unassigned patches left is picked, so the order of
+    the labels adapts to the patches assigned by the labels before. Its unassigned patches are
+    shuffled and assigned at once, each to the split which needs the label most: as many of them
+    are put into train as the label still needs to reach ratio_train of its patches in train, the
+    others into test. After each step the desired train counts and the numbers of unassigned
+    patches are updated for all labels of the newly assigned patches. Patches without labels are
+    assigned at the end to reach the overall ratio.
+    The total cost is O(labels^2) plus one pass over the incidence matrix.
+
+    Args:
+        indptr (np.ndarray): Row pointers of the incidence matrix (see build_label_incidence).
+        indices (np.ndarray): Label codes of the incidence matrix.
+        num_labels (int): Number of labels.
+        ratio_train (float): Fraction of the patches (of each label) in train.
+        seed (int): Seed of the shuffling, the split is deterministic for a given seed.
+        assignment (np.ndarray | None): Existing assignment (TRAIN, TEST or UNASSIGNED per patch).
+            Assigned patches are kept fixed and count towards the per-label ratios.
+
+    Returns:
+        np.ndarray: Assignment of each patch, TRAIN or TEST.
+    """
+    num_patches = len(indptr) - 1
+    rng = np.random.default_rng(seed)
+    keys = rng.random(num_patches)
+
+    assignment = np.full(num_patches, UNASSIGNED, dtype=np.int8) if assignment is None else assignment.astype(np.int8, copy=True)
+
+    # Label of each entry of the incidence matrix and the column (label -> patches) form
+    rows = np.repeat(np.arange(num_patches), np.diff(indptr))
+    order = np.argsort(indices, kind="stable")
+    csc_rows = rows[order]
+    csc_indptr = np.zeros(num_labels + 1, dtype=np.int64)
+    label_counts = np.bincount(indices, minlength=num_labels)
+    np.cumsum(label_counts, out=csc_indptr[1:])
+
+    # Per-label number of patches still desired in train and of unassigned patches,
+    # the patches already assigned count towards the ratios
+    desired_train = ratio_train * label_counts - np.bincount(indices[assignment[rows] == TRAIN], minlength=num_labels)
+    remaining = np.bincount(indices[assignment[rows] == UNASSIGNED], minlength=num_labels)
+
+    # Assign the patches label by label, always the label with the fewest unassigned patches left
+    while (remaining > 0).any():
+        label = int(np.argmin(np.where(remaining > 0, remaining, remaining.max() + 1)))
+        patches = csc_rows[csc_indptr[label]:csc_indptr[label + 1]]
+        patches = patches[assignment[patches] == UNASSIGNED]
+
+        # Shuffle the unassigned patches of the label
+        patches = patches[np.argsort(keys[patches], kind="stable")]
+
+        # Number of patches missing in train for the ratio of the label
+        num_train = int(np.clip(round(desired_train[label]), 0, patches.size))
+        assignment[patches[:num_train]] = TRAIN
+        assignment[patches[num_train:]] = TEST
+
+        # Update the per-label counts with all labels of the newly assigned patches
+        desired_train -= np.bincount(get_row_labels(indptr, indices, patches[:num_train]), minlength=num_labels)
+        remaining -= np.bincount(get_row_labels(indptr, indices, patches), minlength=num_labels)
+
+    # Assign the patches without labels to reach the overall ratio
+    patches = np.flatnonzero(assignment == UNASSIGNED)
+    if patches.size:
+        patches = patches[np.argsort(keys[patches], kind="stable")]
+        num_train = int(np.clip(round(ratio_train * num_patches) - (assignment == TRAIN).sum(), 0, patches.size))
+        assignment[patches[:num_train]] = TRAIN
+        assignment[patches[num_train:]] = TEST
+
+    return assignment
+
+
+def save_split(path_split_parquet: str, patch_ids: np.ndarray, assignment: np.ndarray) -> None:
+    """
+    Saves a split as a Parquet file with a "patch_id" column and a dictionary-encoded
+    (categorical) "split" column, one row per assigned patch.
+
+    Args:
+        path_split_parquet (str): Path to the Parquet file of the split.
+        patch_ids (np.ndarray): Patch IDs.
+        assignment (np.ndarray): Assignment of each patch (TRAIN, TEST or UNASSIGNED), unassigned patches are not saved.
+    """
+    mask = assignment != UNASSIGNED
+    table = pa.table({
+        "patch_id": pa.array(np.asarray(patch_ids)[mask], type=pa.string()),
+        "split": pa.DictionaryArray.from_arrays(
+            pa.array(assignment[mask], type=pa.int8()),
+            pa.array(SPLIT_NAMES, type=pa.string()),
+        ),
+    })
+
+    # Write to a temporary file first, so an interrupted write does not corrupt an existing split
+    path_tmp = f"{path_split_parquet}.tmp"
+    pq.write_table(table, path_tmp)
+    os.replace(path_tmp, path_split_parquet)
+
+
+class SplitIndex:
+    """
+    Membership index of a split saved by save_split(), mapping patch IDs to their split.
+    """
+
+    def __init__(self, path_split_parquet: str) -> None:
+        """
+        Args:
+            path_split_parquet (str): Path to the Parquet file of the split.
+
+        Raises:
+            AssertionError: If the split file is not found.
+        """
+        # Ensure the split file exists before proceeding; raise an error if not found.
+        assert os.path.isfile(path_split_parquet), f"File not found: {path_split_parquet}"
+
+        split = pq.read_table(path_split_parquet, columns=["patch_id", "split"]).to_pandas()
+        self.patch_ids = pd.Index(split["patch_id"])
+        self.assignment = pd.Categorical(split["split"], categories=SPLIT_NAMES).codes.astype(np.int8)
+
+    def __len__(self) -> int:
+        """
+        Number of patches in the split.
+        """
+        return len(self.patch_ids)
+
+    def __contains__(self, patch_id: str) -> bool:
+        """
+        Check whether a patch is part of the split.
+        """
+        return patch_id in self.patch_ids
+
+    def get_split(self, patch_id: str) -> str | None:
+        """
+        Return the split ("train" or "test") of a patch, None if the patch is not part of the split.
+        """
+        row = self.patch_ids.get_indexer([patch_id])[0]
+        return SPLIT_NAMES[self.assignment[row]] if row >= 0 else None
+
+    def get_patches(self, split: str) -> np.ndarray:
+        """
+        Return the patch IDs of a split ("train" or "test").
+
+        Raises:
+            AssertionError: If the split is unknown.
+        """
+        # Ensure the split is known
+        assert split in SPLIT_NAMES, f"Unknown split: {split}"
+
+        return self.patch_ids.to_numpy()[self.assignment == SPLIT_NAMES.index(split)]
+
+    def lookup(self, patch_ids) -> np.ndarray:
+        """
+        Return the assignment of several patches at once, vectorized with a hash lookup.
+
+        Args:
+            patch_ids: Patch IDs.
+
+        Returns:
+            np.ndarray: TRAIN, TEST, or UNASSIGNED for patches not part of the split.
+        """
+        rows = self.patch_ids.get_indexer(patch_ids)
+        return np.where(rows >= 0, self.assignment[rows], UNASSIGNED).astype(np.int8)
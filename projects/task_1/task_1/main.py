@@ -1,16 +1,39 @@
 import time
 from task_1.milestone01 import milestone01_tasks
+from task_1.metrics import export_json_lines, export_prometheus, SamplingProfiler
 
 
-def main():
+def main(
+    num_workers: int = 1,
+    print_timings: bool = False,
+    path_metrics: str | None = None,
+    path_profile: str | None = None,
+):
     # this function MUST execute the code for all tasks 
     # and print the solutions in the required format.
-    milestone01_tasks()
+    # the per-task timings are printed to stderr, they do not change the required format.
+    # the per-stage metrics are written to path_metrics (Prometheus text for .prom, JSON lines otherwise),
+    # the stacks sampled by the profiler to path_profile (collapsed format), both only if given.
+    profiler = SamplingProfiler() if path_profile is not None else None
+    if profiler is not None:
+        profiler.start()
+    try:
+        milestone01_tasks(num_workers=num_workers, print_timings=print_timings)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            profiler.export_collapsed(path_profile)
+
+    if path_metrics is not None:
+        if path_metrics.endswith(".prom"):
+            export_prometheus(path_metrics)
+        else:
+            export_json_lines(path_metrics)
 
 
 if __name__ == "__main__":
     time_start = time.time()
-    main()
+    main(print_timings=True)
     time_all_sec = time.time() - time_start
     time_all_min = time_all_sec / 60
     print(f"{time_all_min:.01f}")
@@ -0,0 +1,133 @@
+import os
+import time
+import threading
+import pandas as pd
+import pyarrow.parquet as pq
+from task_1.metrics import record, get_column_bytes
+
+
+# Default path to the metadata Parquet file
+PATH_METADATA_PARQUET = "untracked-files/milestone01/metadata.parquet"
+
+# Catalogs already loaded in this process, keyed by the path of the Parquet file
+_catalogs = {}
+
+# Lock of the catalogs, tasks of the task runner may load the catalog concurrently
+_catalogs_lock = threading.Lock()
+
+
+class MetadataCatalog:
+    """
+    Shared, column-projected access to the metadata.parquet file.
+
+    Columns are read only when a caller asks for them and are kept in memory afterwards,
+    so every column is read at most once per process. Patch IDs are indexed in a hash map
+    for O(1) lookups.
+
+    Use get_metadata_catalog() to get the catalog shared by all tasks of the process.
+    """
+
+    def __init__(self, path_metadata_parquet: str = PATH_METADATA_PARQUET) -> None:
+        """
+        Args:
+            path_metadata_parquet (str): Path to the metadata Parquet file.
+
+        Raises:
+            AssertionError: If the metadata file is not found.
+        """
+        # Ensure the metadata file exists before proceeding; raise an error if not found.
+        assert os.path.isfile(path_metadata_parquet), f"File not found: {path_metadata_parquet}"
+
+        self.path_metadata_parquet = path_metadata_parquet
+        self.column_names = pq.read_schema(path_metadata_parquet).names
+        self._columns = {}
+        self._patch_index = None
+        self._lock = threading.RLock()
+
+    def read(self, columns: list[str]) -> pd.DataFrame:
+        """
+        Return the requested columns of the metadata as a new DataFrame.
+        Columns not loaded yet are read from the Parquet file in one go.
+
+        Args:
+            columns (list[str]): Names of the columns to return.
+
+        Returns:
+            pd.DataFrame: DataFrame with the requested columns (in the requested order).
+
+        Raises:
+            AssertionError: If a column is missing in the metadata file.
+        """
+        # Ensure the requested columns exist in the metadata
+        for column in columns:
+            assert column in self.column_names, f"'{column}' column is missing in the metadata file."
+
+        # Read only the columns which are not loaded yet, concurrent callers wait for the read
+        with self._lock:
+            columns_missing = [column for column in columns if column not in self._columns]
+            if columns_missing:
+                time_start = time.perf_counter()
+                table = pd.read_parquet(path=self.path_metadata_parquet, columns=columns_missing)
+                for column in columns_missing:
+                    self._columns[column] = table[column]
+
+                # Count the file, the bytes of the read column chunks and the time to read them
+                record(
+                    "metadata.read",
+                    files_opened=1,
+                    bytes_read=get_column_bytes(pq.read_metadata(self.path_metadata_parquet), columns_missing),
+                    decode_seconds=time.perf_counter() - time_start,
+                    items=len(table),
+                )
+
+        return pd.DataFrame({column: self._columns[column] for column in columns})
+
+    @property
+    def patch_index(self) -> dict[str, int]:
+        """
+        Hashed index of the patch IDs, mapping each patch ID to its row in the metadata.
+        """
+        if self._patch_index is None:
+            with self._lock:
+                if self._patch_index is None:
+                    patch_ids = self.read(columns=["patch_id"])["patch_id"]
+                    self._patch_index = {patch_id: row for row, patch_id in enumerate(patch_ids)}
+        return self._patch_index
+
+    def __contains__(self, patch_id: str) -> bool:
+        """
+        Check in O(1) whether a patch ID is part of the metadata.
+        """
+        return patch_id in self.patch_index
+
+    def __len__(self) -> int:
+        """
+        Number of patches in the metadata.
+        """
+        return len(self.patch_index)
+
+
+def get_metadata_catalog(path_metadata_parquet: str = PATH_METADATA_PARQUET) -> MetadataCatalog:
+    """
+    Return the metadata catalog of the given Parquet file, loading it only once per process.
+
+    Args:
+        path_metadata_parquet (str): Path to the metadata Parquet file.
+
+    Returns:
+        MetadataCatalog: Catalog shared by all callers of the process.
+    """
+    path_key = os.path.abspath(path_metadata_parquet)
+    with _catalogs_lock:
+        if path_key not in _catalogs:
+            _catalogs[path_key] = MetadataCatalog(path_metadata_parquet)
+    return _catalogs[path_key]
+
+
+def clear_metadata_catalogs() -> None:
+    """
+    Drop all catalogs loaded in this process, e.g. after the metadata file was rewritten
+    or to measure a task without the columns loaded by earlier tasks.
+    """
+    with _catalogs_lock:
+        _catalogs.clear()
@@ -0,0 +1,318 @@
+import sys
+import json
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+
+# Metrics recorded per stage, counters only ever increase
+METRIC_NAMES = ["files_opened", "bytes_read", "decode_seconds", "compute_seconds", "items"]
+
+# Counters of this process, by stage and metric
+_metrics = {}
+
+# Lock of the counters, stages may be recorded by several threads
+_metrics_lock = threading.Lock()
+
+# Whether the metrics are recorded, they are cheap enough to stay enabled
+_enabled = True
+
+
+def set_metrics_enabled(enabled: bool) -> None:
+    """
+    Enable or disable the recording of the metrics.
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def record(stage: str, **values) -> None:
+    """
+    Add values to the counters of a stage.
+
+    Recording is a dictionary update under a lock, it is meant to be called once per file or
+    per batch (not per pixel or geometry), which keeps the overhead negligible. The counters are
+    per process: functions run in worker processes of a process pool are wrapped with MetricsTask
+    (see map_with_metrics), which sends the counters recorded by the worker back to the parent.
+
+    Args:
+        stage (str): Name of the stage, e.g. "raster.read".
+        **values: Values to add, by metric name (see METRIC_NAMES).
+    """
+    if not _enabled:
+        return
+    with _metrics_lock:
+        counters = _metrics.setdefault(stage, dict.fromkeys(METRIC_NAMES, 0))
+        for metric, value in values.items():
+            counters[metric] += value
+
+
+@contextmanager
+def timer(stage: str, metric: str = "compute_seconds", items: int = 0):
+    """
+    Context manager adding the wall time of its block to a time metric of a stage.
+
+    Args:
+        stage (str): Name of the stage.
+        metric (str): "compute_seconds" or "decode_seconds".
+        items (int): Number of items processed by the block.
+    """
+    time_start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, **{metric: time.perf_counter() - time_start, "items": items})
+
+
+def get_column_bytes(metadata, columns: list[str]) -> int:
+    """
+    Return the compressed size of the column chunks of the given columns in a Parquet file,
+    i.e. the bytes read when only these columns are read. Taken from the footer, no data is read.
+
+    Args:
+        metadata (pq.FileMetaData): Footer of the Parquet file.
+        columns (list[str]): Names of the (top-level) columns.
+
+    Returns:
+        int: Size in bytes.
+    """
+    return sum(
+        metadata.row_group(row_group).column(column).total_compressed_size
+        for row_group in range(metadata.num_row_groups)
+        for column in range(metadata.num_columns)
+        if metadata.row_group(row_group).column(column).path_in_schema.split(".")[0] in columns
+    )
+
+
+def merge_metrics(metrics: dict[str, dict]) -> None:
+    """
+    Add counters, e.g. recorded in a worker process, to the counters of this process.
+
+    Args:
+        metrics (dict[str, dict]): Counters by stage and metric, see get_metrics.
+    """
+    for stage, counters in metrics.items():
+        record(stage, **counters)
+
+
+def get_metrics_delta(metrics: dict[str, dict], metrics_before: dict[str, dict]) -> dict[str, dict]:
+    """
+    Return the counters recorded between two snapshots of get_metrics, stages without change are left out.
+    """
+    delta = {}
+    for stage, counters in metrics.items():
+        counters_before = metrics_before.get(stage, {})
+        values = {metric: value - counters_before.get(metric, 0) for metric, value in counters.items()}
+        if any(values.values()):
+            delta[stage] = values
+    return delta
+
+
+class MetricsTask:
+    """
+    Wraps a function run in a worker process of a process pool, the call returns the result of the
+    function and the counters recorded by it, which the parent adds to its counters with merge_metrics.
+
+    The counters are taken as the difference of the counters of the worker before and after the call,
+    so counters inherited from the parent (fork) or recorded by earlier tasks of the worker are not
+    sent twice. A worker process runs one task at a time. Must not be used with thread pools, whose
+    threads record into the counters of the parent directly.
+    """
+
+    def __init__(self, function) -> None:
+        """
+        Args:
+            function: Function to run, picklable (defined at module level).
+        """
+        self.function = function
+
+    def __call__(self, *args, **kwargs) -> tuple:
+        metrics_before = get_metrics()
+        result = self.function(*args, **kwargs)
+        return result, get_metrics_delta(get_metrics(), metrics_before)
+
+
+def map_with_metrics(executor, function, *iterables, chunksize: int = 1):
+    """
+    Like executor.map for a process pool, but the counters recorded by the function in the worker
+    processes are added to the counters of this process (see MetricsTask).
+
+    Args:
+        executor (ProcessPoolExecutor): Process pool.
+        function: Function to run, picklable (defined at module level).
+        *iterables: Arguments of the calls, as for map.
+        chunksize (int): Number of calls sent to a worker at once.
+
+    Yields:
+        Results of the calls, in order.
+    """
+    for result, metrics in executor.map(MetricsTask(function), *iterables, chunksize=chunksize):
+        merge_metrics(metrics)
+        yield result
+
+
+def get_metrics() -> dict[str, dict]:
+    """
+    Return a copy of the counters, by stage and metric.
+    """
+    with _metrics_lock:
+        return {stage: dict(counters) for stage, counters in _metrics.items()}
+
+
+def reset_metrics() -> None:
+    """
+    Reset all counters.
+    """
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def export_json_lines(file=None) -> str:
+    """
+    Export the counters as JSON lines, one object per stage with a timestamp.
+
+    Args:
+        file: File object or path the lines are appended to, not written if None.
+
+    Returns:
+        str: The JSON lines.
+    """
+    timestamp = time.time()
+    lines = "".join(
+        json.dumps({"timestamp": timestamp, "stage": stage, **counters}) + "\n"
+        for stage, counters in sorted(get_metrics().items())
+    )
+    write(file, lines)
+    return lines
+
+
+def export_prometheus(file=None, prefix: str = "task_1") -> str:
+    """
+    Export the counters in the Prometheus text exposition format, one counter per metric
+    with the stage as label, e.g. task_1_files_opened_total{stage="raster.read"} 12.
+
+    Args:
+        file: File object or path the text is written to, not written if None.
+        prefix (str): Prefix of the metric names.
+
+    Returns:
+        str: The exposition text.
+    """
+    metrics = get_metrics()
+    lines = []
+    for metric in METRIC_NAMES:
+        lines.append(f"# TYPE {prefix}_{metric}_total counter")
+        for stage, counters in sorted(metrics.items()):
+            lines.append(f'{prefix}_{metric}_total{{stage="{stage}"}} {counters[metric]}')
+    text = "\n".join(lines) + "\n"
+    write(file, text, mode="w")
+    return text
+
+
+def write(file, text: str, mode: str = "a") -> None:
+    """
+    Write text to a file object or path, nothing if file is None.
+    """
+    if file is None:
+        return
+    if isinstance(file, str):
+        with open(file, mode) as handle:
+            handle.write(text)
+    else:
+        file.write(text)
+
+
+class SamplingProfiler:
+    """
+    Opt-in sampling profiler for deep dives.
+
+    A background thread samples the call stacks of the other threads of the process at a fixed
+    interval and counts the collapsed stacks ("outer;...;inner" function names), the format of
+    flame graph tools. Sampling costs nothing while the profiler is not running.
+
+    Usage:
+        with SamplingProfiler() as profiler:
+            milestone01_task_1_4()
+        profiler.export_collapsed("profile.txt")
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        """
+        Args:
+            interval (float): Time between two samples in seconds.
+        """
+        self.interval = interval
+        self.stacks = Counter()
+        self.num_samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self) -> "SamplingProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """
+        Start sampling in a background thread.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="SamplingProfiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop sampling.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _sample(self) -> None:
+        """
+        Sample the stacks of all other threads until stopped.
+        """
+        ident_self = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == ident_self:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(f"{frame.f_code.co_name} ({frame.f_code.co_filename.rsplit('/', 1)[-1]}:{frame.f_code.co_firstlineno})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+            self.num_samples += 1
+
+    def top(self, num: int = 20) -> list[tuple[str, int]]:
+        """
+        Return the functions with the most samples on top of the stack (self time).
+
+        Args:
+            num (int): Number of functions.
+
+        Returns:
+            list[tuple[str, int]]: Function and number of samples, most samples first.
+        """
+        functions = Counter()
+        for stack, count in self.stacks.items():
+            functions[stack.rsplit(";", 1)[-1]] += count
+        return functions.most_common(num)
+
+    def export_collapsed(self, file=None) -> str:
+        """
+        Export the sampled stacks in the collapsed format ("stack count" per line).
+
+        Args:
+            file: File object or path the stacks are written to, not written if None.
+
+        Returns:
+            str: The collapsed stacks.
+        """
+        text = "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+        write(file, text, mode="w")
+        return text
@@ -2,14 +2,38 @@ from task_1.milestone01_task_1_3 import milestone01_task_1_3
 from task_1.milestone01_task_1_4 import milestone01_task_1_4
 from task_1.milestone01_task_1_5 import milestone01_task_1_5
 from task_1.milestone01_task_1_6 import milestone01_task_1_6
+from task_1.metadata_catalog import get_metadata_catalog, PATH_METADATA_PARQUET
+from task_1.task_runner import TaskRunner
 
 
-def milestone01_tasks() -> None:
-    """Function to execute milestone01 tasks."""
-    milestone01_task_1_3()
-    milestone01_task_1_4()
-    milestone01_task_1_5()
-    milestone01_task_1_6()
+def milestone01_tasks(num_workers: int = 1, print_timings: bool = False) -> None:
+    """
+    Function to execute milestone01 tasks.
+
+    The tasks are run by the task runner: the metadata table is loaded once and shared by
+    the tasks 1.3, 1.4 and 1.6, independent tasks (e.g. the raster work of 1.4 and the geometry
+    work of 1.5) run concurrently with num_workers > 1. The output is printed in the order of the tasks.
+
+    Args:
+        num_workers (int): Number of tasks run concurrently.
+        print_timings (bool): Whether to print the wall time, thread CPU time and process peak RSS of the tasks to stderr.
+    """
+    runner = TaskRunner(num_workers=num_workers)
+    runner.add("metadata", load_metadata)
+    runner.add("milestone01_task_1_3", milestone01_task_1_3, inputs=["metadata"])
+    runner.add("milestone01_task_1_4", milestone01_task_1_4, inputs=["metadata"])
+    runner.add("milestone01_task_1_5", milestone01_task_1_5)
+    runner.add("milestone01_task_1_6", milestone01_task_1_6, inputs=["metadata"])
+    runner.run(print_timings=print_timings)
+
+
+def load_metadata() -> None:
+    """
+    Load the metadata columns used by the tasks into the shared metadata catalog.
+    """
+    catalog = get_metadata_catalog(PATH_METADATA_PARQUET)
+    catalog.read(columns=["patch_id", "labels"])
+    len(catalog)
 
 
 if __name__ == "__main__":
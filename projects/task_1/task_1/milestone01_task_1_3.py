@@ -1,9 +1,19 @@
 import os
 import numpy as np
-import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from task_1.metadata_catalog import get_metadata_catalog
 
 
-def milestone01_task_1_3() -> None:
+# Seasons of the northern hemisphere, in the order of the season codes
+SEASONS = ["spring", "summer", "fall", "winter", "unknown"]
+
+# Season code of each month, index 0 stands for a missing or invalid month
+MONTH_TO_SEASON = np.array([4, 3, 3, 0, 0, 0, 1, 1, 1, 2, 2, 2, 3], dtype=np.int8)
+
+
+def milestone01_task_1_3(streaming: bool = False) -> None:
     """
     Analyze seasonal distribution and label statistics of remote sensing image patches.
 
@@ -20,53 +30,117 @@ def milestone01_task_1_3() -> None:
         average-num-labels: AVG (rounded to two decimals)
         maximum-num-labels: MAX
 
+    The statistics are computed with vectorized Arrow kernels (see count_metadata_stats).
+    In streaming mode the metadata file is processed row group by row group and the
+    counters of the row groups are merged, so the memory stays bounded by one row group.
+
+    Args:
+        streaming (bool): Whether to stream the metadata file row group by row group
+            instead of loading the columns via the shared metadata catalog.
+
     Raises:
         AssertionError: If essential files or directories are not found.
     """
     # Path to the metadata Parquet file
     path_metadata_parquet = "untracked-files/milestone01/metadata.parquet"
 
-    # Ensure the metadata file exists before proceeding; raise an error if not found.
-    assert os.path.isfile(path_metadata_parquet), f"File not found: {path_metadata_parquet}"
+    if streaming:
+        # Ensure the metadata file exists before proceeding; raise an error if not found.
+        assert os.path.isfile(path_metadata_parquet), f"File not found: {path_metadata_parquet}"
+
+        # Count each row group and merge the counters
+        parquet_file = pq.ParquetFile(path_metadata_parquet)
+        stats = new_metadata_stats()
+        for row_group in range(parquet_file.num_row_groups):
+            table = parquet_file.read_row_group(row_group, columns=["patch_id", "labels"])
+            stats = merge_metadata_stats(stats, count_metadata_stats(table["patch_id"], table["labels"]))
+    else:
+        # Read the required columns of the metadata file into a DataFrame,
+        # the catalog ensures that the file and the columns exist
+        metadata = get_metadata_catalog(path_metadata_parquet).read(columns=["patch_id", "labels"])
+        stats = count_metadata_stats(pa.array(metadata["patch_id"]), pa.array(metadata["labels"]))
+
+    # Print the total number of samples per season
+    for season, count in zip(SEASONS[:4], stats["season_counts"]):
+        print(f"{season}: {count}")
+
+    # Calculate the average and maximum number of labels
+    label_num_avg = stats["label_sum"] / stats["count"] if stats["count"] else float("nan")
+    label_num_max = stats["label_max"]
+
+    # Print the average and maximum numbers of labels
+    print(f"average-num-labels: {label_num_avg:.2f}")
+    print(f"maximum-num-labels: {label_num_max}")
+
+
+def new_metadata_stats() -> dict:
+    """
+    Return empty counters of the metadata statistics, see count_metadata_stats.
+    """
+    return {
+        "season_counts": np.zeros(len(SEASONS), dtype=np.int64),
+        "count": 0,
+        "label_sum": 0,
+        "label_max": 0,
+    }
 
-    # Read the metadata file into a DataFrame
-    metadata = pd.read_parquet(path=path_metadata_parquet)
 
-    # Assert that 'patch_id' column exists
-    assert "patch_id" in metadata.columns, "'patch_id' column is missing in the metadata file."
+def count_metadata_stats(patch_ids, labels) -> dict:
+    """
+    Count the seasons and labels of a batch of metadata rows with vectorized Arrow kernels.
 
-    # Extract the date from the "patch_id" column using a regex pattern
-    date = metadata["patch_id"].str.extract(r"(\d{8})")[0]
+    The acquisition month is sliced from the first 8-digit date of the patch ID and mapped
+    to a season with the MONTH_TO_SEASON lookup array. The number of labels of each patch is
+    computed with the list length kernel, missing label lists count as 0 labels.
+    Rows without patch ID are not counted in the label statistics.
 
-    # Convert the extracted date strings to datetime objects
-    date = pd.to_datetime(date, format="%Y%m%d", errors="coerce")
+    Args:
+        patch_ids (pa.Array | pa.ChunkedArray): Patch IDs.
+        labels (pa.Array | pa.ChunkedArray): Label lists of the patches.
 
-    # Drop rows with invalid dates (if any)
-    metadata = metadata.dropna(subset=["patch_id"])
+    Returns:
+        dict: Counters of the batch with the keys season_counts (per season code, see SEASONS),
+            count (number of patches), label_sum (total number of labels) and label_max
+            (maximum number of labels of a patch). Counters of several batches can be
+            combined with merge_metadata_stats.
+    """
+    stats = new_metadata_stats()
 
-    # Assign the corresponding season to each image based on its acquisition date
-    metadata["season"] = date.dt.month.apply(get_season)
+    # Month of the acquisition date, 0 if the patch ID contains no date
+    dates = pc.struct_field(pc.extract_regex(patch_ids, r"(?P<date>\d{8})"), [0])
+    months = pc.cast(pc.utf8_slice_codeunits(dates, 4, 6), pa.int8()).fill_null(0).to_numpy(zero_copy_only=False)
+    months = np.where((months >= 1) & (months <= 12), months, 0)
 
     # Count the number of image patches for each season
-    season_counts = {season: metadata["season"].value_counts().get(season, 0) for season in ["spring", "summer", "fall", "winter"]}
+    stats["season_counts"] += np.bincount(MONTH_TO_SEASON[months], minlength=len(SEASONS))
 
-    # Print the total number of samples per season
-    for season, count in season_counts.items():
-        print(f"{season}: {count}")
+    # Count the number of labels for each patch with a patch ID
+    label_num = pc.list_value_length(labels).fill_null(0).to_numpy(zero_copy_only=False)
+    label_num = label_num[pc.is_valid(patch_ids).to_numpy(zero_copy_only=False)]
 
-    # Count the number of labels for each patch, handling different data structures
-    metadata["label_num"] = metadata["labels"].apply(lambda x: len(x) if isinstance(x, (list, np.ndarray)) else 0)
+    stats["count"] = int(label_num.size)
+    stats["label_sum"] = int(label_num.sum())
+    stats["label_max"] = int(label_num.max()) if label_num.size else 0
+    return stats
 
-    # Assert that label counts are non-negative integers
-    assert (metadata["label_num"] >= 0).all(), "Label count contains invalid values."
 
-    # Calculate the average and maximum number of labels
-    label_num_avg = metadata["label_num"].mean()
-    label_num_max = metadata["label_num"].max()
+def merge_metadata_stats(stats_a: dict, stats_b: dict) -> dict:
+    """
+    Merge the counters of two batches of metadata rows, see count_metadata_stats.
 
-    # Print the average and maximum numbers of labels
-    print(f"average-num-labels: {label_num_avg:.2f}")
-    print(f"maximum-num-labels: {label_num_max}")
+    Args:
+        stats_a (dict): Counters of the first batch.
+        stats_b (dict): Counters of the second batch.
+
+    Returns:
+        dict: Counters of both batches.
+    """
+    return {
+        "season_counts": stats_a["season_counts"] + stats_b["season_counts"],
+        "count": stats_a["count"] + stats_b["count"],
+        "label_sum": stats_a["label_sum"] + stats_b["label_sum"],
+        "label_max": max(stats_a["label_max"], stats_b["label_max"]),
+    }
 
 
 def get_season(month: int) -> str:
@@ -1,19 +1,117 @@
 import os
+import time
+import zlib
 import rasterio
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
-from rasterio.transform import Affine
+from task_1.bands import BANDS, EXPECTED_RESOLUTIONS, get_band
+from task_1.band_stats import update_stats, merge_stats, update_histogram, histogram_stats, HISTOGRAM_BINS
+from task_1.metadata_catalog import get_metadata_catalog
+from task_1.result_cache import ResultCache
+from task_1.patch_store import PatchStore
+from task_1.retile import retile, milestone01_task_1_4_3_check
+from task_1.raster_reader import iter_bands
+from task_1.metrics import record, timer, map_with_metrics
+from task_1.dataset_scan import scan_dataset, scan_source, find_patch_dirs, SizeCheckConsumer, NoDataCheckConsumer, BandStatsConsumer, PatchIdsConsumer
+from task_1.dataset_source import DatasetSource, open_dataset_source
 
 
 def milestone01_task_1_4() -> None:
     """
     """
-    milestone01_task_1_4_1()
-    milestone01_task_1_4_2()
+    milestone01_task_1_4_fused()
     milestone01_task_1_4_3()
 
 
-def milestone01_task_1_4_1() -> None:
+def milestone01_task_1_4_fused(
+    num_workers: int = 1,
+    num_threads: int = 4,
+    path_source: str | None = None,
+) -> None:
+    """
+    Runs milestone01_task_1_4_1 and milestone01_task_1_4_2 with a single pass over the dataset
+    and prints the same results in the same format.
+
+    Every .tif file is opened and decoded once (see dataset_scan.scan_dataset) and each band is
+    fed to the size check, the NO_DATA check and the band statistics (restricted to the patches
+    of patches_for_stats.csv.gz), instead of decoding the statistics patches a second time.
+
+    Args:
+        num_workers (int): Number of worker processes used to scan the patches.
+        num_threads (int): Number of reader threads (per worker process) prefetching the bands.
+        path_source (str | None): Directory or tar archive (.tar, .tar.zst, ...) of the patches, read
+            instead of the BigEarthNet-v2.0-S2-with-errors directory. An archive is streamed in a single
+            pass and its bands are decoded in memory (see dataset_scan.scan_source), num_workers is not used.
+
+    Raises:
+        AssertionError: If essential files or directories are not found.
+    """
+    # Path to the metadata Parquet file
+    path_metadata_parquet = "untracked-files/milestone01/metadata.parquet"
+
+    # Path to the BigEarthNet-v2.0-S2-with-errors directory containing the patches
+    path_big_earth_net_errors = "untracked-files/milestone01/BigEarthNet-v2.0-S2-with-errors"
+
+    # Path to the CSV file containing patch information
+    path_patches_for_stats = "untracked-files/milestone01/patches_for_stats.csv.gz"
+
+    # Ensure the CSV file exists before proceeding; raise an error if not found.
+    assert os.path.isfile(path_patches_for_stats), f"File not found: {path_patches_for_stats}"
+
+    # Load the shared metadata catalog, it provides a hashed index of the patch IDs
+    metadata = get_metadata_catalog(path_metadata_parquet)
+
+    # Read the patches of the band statistics
+    patches_df = pd.read_csv(path_patches_for_stats, compression='gzip')
+
+    # Scan the dataset once and feed every band to all checks
+    consumers = [SizeCheckConsumer(), NoDataCheckConsumer(), BandStatsConsumer(patches_df["patch_id"])]
+    if path_source is not None and not os.path.isdir(path_source):
+        # Stream the patches from the archive, without extracting it
+        size_check, no_data_check, band_stats, patch_ids_consumer = scan_source(
+            open_dataset_source(path_source),
+            consumers + [PatchIdsConsumer()],
+            num_threads=num_threads,
+        )
+        patch_ids = patch_ids_consumer.patch_ids
+    else:
+        path_dataset = path_source if path_source is not None else path_big_earth_net_errors
+        patch_dirs = find_patch_dirs(path_dataset)
+        size_check, no_data_check, band_stats = scan_dataset(
+            path_dataset,
+            consumers,
+            num_workers=num_workers,
+            patch_dirs=patch_dirs,
+            num_threads=num_threads,
+        )
+        patch_ids = [os.path.basename(dirpath) for dirpath in patch_dirs]
+
+    # Check if the patch IDs exist in the metadata (O(1) lookup in the hashed index)
+    num_not_part_of_dataset = sum(patch_id not in metadata for patch_id in patch_ids)
+
+    # Print the results of milestone01_task_1_4_1
+    print(f"wrong-size: {size_check.report()['wrong-size']}")
+    print(f"with-no-data: {no_data_check.report()['with-no-data']}")
+    print(f"not-part-of-dataset: {num_not_part_of_dataset}")
+
+    # Ensure all bands of the statistics patches were found
+    report = band_stats.report()
+    assert not report["patches-missing"], f"Patches not found: {report['patches-missing']}"
+
+    # Print the results of milestone01_task_1_4_2
+    for band in BANDS:
+        print(f"{band} mean: {round(report[band]['mean'])}")
+        print(f"{band} std-dev: {round(report[band]['std-dev'])}")
+
+
+def milestone01_task_1_4_1(
+    num_workers: int = 1,
+    no_data_check: str = "full",
+    no_data_sample_rate: float = 0.1,
+    path_cache_db: str | None = None,
+    path_patch_store: str | None = None,
+) -> None:
     """
     Checks each remote-sensing patch in the BigEarthNet-v2.0-S2-with-errors/ directory 
     for the following issues:
@@ -27,6 +125,23 @@ def milestone01_task_1_4_1() -> None:
         with-no-data: #samples
         not-part-of-dataset: #samples
 
+    The size of the bands is taken from the GeoTIFF header, pixels are only decoded
+    for the NO_DATA check. With no_data_check="off" the function is a metadata scan.
+
+    Args:
+        num_workers (int): Number of worker processes used to check the patches.
+            With 1 (default) the patches are checked serially in the current process.
+        no_data_check (str): "full" (default) checks every patch for NO_DATA pixels,
+            "sampled" checks only a deterministic sample of the patches (with-no-data
+            then counts the sampled patches only), "off" skips the check.
+        no_data_sample_rate (float): Fraction of the patches checked with "sampled".
+        path_cache_db (str | None): Path to the persistent result cache (SQLite). If given,
+            only new or modified .tif files are opened, the results of the others are
+            taken from the cache.
+        path_patch_store (str | None): Path to a packed patch store (see pack_patch_store).
+            If given, the patches of the store are checked (vectorized) instead of the
+            .tif files; num_workers and path_cache_db are not used.
+
     Raises:
         AssertionError: If essential files or directories are not found.
     """
@@ -34,21 +149,37 @@ def milestone01_task_1_4_1() -> None:
     num_with_no_data = 0
     num_not_part_of_dataset = 0
 
-    # Define expected resolutions for each band (in pixels)
-    expected_resolutions = {
-        "B02": (120, 120), "B03": (120, 120), "B04": (120, 120), "B08": (120, 120),
-        "B05": (60, 60), "B06": (60, 60), "B07": (60, 60), "B8A": (60, 60), "B11": (60, 60), "B12": (60, 60),
-        "B01": (20, 20), "B09": (20, 20),
-    }
+    # Ensure the NO_DATA check mode is valid
+    assert no_data_check in ("full", "sampled", "off"), f"Invalid NO_DATA check: {no_data_check}"
 
     # Path to the metadata Parquet file
     path_metadata_parquet = "untracked-files/milestone01/metadata.parquet"
 
-    # Ensure the metadata file exists before proceeding; raise an error if not found.
-    assert os.path.isfile(path_metadata_parquet), f"File not found: {path_metadata_parquet}"
+    # Load the shared metadata catalog, it provides a hashed index of the patch IDs
+    metadata = get_metadata_catalog(path_metadata_parquet)
+
+    # Check the patches of the packed patch store, if requested
+    if path_patch_store:
+        store = PatchStore(path_patch_store)
+        patch_ids = store.index["patch_id"]
+
+        # Decide for each patch whether it is checked for NO_DATA pixels
+        if no_data_check == "full":
+            rows_check_no_data = np.ones(len(store), dtype=bool)
+        elif no_data_check == "sampled":
+            rows_check_no_data = np.array([is_sampled(patch_id, no_data_sample_rate) for patch_id in patch_ids], dtype=bool)
+        else:
+            rows_check_no_data = np.zeros(len(store), dtype=bool)
 
-    # Read the metadata file into a DataFrame
-    metadata = pd.read_parquet(path=path_metadata_parquet)
+        num_wrong_size = int(store.wrong_size().sum())
+        num_with_no_data = int(store.with_no_data(rows=rows_check_no_data).sum())
+        num_not_part_of_dataset = sum(patch_id not in metadata for patch_id in patch_ids)
+
+        # Print the results
+        print(f"wrong-size: {num_wrong_size}")
+        print(f"with-no-data: {num_with_no_data}")
+        print(f"not-part-of-dataset: {num_not_part_of_dataset}")
+        return
 
     # Path to the BigEarthNet-v2.0-S2-with-errors directory containing the patches
     path_big_earth_net_errors = "untracked-files/milestone01/BigEarthNet-v2.0-S2-with-errors"
@@ -56,70 +187,202 @@ def milestone01_task_1_4_1() -> None:
     # Ensure the BigEarthNets with errors directory exists before proceeding; raise an error if not found.
     assert os.path.isdir(path_big_earth_net_errors), f"Directory not found: {path_big_earth_net_errors}"
 
-    # Recursively walk through the directory to find patch files
+    # Recursively walk through the directory to find patch directories,
+    # process only directories containing .tif files (band data)
+    patch_dirs = []
+    patch_tif_files = []
     for dirpath, dirnames, filenames in os.walk(path_big_earth_net_errors):
         tif_files = [f for f in filenames if f.endswith(".tif")]
+        if tif_files:
+            patch_dirs.append(dirpath)
+            patch_tif_files.append(tif_files)
+
+    # Decide for each patch whether its pixels have to be decoded for the NO_DATA check
+    if no_data_check == "full":
+        patch_check_no_data = [True] * len(patch_dirs)
+    elif no_data_check == "sampled":
+        patch_check_no_data = [is_sampled(os.path.basename(dirpath), no_data_sample_rate) for dirpath in patch_dirs]
+    else:
+        patch_check_no_data = [False] * len(patch_dirs)
+
+    # Open the persistent result cache, if requested
+    cache = ResultCache(path_cache_db) if path_cache_db else None
+
+    # Collect the cached results of unmodified files, only the remaining band files are opened
+    patch_results = []
+    patch_tif_files_open = []
+    patch_decode_no_data = []
+    for dirpath, tif_files, check_no_data in zip(patch_dirs, patch_tif_files, patch_check_no_data):
+        results = {}
+        for tif_file in tif_files:
+            cached = cache.get(os.path.join(dirpath, tif_file)) if cache is not None else None
+            if cached is not None and cached["height"] is not None:
+                results[tif_file] = cached
+
+        # A patch flagged with-no-data by a cached band needs no further NO_DATA check,
+        # otherwise the bands not yet checked for NO_DATA pixels are opened again
+        decode_no_data = check_no_data and not any(result["has_no_data"] for result in results.values())
+        if decode_no_data:
+            results = {tif_file: result for tif_file, result in results.items() if result["has_no_data"] is not None}
+
+        patch_results.append(results)
+        patch_tif_files_open.append([f for f in tif_files if f not in results and get_band(f) in EXPECTED_RESOLUTIONS])
+        patch_decode_no_data.append(decode_no_data)
+
+    # Inspect the bands of the patches, serially or spread over a process pool
+    if num_workers > 1:
+        chunksize = max(1, len(patch_dirs) // (num_workers * 16))
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            patch_results_new = list(map_with_metrics(executor, inspect_patch, patch_dirs, patch_tif_files_open, patch_decode_no_data, chunksize=chunksize))
+    else:
+        patch_results_new = map(inspect_patch, patch_dirs, patch_tif_files_open, patch_decode_no_data)
 
-        not_part_of_dataset = False
-        with_no_data = False
-        wrong_size = False
+    # count for patches
+    for dirpath, results, results_new, check_no_data in zip(patch_dirs, patch_results, patch_results_new, patch_check_no_data):
+        # Store the results of the newly opened files in the cache
+        if cache is not None:
+            for tif_file, result in results_new.items():
+                cache.put(os.path.join(dirpath, tif_file), result)
+        results.update(results_new)
 
-        # Process only directories containing .tif files (band data)
-        if tif_files:
-            # Extract patch ID from the directory name
-            patch_id = os.path.basename(dirpath)
-
-            # Check if the patch ID exists in the metadata
-            if patch_id not in metadata["patch_id"].values:
-                not_part_of_dataset = True
-
-            # Check each .tif file for resolution and NO_DATA values
-            for tif_file in tif_files:
-                # Extract band from filename
-                band = tif_file.split(".")[0].split("_")[-1]
-                if band in expected_resolutions:
-                    expected_size = expected_resolutions[band]
-
-                    # Construct the full path to the .tif file
-                    path_tif = os.path.join(dirpath, tif_file)
-
-                    # Ensure the .tif file exists before proceeding; raise an error if not found.
-                    assert os.path.isfile(path_tif), f"File not found: {path_tif}"
-
-                    # Open the .tif file and check for errors
-                    with rasterio.open(path_tif) as src:
-                        # Read the first (only) band of the .tif file
-                        data = src.read(1)
-                        value_no_data = src.nodata
-
-                    # Check if the image has the expected resolution (size)
-                    if data.shape != expected_size:
-                        wrong_size = True
-
-                    # Check for NO_DATA values in the image
-                    if (data == value_no_data).any():
-                        with_no_data = True
-
-        # count for patches
-        if not_part_of_dataset:
+        # Extract patch ID from the directory name
+        patch_id = os.path.basename(dirpath)
+
+        # Reduce the results of the bands to the flags of the patch
+        wrong_size, with_no_data = get_patch_flags(results, check_no_data)
+
+        # Check if the patch ID exists in the metadata (O(1) lookup in the hashed index)
+        if patch_id not in metadata:
             num_not_part_of_dataset += 1
         if wrong_size:
             num_wrong_size += 1
         if with_no_data:
             num_with_no_data += 1
 
+    # Store the results in the cache
+    if cache is not None:
+        cache.close()
+
     # Print the results
     print(f"wrong-size: {num_wrong_size}")
     print(f"with-no-data: {num_with_no_data}")
     print(f"not-part-of-dataset: {num_not_part_of_dataset}")
 
 
-def milestone01_task_1_4_2() -> None:
+def inspect_patch(dirpath: str, tif_files: list[str], check_no_data: bool = True) -> dict[str, dict]:
+    """
+    Inspects the bands of a single patch for their number of pixels and for the
+    presence of NO_DATA pixels. Runs in a worker process in the parallel mode of
+    milestone01_task_1_4_1, therefore it only depends on its arguments.
+
+    The number of pixels is read from the GeoTIFF header, the pixels are only
+    decoded if check_no_data is set. Once a band with NO_DATA pixels is found, the
+    patch is flagged with-no-data and its remaining bands are not decoded any more.
+
+    Args:
+        dirpath (str): Path to the patch directory.
+        tif_files (list[str]): Filenames of the .tif files in the patch directory.
+        check_no_data (bool): Whether to decode the bands and check for NO_DATA pixels.
+
+    Returns:
+        dict[str, dict]: Results (height, width, has_no_data) for each inspected .tif file,
+            has_no_data is None if the NO_DATA check was not done.
+    """
+    results = {}
+    with_no_data = False
+
+    # Check each .tif file for resolution and NO_DATA values
+    for tif_file in tif_files:
+        # Extract band from filename
+        band = get_band(tif_file)
+        if band in EXPECTED_RESOLUTIONS:
+            # Construct the full path to the .tif file
+            path_tif = os.path.join(dirpath, tif_file)
+
+            # Ensure the .tif file exists before proceeding; raise an error if not found.
+            assert os.path.isfile(path_tif), f"File not found: {path_tif}"
+
+            # Open the .tif file and get the resolution (size) from the header
+            time_start = time.perf_counter()
+            decode = check_no_data and not with_no_data
+            with rasterio.open(path_tif) as src:
+                result = {"height": src.height, "width": src.width, "has_no_data": None}
+
+                # Read the first (only) band of the .tif file and check for NO_DATA values,
+                # until the patch is flagged with-no-data
+                if decode:
+                    data = src.read(1)
+                    result["has_no_data"] = bool((data == src.nodata).any())
+                    with_no_data = result["has_no_data"]
+
+            # Count the file, the decoded bytes (the header only without the NO_DATA check) and the time
+            record(
+                "task_1_4_1.inspect",
+                files_opened=1,
+                bytes_read=os.path.getsize(path_tif) if decode else 0,
+                decode_seconds=time.perf_counter() - time_start,
+                items=1,
+            )
+
+            results[tif_file] = result
+
+    return results
+
+
+def get_patch_flags(results: dict[str, dict], check_no_data: bool = True) -> tuple[bool, bool]:
+    """
+    Reduces the results of the bands of a patch to the wrong-size and with-no-data flags.
+
+    Args:
+        results (dict[str, dict]): Results (height, width, has_no_data) for each .tif file.
+        check_no_data (bool): Whether the with-no-data flag is requested.
+
+    Returns:
+        tuple[bool, bool]: Flags wrong-size and with-no-data of the patch.
+    """
+    # Check if the images have the expected resolution (size)
+    wrong_size = any(
+        (result["height"], result["width"]) != EXPECTED_RESOLUTIONS[get_band(tif_file)]
+        for tif_file, result in results.items()
+    )
+
+    # Check for NO_DATA values in the images
+    with_no_data = check_no_data and any(result["has_no_data"] for result in results.values())
+
+    return wrong_size, with_no_data
+
+
+def is_sampled(patch_id: str, sample_rate: float) -> bool:
+    """
+    Deterministically decides whether a patch belongs to a sample of the given rate.
+    The decision only depends on the patch ID, so repeated runs check the same patches.
+
+    Args:
+        patch_id (str): Patch ID.
+        sample_rate (float): Fraction of the patches in the sample (0-1).
+
+    Returns:
+        bool: True if the patch is part of the sample.
+    """
+    return zlib.crc32(patch_id.encode()) % 10000 < sample_rate * 10000
+
+
+def milestone01_task_1_4_2(
+    path_cache_db: str | None = None,
+    path_patch_store: str | None = None,
+    num_threads: int = 4,
+    path_source: str | None = None,
+    path_source_index: str | None = None,
+) -> None:
     """
     Calculates and prints the mean and standard deviation for each band across all patches
     based on valid (non-NO_DATA) pixel values. Uses the patches_for_stats.csv.gz file to determine
     the patches and ensures that all files are read correctly without including any NO_DATA values.
 
+    The bands are read from one of the sources (packed store, archive or .tif files, see
+    iter_stats_bands_store, iter_stats_bands_archive and get_stats_band_files) and accumulated
+    by accumulate_band_stats.
+
     Expected output format for each band:
     B01 mean: MEAN rounded to the closest integer
     B01 std-dev: Std-Dev rounded to the closest integer
@@ -127,14 +390,25 @@ def milestone01_task_1_4_2() -> None:
     B12 mean: MEAN rounded to the closest integer
     B12 std-dev: Std-Dev rounded to the closest integer
 
+    Args:
+        path_cache_db (str | None): Path to the persistent result cache (SQLite). If given,
+            the partial band accumulators of unmodified .tif files are taken from the cache
+            and only new or modified files are opened.
+        path_patch_store (str | None): Path to a packed patch store (see pack_patch_store).
+            If given, the bands are read from the store instead of the .tif files
+            and the result cache is not used.
+        num_threads (int): Number of reader threads prefetching the .tif files (see raster_reader.iter_bands).
+        path_source (str | None): Directory or tar archive (.tar, .tar.zst, ...) of the patches, read
+            instead of the BigEarthNet-v2.0-S2-with-errors directory. Only the bands of the statistics
+            patches are read from an archive (see iter_stats_bands_archive), the result cache is not
+            used for an archive.
+        path_source_index (str | None): Path to a prebuilt member-offset index of the archive (see build_tar_index).
+
     Raises:
         AssertionError: If essential files or directories are not found.
     """
     # Path to the BigEarthNet-v2.0-S2-with-errors directory containing the patches
-    path_big_earth_net_errors = "untracked-files/milestone01/BigEarthNet-v2.0-S2-with-errors"
-
-    # Ensure the BigEarthNets with errors directory exists before proceeding; raise an error if not found.
-    assert os.path.isdir(path_big_earth_net_errors), f"Directory not found: {path_big_earth_net_errors}"
+    path_big_earth_net_errors = path_source if path_source is not None else "untracked-files/milestone01/BigEarthNet-v2.0-S2-with-errors"
 
     # Path to the CSV file containing patch information
     path_patches_for_stats = "untracked-files/milestone01/patches_for_stats.csv.gz"
@@ -145,57 +419,210 @@ def milestone01_task_1_4_2() -> None:
     # Read the CSV file into a DataFrame
     patches_df = pd.read_csv(path_patches_for_stats, compression='gzip')
 
-    # List of bands to analyze
-    bands = ["B01", "B02", "B03", "B04", "B05", "B06", "B07", "B08", "B8A", "B09", "B11", "B12"]
+    cache = None
+    partials = []
+    paths_tif = {}
+    if path_patch_store:
+        # Read zero-copy views of the bands from the packed store
+        bands = iter_stats_bands_store(PatchStore(path_patch_store), patches_df)
+    elif path_source is not None and not os.path.isdir(path_source):
+        # Read the bands of the statistics patches from the archive
+        source = open_dataset_source(path_source, path_index=path_source_index)
+        bands = iter_stats_bands_archive(source, patches_df, num_threads=num_threads)
+    else:
+        # Ensure the BigEarthNets with errors directory exists before proceeding; raise an error if not found.
+        assert os.path.isdir(path_big_earth_net_errors), f"Directory not found: {path_big_earth_net_errors}"
 
-    # # Dictionary to store pixel data for each band
-    # band_stats = {band: [] for band in bands}
-    # Dictionary to store mean, variance, and count for each band
-    band_stats = {band: {'mean': 0.0, 'var': 0.0, 'count': 0} for band in bands}
+        # Open the persistent result cache, if requested
+        cache = ResultCache(path_cache_db) if path_cache_db else None
+
+        # Read the files which are not cached with the prefetching reader, the next files
+        # are read while the current one is processed
+        band_files, partials = get_stats_band_files(path_big_earth_net_errors, patches_df, cache=cache)
+        paths_tif = {(patch_id, band): path_tif for patch_id, band, path_tif in band_files}
+        bands = iter_bands(band_files, num_threads=num_threads, prefetch=4 * num_threads)
+
+    band_stats = accumulate_band_stats(bands, partials=partials, cache=cache, paths_tif=paths_tif)
+
+    # Store the partial accumulators in the cache
+    if cache is not None:
+        cache.close()
 
-    # Loop through each patch row in the DataFrame
-    for index, row in patches_df.iterrows():
-        tile = row["tile"]
-        patch_id = row["patch_id"]
+    print_band_stats(band_stats)
 
-        # Loop through each band and gather pixel values
-        for band in bands:
+
+def iter_stats_bands_store(store: PatchStore, patches_df: pd.DataFrame):
+    """
+    Yields the bands of the statistics patches from a packed patch store (see pack_patch_store).
+
+    Args:
+        store (PatchStore): Packed patch store.
+        patches_df (pd.DataFrame): Statistics patches, with the columns "tile" and "patch_id".
+
+    Yields:
+        tuple[str, str, np.ndarray, float | None]: patch_id, band, zero-copy view of the pixels and NO_DATA value.
+    """
+    for patch_id in patches_df["patch_id"]:
+        for band in BANDS:
+            yield patch_id, band, store.read_band(patch_id, band), store.nodata(patch_id, band)
+
+
+def iter_stats_bands_archive(source: DatasetSource, patches_df: pd.DataFrame, num_threads: int = 4):
+    """
+    Yields the bands of the statistics patches from an archive (see dataset_source.TarSource),
+    without decoding the bands of the other patches. The bands are read with random access
+    (one seek per file) from an uncompressed archive and picked from a single streaming pass
+    from a compressed one, which stops once all bands are found. The bands are matched by
+    filename, i.e. independent of the root directory of the archive.
+
+    Args:
+        source (DatasetSource): Source of the band files.
+        patches_df (pd.DataFrame): Statistics patches, with the columns "tile" and "patch_id".
+        num_threads (int): Number of threads decoding the bands while the archive is read.
+
+    Yields:
+        tuple[str, str, np.ndarray, float | None]: patch_id, band, pixels and NO_DATA value, in the order of the archive.
+
+    Raises:
+        AssertionError: If a band is not found in the archive.
+    """
+    # Band files to read from the archive, as (patch_id, band) by filename
+    band_members = {f"{patch_id}_{band}.tif": (patch_id, band) for patch_id in patches_df["patch_id"] for band in BANDS}
+
+    # Read only these members with random access, a compressed archive is streamed
+    if source.random_access:
+        members = source.read_members([name for name in source.list_members(suffix=".tif") if name.rpartition("/")[2] in band_members])
+    else:
+        members = source.iter_members(suffix=".tif")
+
+    def items():
+        filenames_missing = set(band_members)
+        for name, data in members:
+            filename = name.rpartition("/")[2]
+            if filename in filenames_missing:
+                filenames_missing.discard(filename)
+                yield (*band_members[filename], data)
+
+                # Stop reading the archive once all bands are found
+                if not filenames_missing:
+                    break
+        members.close()
+
+        # Ensure all bands were found in the archive
+        assert not filenames_missing, f"File not found: {sorted(filenames_missing)[0]} in the archive"
+
+    yield from iter_bands(items(), num_threads=num_threads, prefetch=4 * num_threads)
+
+
+def get_stats_band_files(
+    path_big_earth_net_errors: str,
+    patches_df: pd.DataFrame,
+    cache: ResultCache | None = None,
+) -> tuple[list[tuple[str, str, str]], list[tuple[str, tuple]]]:
+    """
+    Collects the .tif files of the bands of the statistics patches, the partial band accumulators
+    of the unmodified files are taken from the result cache instead.
+
+    Args:
+        path_big_earth_net_errors (str): Directory of the patches, with a subdirectory per tile.
+        patches_df (pd.DataFrame): Statistics patches, with the columns "tile" and "patch_id".
+        cache (ResultCache | None): Persistent result cache.
+
+    Returns:
+        tuple[list[tuple[str, str, str]], list[tuple[str, tuple]]]: Band files which have to be read,
+            as (patch_id, band, path) tuples, and the cached partial accumulators, as (band, (mean, var, count)) tuples.
+
+    Raises:
+        AssertionError: If a .tif file is not found.
+    """
+    band_files = []
+    partials = []
+
+    # Loop through each patch and each band
+    for tile, patch_id in zip(patches_df["tile"], patches_df["patch_id"]):
+        for band in BANDS:
             # Construct the path to the corresponding .tif file
             path_tif = os.path.join(path_big_earth_net_errors, tile, patch_id, f"{patch_id}_{band}.tif")
 
             # Ensure the .tif file exists before proceeding; raise an error if not found.
             assert os.path.isfile(path_tif), f"File not found: {path_tif}"
 
-            # Open the .tif file and read its pixel data
-            with rasterio.open(path_tif) as src:
-                # Read the first (only) band of the .tif file
-                data = src.read(1)
-                value_no_data = src.nodata
+            # Take the partial accumulator of the file from the cache, if it is unmodified
+            cached = cache.get(path_tif) if cache is not None else None
+            if cached is not None and cached["count"] is not None:
+                partials.append((band, (cached["mean"], cached["var"], cached["count"])))
+            else:
+                # The file has to be read
+                band_files.append((patch_id, band, path_tif))
+
+    return band_files, partials
+
 
+def accumulate_band_stats(
+    bands,
+    partials: list[tuple[str, tuple]] = (),
+    cache: ResultCache | None = None,
+    paths_tif: dict | None = None,
+) -> dict[str, tuple[float, float, int]]:
+    """
+    Accumulates the mean and the sum of squared deviations of the valid (non-NO_DATA) pixels of each band.
+
+    Args:
+        bands: Iterable of (patch_id, band, data, nodata) tuples, e.g. from iter_stats_bands_store.
+        partials (list[tuple[str, tuple]]): Partial accumulators (mean, var, count) of bands which are not
+            read, as (band, partial) tuples, e.g. from the result cache.
+        cache (ResultCache | None): Persistent result cache, the partial accumulators of the read bands are stored in it.
+        paths_tif (dict | None): Path of the .tif file of each read band, by (patch_id, band), needed with a cache.
+
+    Returns:
+        dict[str, tuple[float, float, int]]: Mean, sum of squared deviations and count of each band.
+    """
+    # Dictionary to store mean, variance, and count for each band
+    band_stats = {band: (0.0, 0.0, 0) for band in BANDS}
+
+    # Merge the partial accumulators of the bands which are not read
+    for band, partial in partials:
+        band_stats[band] = merge_stats(*band_stats[band], *partial)
+
+    for patch_id, band, data, value_no_data in bands:
+        with timer("task_1_4_2.stats", items=1):
             # Mask out NO_DATA pixels
             valid_data = data[data != value_no_data]
 
-            # Check size
-            if valid_data.size > 0:
-                # band_stats[band].append(valid_data)
-                band_stats[band]['mean'], band_stats[band]['var'], band_stats[band]['count'] = update_stats(
-                    existing_mean=band_stats[band]['mean'],
-                    existing_var=band_stats[band]['var'],
-                    count=band_stats[band]['count'],
-                    new_data=valid_data,
-                )
-
-    # Calculate and print the mean and standard deviation for each band
-    for band in bands:
+            # Partial accumulator of the band
+            partial = update_stats(existing_mean=0.0, existing_var=0.0, count=0, new_data=valid_data)
+
+        # Store the partial accumulator (and the validation results) in the cache
+        if cache is not None:
+            cache.put(paths_tif[patch_id, band], {
+                "height": data.shape[0],
+                "width": data.shape[1],
+                "has_no_data": valid_data.size != data.size,
+                "mean": partial[0],
+                "var": partial[1],
+                "count": partial[2],
+            })
+
+        band_stats[band] = merge_stats(*band_stats[band], *partial)
+
+    return band_stats
+
+
+def print_band_stats(band_stats: dict[str, tuple[float, float, int]]) -> None:
+    """
+    Calculates and prints the mean and standard deviation for each band, see accumulate_band_stats.
+    """
+    for band in BANDS:
+        mean, var, count = band_stats[band]
         # if len(band_stats[band]) > 0:
         #     # Concatenate all pixel arrays for the band and calculate statistics
         #     pixels = np.concatenate(band_stats[band])
         #     pixels_n = pixels.size
         #     pixels_mean = np.sum(pixels) / pixels_n
         #     pixels_std_dev = np.sqrt(1 / pixels_n * np.sum((pixels - pixels_mean) ** 2))
-        if band_stats[band]['count'] > 1:
-            pixels_mean = band_stats[band]['mean']
-            pixels_std_dev = np.sqrt(band_stats[band]['var'] / (band_stats[band]['count'] - 1))        
+        if count > 1:
+            pixels_mean = mean
+            pixels_std_dev = np.sqrt(var / (count - 1))
         else:
             # Default values if no valid data is found
             pixels_mean = 0
@@ -204,128 +631,127 @@ def milestone01_task_1_4_2() -> None:
         print(f"{band} std-dev: {round(pixels_std_dev)}")
 
 
-def milestone01_task_1_4_3() -> None:
+def milestone01_task_1_4_2_histogram(percentiles: tuple = (2, 98), path_patch_store: str | None = None) -> None:
     """
-    Splits a given GeoTIFF image into four equally sized, square sub-patches and 
-    exports them as new GeoTIFF files with suffixes (_A.tif, _B.tif, _C.tif, _D.tif).
-    Ensures the sub-patches retain correct geographical information and verifies this 
-    after exporting.
+    Calculates and prints exact statistics for each band across all patches of the
+    patches_for_stats.csv.gz file, based on valid (non-NO_DATA) pixel values.
 
-    Raises:
-        AssertionError: If essential files or directories are not found.
-    """
-    # Path to the original GeoTIFF file to be split
-    path_tile_original = "untracked-files/milestone01/BigEarthNet-v2.0-S2-with-errors/S2B_MSIL2A_20170808T094029_N9999_R036_T35ULA/S2B_MSIL2A_20170808T094029_N9999_R036_T35ULA_33_29/S2B_MSIL2A_20170808T094029_N9999_R036_T35ULA_33_29_B02.tif"
+    Sentinel-2 bands are uint16, therefore one histogram with a bin for each value
+    (65536 bins) is built per band in a single pass over the patches. Mean, standard
+    deviation, minimum, maximum, median and the requested percentiles (e.g. the 2/98
+    clip values for normalization) are derived from the histograms, without keeping
+    any pixel in memory.
 
-    # Ensure the .tif file exists before proceeding; raise an error if not found.
-    assert os.path.isfile(path_tile_original), f"File not found: {path_tile_original}"
+    Expected output format for each band:
+    B01 mean: MEAN rounded to the closest integer
+    B01 std-dev: Std-Dev rounded to the closest integer
+    B01 min: MIN
+    B01 max: MAX
+    B01 median: MEDIAN rounded to the closest integer
+    B01 p2: 2nd PERCENTILE rounded to the closest integer
+    B01 p98: 98th PERCENTILE rounded to the closest integer
+    ...
 
-    # Output directory to save the split patches
-    path_output_dir = "untracked-files/re-tiled"
+    Args:
+        percentiles (tuple): Percentiles (0-100) to print for each band.
+        path_patch_store (str | None): Path to a packed patch store (see pack_patch_store).
+            If given, the bands are read from the store instead of the .tif files.
 
-    # Create the output directory if it doesn't exist
-    os.makedirs(path_output_dir, exist_ok=True)
-
-    # Open the original GeoTIFF file
-    with rasterio.open(path_tile_original) as src:
-        # Read the image data into a numpy array
-        data = src.read()
-
-    # Get the dimensions of the image
-    height = data.shape[1]
-    width = data.shape[2]
-    
-    # Calculate the midpoint to split the image into 4 patches
-    if width % 2 or height % 2:
-        assert False, f"GeoTIFF file {path_tile_original} can not be equally sized."
-
-    # Calculate the midpoint to split the image into 4 patches
-    mid_x = width // 2
-    mid_y = height // 2
-
-    # Create the 4 sub-patches
-    patches = {
-        'A': (data[:, :mid_y, :mid_x], src.transform),
-        'B': (data[:, :mid_y, mid_x:], src.transform * Affine.translation(mid_x, 0)),
-        'C': (data[:, mid_y:, :mid_x], src.transform * Affine.translation(0, mid_y)),
-        'D': (data[:, mid_y:, mid_x:], src.transform * Affine.translation(mid_x, mid_y)),
-    }
-
-    # Write each patch to a new GeoTIFF file
-    for patch, (patch_data, patch_transform) in patches.items():
-
-        # Extract the base filename and extension from the original tile path
-        file_name, file_ext = os.path.splitext(os.path.basename(path_tile_original))
-
-        # Define the output filename by appending the patch name (A, B, C, D) to the original filename
-        path_output_file = os.path.join(path_output_dir, f'{file_name}_{patch}{file_ext}')
-
-        # Create a new GeoTIFF file for each patch with the appropriate metadata
-        with rasterio.open(
-            fp=path_output_file,
-            mode='w', 
-            driver='GTiff', 
-            width=patch_data.shape[2], 
-            height=patch_data.shape[1], 
-            count=src.count, 
-            crs=src.crs, 
-            transform=patch_transform,
-            dtype=src.dtypes[0], 
-        ) as dst:
-            # Write the patch data to the new GeoTIFF file
-            dst.write(patch_data)
-
-        # After writing the patch, open the new GeoTIFF file to verify its integrity
-        with rasterio.open(path_output_file) as dst:
-            # Perform integrity checks on the new GeoTIFF
-            milestone01_task_1_4_3_check(src, dst)
-
-
-def milestone01_task_1_4_3_check(src, dst) -> None:
+    Raises:
+        AssertionError: If essential files or directories are not found.
     """
-    Perform integrity checks on the original and newly generated sub-patch GeoTIFFs 
-    to ensure they retain the correct geographical information. The checks include:
+    # Path to the BigEarthNet-v2.0-S2-with-errors directory containing the patches
+    path_big_earth_net_errors = "untracked-files/milestone01/BigEarthNet-v2.0-S2-with-errors"
 
-    - Verifying that the Coordinate Reference System (CRS) matches between the source 
-      and destination images.
-    - Checking that the spatial transform is updated and consistent for each patch 
-      (ensuring accurate geographical referencing).
+    # Open the packed patch store, if requested
+    store = PatchStore(path_patch_store) if path_patch_store else None
 
-    Args:
-        src: The source raster (original tile).
-        dst: The destination raster (sub-patch).
-    """
-    # Check if the Coordinate Reference System (CRS) of the patch matches the original image
-    assert dst.crs == src.crs, f"CRS mismatch: {dst.crs} vs {src.crs}"
+    # Ensure the BigEarthNets with errors directory exists before proceeding; raise an error if not found.
+    assert store is not None or os.path.isdir(path_big_earth_net_errors), f"Directory not found: {path_big_earth_net_errors}"
 
-    # Check the affine transformation:
-    # Patch "_A.tif" should retain the original transform, others should differ.
-    if "_A.tif" in dst.name:
-        assert dst.transform == src.transform, f"Transform should be the same: {dst.transform} vs {src.transform}"
-    else:
-        assert dst.transform != src.transform, f"Transform should be different: {dst.transform} vs {src.transform}"
+    # Path to the CSV file containing patch information
+    path_patches_for_stats = "untracked-files/milestone01/patches_for_stats.csv.gz"
 
+    # Ensure the CSV file exists before proceeding; raise an error if not found.
+    assert os.path.isfile(path_patches_for_stats), f"File not found: {path_patches_for_stats}"
+
+    # Read the CSV file into a DataFrame
+    patches_df = pd.read_csv(path_patches_for_stats, compression='gzip')
 
-def update_stats(existing_mean, existing_var, count, new_data):
+    # Dictionary to store the histogram of each band
+    band_histograms = {band: np.zeros(HISTOGRAM_BINS, dtype=np.int64) for band in BANDS}
+
+    # Loop through each patch and each band and add the valid pixels to the histograms
+    for tile, patch_id in zip(patches_df["tile"], patches_df["patch_id"]):
+        for band in BANDS:
+            if store is not None:
+                # Read a zero-copy view of the band from the packed store
+                data = store.read_band(patch_id, band)
+                value_no_data = store.nodata(patch_id, band)
+            else:
+                # Construct the path to the corresponding .tif file
+                path_tif = os.path.join(path_big_earth_net_errors, tile, patch_id, f"{patch_id}_{band}.tif")
+
+                # Ensure the .tif file exists before proceeding; raise an error if not found.
+                assert os.path.isfile(path_tif), f"File not found: {path_tif}"
+
+                # Open the .tif file and read its pixel data
+                with rasterio.open(path_tif) as src:
+                    # Read the first (only) band of the .tif file
+                    data = src.read(1)
+                    value_no_data = src.nodata
+
+            # Mask out NO_DATA pixels and add the valid pixels to the histogram
+            band_histograms[band] = update_histogram(band_histograms[band], data[data != value_no_data])
+
+    # Derive and print the statistics for each band
+    for band in BANDS:
+        stats = histogram_stats(band_histograms[band], percentiles=percentiles)
+        print(f"{band} mean: {round(stats['mean'])}")
+        print(f"{band} std-dev: {round(stats['std-dev'])}")
+        print(f"{band} min: {stats['min']}")
+        print(f"{band} max: {stats['max']}")
+        print(f"{band} median: {round(stats['median'])}")
+        for percentile, value in stats["percentiles"].items():
+            print(f"{band} p{percentile:g}: {round(value)}")
+
+
+def milestone01_task_1_4_3(
+    path_tile_original: str = "untracked-files/milestone01/BigEarthNet-v2.0-S2-with-errors/S2B_MSIL2A_20170808T094029_N9999_R036_T35ULA/S2B_MSIL2A_20170808T094029_N9999_R036_T35ULA_33_29/S2B_MSIL2A_20170808T094029_N9999_R036_T35ULA_33_29_B02.tif",
+    grid: tuple[int, int] | None = (2, 2),
+    tile_size: tuple[int, int] | None = None,
+    edge: str = "pad",
+) -> None:
     """
-    Incrementally updates the mean and variance based on new data using Welford's method.
+    Splits a given GeoTIFF image into four equally sized, square sub-patches and 
+    exports them as new GeoTIFF files with suffixes (_A.tif, _B.tif, _C.tif, _D.tif).
+    Ensures the sub-patches retain correct geographical information and verifies this 
+    after exporting.
+
+    Other splits are possible with an arbitrary grid or a fixed tile size, the tiles are
+    read and written through rasterio windows (see retile). With the default edge="pad"
+    images with odd dimensions are padded with NO_DATA, so the sub-patches stay equally sized.
 
     Args:
-        existing_mean (float): Current mean value.
-        existing_var (float): Current variance value.
-        count (int): Current count of observations.
-        new_data (np.ndarray): New batch of data points.
+        path_tile_original (str): Path to the original GeoTIFF file to be split.
+        grid (tuple[int, int] | None): Number of tile rows and cols, 2x2 by default.
+        tile_size (tuple[int, int] | None): Height and width of a tile, instead of a grid.
+        edge (str): Handling of the edge tiles, "pad", "drop" or "shrink".
 
-    Returns:
-        tuple: Updated mean, variance, and count.
+    Raises:
+        AssertionError: If essential files or directories are not found.
     """
-    for x in new_data:
-        count += 1
-        delta = x - existing_mean
-        existing_mean += delta / count
-        delta2 = x - existing_mean
-        existing_var += delta * delta2
-    return existing_mean, existing_var, count
+    # Output directory to save the split patches
+    path_output_dir = "untracked-files/re-tiled"
+
+    # Split the image, write each patch to a new GeoTIFF file and verify its integrity
+    retile(
+        path_tile_original=path_tile_original,
+        path_output_dir=path_output_dir,
+        grid=None if tile_size is not None else grid,
+        tile_size=tile_size,
+        edge=edge,
+    )
 
 
 if __name__ == "__main__":
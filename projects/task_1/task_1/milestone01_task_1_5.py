@@ -1,6 +1,19 @@
+import io
 import os
+import time
 import numpy as np
 import geopandas as gpd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from task_1.overlap_partitions import find_overlapping_pairs, find_overlapping_patches_partitioned
+from task_1.footprint_index import FootprintIndex, select_overlap_candidates, REFERENCE_MAP_SUFFIX
+from task_1.metrics import record, timer, get_column_bytes, map_with_metrics
+from task_1.dataset_source import DirectorySource, open_dataset_source
+
+
+# List of class IDs corresponding to "UNLABELED" labels
+UNLABELED_CLASS_IDS = [122, 123, 124, 131, 132, 133, 141, 142, 332, 334, 335, 423, 999]
 
 
 def milestone01_task_1_5() -> None:
@@ -10,57 +23,68 @@ def milestone01_task_1_5() -> None:
     milestone01_task_1_5_2()
 
 
-def milestone01_task_1_5_1() -> None:
+def milestone01_task_1_5_1(
+    num_workers: int = 1,
+    use_processes: bool = False,
+    path_source: str | None = None,
+) -> None:
     """
     This function processes GeoParquet files in the specified directory to extract 
     the multi-label set associated with each patch, omitting the "UNLABELED" labels. 
     It calculates the average number of labels per patch and prints the result rounded 
     to two decimal places.
 
+    Only the "DN" column is read from the files (as plain Parquet), the geometries are
+    neither read nor decoded. The files can be read concurrently by a pool of threads
+    (the Parquet reader releases the GIL) or processes.
+
     Expected output format:
     geom-average-num-labels: AVG rounded to two decimals
 
+    Args:
+        num_workers (int): Number of workers reading the files, 1 reads them serially.
+        use_processes (bool): Whether to use a process pool instead of a thread pool.
+        path_source (str | None): Directory or tar archive (.tar, .tar.zst, ...) of the reference maps,
+            read instead of the geoparquets directory. An archive is streamed in a single pass and
+            the files are read in memory, num_workers is then not used.
+
     Raises:
         AssertionError: If essential files or directories are not found.
     """
 
-    # Directory containing the GeoParquet files
-    path_geoparquets_dir = "untracked-files/milestone01/geoparquets"
-
-    # Ensure the geoparquet directory exists before proceeding; raise an error if not found.
-    assert os.path.isdir(path_geoparquets_dir), f"Directory not found: {path_geoparquets_dir}"
-
-    # List to store the count of valid labels per patch
-    num_labels_unique = []
+    # Stream the reference maps from the archive, without extracting it
+    if path_source is not None and not os.path.isdir(path_source):
+        source = open_dataset_source(path_source)
+        num_labels_unique = [
+            count_labels(name, data=data)
+            for name, data in source.iter_members(suffix=REFERENCE_MAP_SUFFIX)
+        ]
+    else:
+        # Directory containing the GeoParquet files
+        path_geoparquets_dir = path_source if path_source is not None else "untracked-files/milestone01/geoparquets"
 
-    # List of class IDs corresponding to "UNLABELED" labels
-    unlabeld_class_ids = {122, 123, 124, 131, 132, 133, 141, 142, 332, 334, 335, 423, 999}
+        # Ensure the geoparquet directory exists before proceeding; raise an error if not found.
+        assert os.path.isdir(path_geoparquets_dir), f"Directory not found: {path_geoparquets_dir}"
 
-    # Loop through each file in the GeoParquet directory
-    for filename in os.listdir(path_geoparquets_dir):
         # Process only files with a _reference_map.parquet extension
-        if filename.endswith("_reference_map.parquet"):
-            # Construct full path to the current GeoParquet file
-            file_path = os.path.join(path_geoparquets_dir, filename)
-
-            # Ensure the metadata file exists before proceeding; raise an error if not found.
-            assert os.path.isfile(file_path), f"File not found: {file_path}"
-
-            # Load the GeoParquet file into a GeoDataFrame
-            gdf = gpd.read_parquet(file_path)
-
-            # Assert the "DN" column exists in the GeoDataFrame
-            assert "DN" in gdf.columns, f"Column 'DN' missing in file: {file_path}"
-
-            # Extract the "DN" column, which contains label IDs
-            labels = gdf["DN"]
-
-            # Filter out "UNLABELED" labels and count valid unique labels for this patch
-            valid_labels = labels[~np.isin(labels, unlabeld_class_ids)]
-            labels_unique = np.unique(valid_labels)
-
-            # Add the count of unique valid labels to the list
-            num_labels_unique.append(len(labels_unique))
+        file_paths = [
+            os.path.join(path_geoparquets_dir, filename)
+            for filename in os.listdir(path_geoparquets_dir)
+            if filename.endswith("_reference_map.parquet")
+        ]
+
+        # Count the valid unique labels per patch, serially or spread over a pool
+        if num_workers > 1:
+            if use_processes:
+                # The counters recorded in the worker processes are sent back with the results
+                chunksize = max(1, len(file_paths) // (num_workers * 16))
+                with ProcessPoolExecutor(max_workers=num_workers) as executor:
+                    num_labels_unique = list(map_with_metrics(executor, count_labels, file_paths, chunksize=chunksize))
+            else:
+                with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                    num_labels_unique = list(executor.map(count_labels, file_paths))
+        else:
+            num_labels_unique = list(map(count_labels, file_paths))
 
     # Ensure there were valid patches processed
     assert num_labels_unique, "No valid patches processed in the directory."
@@ -76,69 +100,177 @@ def milestone01_task_1_5_1() -> None:
     print(f"geom-average-num-labels: {average_num_labels:.2f}")
 
 
-def milestone01_task_1_5_2() -> None:
+def count_labels(file_path: str, data: bytes | None = None) -> int:
+    """
+    Counts the valid (not "UNLABELED") unique labels of a patch in its reference map.
+    Only the "DN" column is read, without decoding the geometries.
+
+    Args:
+        file_path (str): Path to the _reference_map.parquet file of the patch.
+        data (bytes | None): Content of the file, e.g. read from a dataset archive (see dataset_source),
+            file_path is then only used as name of the file.
+
+    Returns:
+        int: Number of valid unique labels.
+
+    Raises:
+        AssertionError: If the file or its "DN" column is not found.
+    """
+    # Ensure the GeoParquet file exists before proceeding; raise an error if not found.
+    assert data is not None or os.path.isfile(file_path), f"File not found: {file_path}"
+
+    # Open the file as plain Parquet file, from memory if its content is given
+    time_start = time.perf_counter()
+    parquet_file = pq.ParquetFile(pa.BufferReader(data) if data is not None else file_path)
+
+    # Assert the "DN" column exists in the file
+    assert "DN" in parquet_file.schema_arrow.names, f"Column 'DN' missing in file: {file_path}"
+
+    # Read only the "DN" column, which contains label IDs
+    labels = parquet_file.read(columns=["DN"]).column("DN").to_numpy()
+
+    # Count the file, the bytes of the "DN" column chunks and the time to read them
+    record(
+        "task_1_5_1.read",
+        files_opened=1,
+        bytes_read=get_column_bytes(parquet_file.metadata, ["DN"]),
+        decode_seconds=time.perf_counter() - time_start,
+        items=len(labels),
+    )
+
+    # Filter out "UNLABELED" labels and count valid unique labels for this patch
+    valid_labels = labels[~np.isin(labels, UNLABELED_CLASS_IDS)]
+    return len(np.unique(valid_labels))
+
+
+def milestone01_task_1_5_2(
+    predicate: str = "interior",
+    partition_size: float | None = None,
+    num_workers: int = 1,
+    path_footprint_index: str | None = None,
+    path_source: str | None = None,
+    path_source_index: str | None = None,
+) -> None:
     """
     This function processes GeoParquet files to count overlapping patches based on their geometries.
     Patches are considered overlapping if they share any interior point. Each patch is counted only once
     for overlaps.
 
-    The task uses a spatial index to efficiently find overlapping geometries and count the unique overlaps.
+    The task uses a spatial index to efficiently find overlapping geometries and count the unique overlaps:
+    all geometries are queried against the index in a single bulk call (see find_overlapping_pairs) and the
+    patches of the resulting index pairs are reduced with NumPy.
+
+    Args:
+        predicate (str): "interior" (default) counts geometries sharing an interior point,
+            "intersects" also counts geometries which only touch at their edges.
+        partition_size (float | None): If given, the overlaps are found out-of-core: the geometries
+            are partitioned into grid cells of this size (in units of the CRS, e.g. meters) and
+            the partitions are processed by parallel workers (see find_overlapping_patches_partitioned).
+            The result is the same as without partitioning.
+        num_workers (int): Number of worker processes of the out-of-core mode.
+        path_footprint_index (str | None): Path to a persistent footprint index (see build_footprint_index).
+            If given, only the candidates of the index (see select_overlap_candidates) are loaded,
+            since only they can have overlapping geometries. Not used with a compressed archive.
+        path_source (str | None): Directory or tar archive (.tar, .tar.zst, ...) of the reference maps,
+            read instead of the geoparquets directory. The files of an archive are read in memory, it can
+            not be combined with partition_size. A compressed archive is streamed in a single pass, the
+            candidates of an uncompressed archive are read with random access (one seek per file).
+        path_source_index (str | None): Path to a prebuilt member-offset index of the archive (see build_tar_index).
 
     Raises:
         AssertionError: If essential files or directories are not found.    
     """
-    # Directory containing the GeoParquet files
-    path_geoparquets_dir = "untracked-files/milestone01/geoparquets"
-
-    # Ensure the geoparquet directory exists before proceeding; raise an error if not found.
-    assert os.path.isdir(path_geoparquets_dir), f"Directory not found: {path_geoparquets_dir}"
+    # Read the reference maps from the archive, without extracting it
+    if path_source is not None and not os.path.isdir(path_source):
+        # Ensure the out-of-core mode is not requested, its workers read the files by path
+        assert partition_size is None, f"The out-of-core mode requires a directory of GeoParquet files: {path_source}"
+
+        source = open_dataset_source(path_source, path_index=path_source_index)
+        if path_footprint_index is not None and source.random_access:
+            # Read only the candidates of the footprint index, with random access
+            names = select_overlap_candidates(source, source.list_members(suffix=REFERENCE_MAP_SUFFIX), FootprintIndex(path_footprint_index), predicate=predicate)
+            files = source.read_members(names)
+        else:
+            # Stream all reference maps in a single pass
+            files = source.iter_members(suffix=REFERENCE_MAP_SUFFIX)
+    else:
+        # Directory containing the GeoParquet files
+        path_geoparquets_dir = path_source if path_source is not None else "untracked-files/milestone01/geoparquets"
 
-    # List to store the geometries and corresponding patch names
-    geometries = []
-    patches = []
+        # Ensure the geoparquet directory exists before proceeding; raise an error if not found.
+        assert os.path.isdir(path_geoparquets_dir), f"Directory not found: {path_geoparquets_dir}"
 
-    # Loop through each GeoParquet file in the directory
-    for filename in os.listdir(path_geoparquets_dir):
         # Only process GeoParquet files
-        if filename.endswith("_reference_map.parquet"):
-            # Construct full path to the current GeoParquet file
-            file_path = os.path.join(path_geoparquets_dir, filename)
-
-            # Ensure the metadata file exists before proceeding; raise an error if not found.
-            assert os.path.isfile(file_path), f"File not found: {file_path}"
+        filenames = [filename for filename in os.listdir(path_geoparquets_dir) if filename.endswith(REFERENCE_MAP_SUFFIX)]
 
-            # Load the GeoParquet file into a GeoDataFrame
-            gdf = gpd.read_parquet(file_path)
+        # Skip the patches which can not overlap according to the footprint index
+        if path_footprint_index is not None:
+            filenames = select_overlap_candidates(DirectorySource(path_geoparquets_dir), filenames, FootprintIndex(path_footprint_index), predicate=predicate)
+        files = ((os.path.join(path_geoparquets_dir, filename), None) for filename in filenames)
 
-            # Assert the "geometry" column exists in the GeoDataFrame
-            assert "geometry" in gdf.columns, f"Column 'geometry' missing in file: {file_path}"
+    # Find the overlapping patches out-of-core, without loading all geometries into memory
+    if partition_size is not None:
+        file_paths = [os.path.join(path_geoparquets_dir, filename) for filename in filenames]
 
-            # Add geometries and corresponding patch names
-            geometries.extend(gdf["geometry"])
-            patches.extend([filename] * len(gdf))
+        # Ensure there are files to process (all patches may be skipped by the footprint index)
+        assert file_paths or path_footprint_index is not None, "No geometries were loaded for processing."
 
-    # Ensure there are geometries to process
-    assert geometries, "No geometries were loaded for processing."
+        overlaps = find_overlapping_patches_partitioned(
+            file_paths=file_paths,
+            cell_size=partition_size,
+            predicate=predicate,
+            num_workers=num_workers,
+        )
 
-    # Create a GeoDataFrame to use its spatial index
-    gdf_all = gpd.GeoDataFrame(geometry=geometries)
+        # Print the result: number of unique overlaps
+        print(f"geom-num-overlaps: {len(overlaps)}")
+        return
 
-    # Use the spatial index for efficient overlap checks
-    sindex = gdf_all.sindex
-
-    # Set to track unique overlapping patches
-    overlaps = set()
-
-    # Compare each geometry with others using the spatial index
-    for i, geom in enumerate(geometries):
-        # Query the spatial index to find potential overlapping geometries
-        possible_matches_index = list(sindex.intersection(geom.bounds))
-        for j in possible_matches_index:
-            # Ensure not comparing the same patch with itself
-            if i != j and geom.intersects(geometries[j]):
-                # Add the overlapping patch
-                overlaps.add(patches[i])
-                overlaps.add(patches[j])
+    # Lists to store the geometries and the number of geometries of each patch
+    geometries = []
+    num_geometries = []
+
+    # Loop through each GeoParquet file, given by its path or its content (read from an archive)
+    for file_path, data in files:
+        # Ensure the metadata file exists before proceeding; raise an error if not found.
+        assert data is not None or os.path.isfile(file_path), f"File not found: {file_path}"
+
+        # Load the GeoParquet file into a GeoDataFrame
+        time_start = time.perf_counter()
+        gdf = gpd.read_parquet(io.BytesIO(data) if data is not None else file_path)
+
+        # Count the file, its bytes and the time to read it
+        record(
+            "task_1_5_2.read",
+            files_opened=1,
+            bytes_read=len(data) if data is not None else os.path.getsize(file_path),
+            decode_seconds=time.perf_counter() - time_start,
+            items=len(gdf),
+        )
+
+        # Assert the "geometry" column exists in the GeoDataFrame
+        assert "geometry" in gdf.columns, f"Column 'geometry' missing in file: {file_path}"
+
+        # Add geometries and their number for the patch
+        geometries.append(gdf["geometry"].to_numpy())
+        num_geometries.append(len(gdf))
+
+    # Ensure there are geometries to process (all patches may be skipped by the footprint index)
+    assert sum(num_geometries) or path_footprint_index is not None, "No geometries were loaded for processing."
+    if not sum(num_geometries):
+        print("geom-num-overlaps: 0")
+        return
+
+    # Array of all geometries and the patch (index of the file) of each geometry
+    geometries = np.concatenate(geometries)
+    patches = np.repeat(np.arange(len(num_geometries)), num_geometries)
+
+    # Find the pairs of overlapping geometries with a single bulk query of the spatial index
+    with timer("task_1_5_2.overlaps", items=len(geometries)):
+        left, right = find_overlapping_pairs(geometries, predicate=predicate)
+
+    # Unique overlapping patches
+    overlaps = np.unique(patches[np.concatenate([left, right])])
 
     # Print the result: number of unique overlaps
     print(f"geom-num-overlaps: {len(overlaps)}")
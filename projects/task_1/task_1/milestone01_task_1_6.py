@@ -1,67 +1,74 @@
 import os
-import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from task_1.metadata_catalog import get_metadata_catalog
+from task_1.metrics import timer
+from task_1.label_split import build_label_incidence, stratified_split, save_split, SplitIndex, TRAIN, TEST
 
 
-def milestone01_task_1_6(save_png: bool = False) -> None:
+def milestone01_task_1_6(save_png: bool = False, seed: int = 42, incremental: bool = False) -> None:
     """
+    Splits the patches of the metadata into train and test (80/20) so that the label
+    distribution is similar in both splits, and saves the split to untracked-files/split.csv
+    and, in columnar form (patch_id + categorical split), to untracked-files/split.parquet.
+
+    The split is built on the sparse patch x label incidence matrix with a vectorized
+    iterative stratification (see label_split.stratified_split), so the runtime scales with
+    the number of (patch, label) entries instead of labels x patches.
+
+    Args:
+        save_png (bool): Whether to save a plot of the label distribution to untracked-files/split.png.
+        seed (int): Seed of the shuffling, the split is deterministic for a given seed.
+        incremental (bool): Whether to keep the assignments of an existing split.parquet and assign
+            only the patches added since then. Patches removed from the metadata are dropped.
+
+    Raises:
+        AssertionError: If essential files or directories are not found.
     """
     # Path to the metadata Parquet file
     path_metadata_parquet = "untracked-files/milestone01/metadata.parquet"
 
-    # Ensure the metadata file exists before proceeding; raise an error if not found.
-    assert os.path.isfile(path_metadata_parquet), f"File not found: {path_metadata_parquet}"
-
-    # Read the metadata file into a DataFrame
-    metadata = pd.read_parquet(path=path_metadata_parquet)
-
-    # Ensure the "labels" and "patch_id" columns exist in the metadata
-    assert "labels" in metadata.columns, "Missing 'labels' column in metadata"
-    assert "patch_id" in metadata.columns, "Missing 'patch_id' column in metadata"
+    # Read the "labels" and "patch_id" columns of the metadata file into a DataFrame,
+    # the catalog ensures that the file and the columns exist
+    metadata = get_metadata_catalog(path_metadata_parquet).read(columns=["patch_id", "labels"])
 
     # Train/test split ratio
     ratio_train = 0.8
 
-    # Initialize train and test sets
-    patches_train = set()
-    patches_test = set()
-
-    # Extract unique labels
-    labels_all = np.unique([label for sublist in metadata["labels"] for label in sublist])
-    
-    # Iterate through each label
-    for label in labels_all:
-        # Find patches associated with this label
-        patches_with_label = metadata[metadata["labels"].apply(lambda x: label in x)]["patch_id"]
-        
-        # Shuffle patches for reproducibility
-        shuffled_patches = patches_with_label.sample(frac=1, random_state=42).reset_index(drop=True)
-
-        # Determine split indices
-        split_idx = int(len(shuffled_patches) * ratio_train)
-
-        # Assign patches to train and test, avoiding overlaps
-        for patch in shuffled_patches[:split_idx]:
-            # Ensure patch is not already in test
-            if patch not in patches_test:
-                patches_train.add(patch)
-        for patch in shuffled_patches[split_idx:]:
-            # Ensure patch is not already in train
-            if patch not in patches_train:
-                patches_test.add(patch)
-
-    # DataFrame létrehozása a train/test split-hez
-    split_df = pd.DataFrame({
-        "train": pd.Series(list(patches_train)),
-        "test": pd.Series(list(patches_test))
-    })
+    # Build the sparse patch x label incidence matrix
+    with timer("task_1_6.incidence", items=len(metadata)):
+        indptr, indices, label_names = build_label_incidence(metadata["labels"])
 
     path_untracked_files = "untracked-files"
 
     # Ensure the BigEarthNets with errors directory exists before proceeding; raise an error if not found.
     assert os.path.isdir(path_untracked_files), f"Directory not found: {path_untracked_files}"
 
+    # Construct the path to the corresponding .parquet file
+    path_split_parquet = os.path.join(path_untracked_files, "split.parquet")
+
+    # Existing assignment of the patches, kept fixed in incremental mode
+    assignment = None
+    if incremental and os.path.isfile(path_split_parquet):
+        assignment = SplitIndex(path_split_parquet).lookup(metadata["patch_id"])
+
+    # Assign each (new) patch to train or test with iterative stratification
+    with timer("task_1_6.split", items=len(metadata)):
+        assignment = stratified_split(indptr, indices, len(label_names), ratio_train=ratio_train, seed=seed, assignment=assignment)
+
+    # Save the split in columnar form
+    save_split(path_split_parquet, metadata["patch_id"].to_numpy(), assignment)
+
+    # Patches of the train and test split
+    patches_train = metadata["patch_id"].to_numpy()[assignment == TRAIN]
+    patches_test = metadata["patch_id"].to_numpy()[assignment == TEST]
+
+    # DataFrame létrehozása a train/test split-hez
+    split_df = pd.DataFrame({
+        "train": pd.Series(patches_train),
+        "test": pd.Series(patches_test)
+    })
+
     # Construct the path to the corresponding .csv file
     path_split_csv = os.path.join(path_untracked_files, "split.csv")
 
@@ -92,3 +99,4 @@ def milestone01_task_1_6(save_png: bool = False) -> None:
 if __name__ == "__main__":
     milestone01_task_1_6()
     # milestone01_task_1_6(save_png=True)
+    # milestone01_task_1_6(incremental=True)
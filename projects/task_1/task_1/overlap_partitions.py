@@ -0,0 +1,187 @@
+import os
+import shutil
+import tempfile
+import shapely
+import numpy as np
+import pyarrow as pa
+import geopandas as gpd
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor
+from task_1.metrics import map_with_metrics
+
+
+def find_overlapping_pairs(geometries: np.ndarray, predicate: str = "interior") -> tuple[np.ndarray, np.ndarray]:
+    """
+    Finds all pairs of different geometries satisfying a spatial predicate, with a single bulk
+    query of a spatial index (STRtree) for all geometries.
+
+    Args:
+        geometries (np.ndarray): Array of shapely geometries.
+        predicate (str): "interior" for geometries sharing an interior point (DE-9IM interior/interior
+            intersection, i.e. touching edges do not count), or a predicate of the spatial index
+            such as "intersects" or "overlaps".
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Indices of the first and second geometry of each pair,
+            every unordered pair is returned once (first index < second index).
+    """
+    # Build the spatial index and query it with all geometries at once
+    sindex = gpd.GeoSeries(geometries).sindex
+    left, right = sindex.query(geometries, predicate="intersects" if predicate == "interior" else predicate)
+
+    # Keep each pair of different geometries once
+    mask = left < right
+    left, right = left[mask], right[mask]
+
+    # Keep only the pairs sharing an interior point
+    if predicate == "interior":
+        mask = shapely.relate_pattern(geometries[left], geometries[right], "T********")
+        left, right = left[mask], right[mask]
+
+    return left, right
+
+
+def find_overlapping_patches_partitioned(
+    file_paths: list[str],
+    cell_size: float,
+    predicate: str = "interior",
+    num_workers: int = 1,
+    files_per_chunk: int = 256,
+    path_tmp_dir: str | None = None,
+) -> np.ndarray:
+    """
+    Finds the patches with overlapping geometries out-of-core, for geometry sets which do not
+    fit into the memory of a single process.
+
+    The work is split into two parallel passes over a temporary directory:
+        1. Partition: chunks of GeoParquet files are read by the workers and each geometry is
+           written (as WKB) into the partition of every grid cell its bounding box touches.
+           Like the in-memory mode of milestone01_task_1_5_2, the geometries are compared by
+           their coordinates, independent of their CRS.
+        2. Overlap: every partition is processed by a worker which builds its own spatial index
+           (see find_overlapping_pairs). A pair found in several partitions is only kept in the
+           partition containing the lower left corner of the intersection of the two bounding
+           boxes, so every pair is reported exactly once.
+
+    Args:
+        file_paths (list[str]): Paths to the GeoParquet files, one file per patch.
+        cell_size (float): Size of the grid cells (in units of the CRS, e.g. meters).
+        predicate (str): Predicate of the overlap, see find_overlapping_pairs.
+        num_workers (int): Number of worker processes, 1 processes everything in the current process.
+        files_per_chunk (int): Number of files partitioned by a worker at once.
+        path_tmp_dir (str | None): Directory for the temporary partitions, the system default if None.
+
+    Returns:
+        np.ndarray: Indices (into file_paths) of the patches overlapping another patch.
+
+    Raises:
+        AssertionError: If the cell size is invalid.
+    """
+    # Ensure the cell size is valid
+    assert cell_size > 0, f"Invalid cell size: {cell_size}"
+
+    path_partitions_dir = tempfile.mkdtemp(prefix="partitions_", dir=path_tmp_dir)
+    try:
+        # Pass 1: partition the geometries of chunks of files
+        chunks = [
+            list(enumerate(file_paths[start:start + files_per_chunk], start))
+            for start in range(0, len(file_paths), files_per_chunk)
+        ]
+        args = [(chunk_idx, chunk, cell_size, path_partitions_dir) for chunk_idx, chunk in enumerate(chunks)]
+        partitions = set()
+        for chunk_partitions in _map(_partition_files, args, num_workers):
+            partitions.update(chunk_partitions)
+
+        # Pass 2: find the overlapping pairs in each partition
+        args = [(os.path.join(path_partitions_dir, partition), cell_size, predicate) for partition in sorted(partitions)]
+        pairs = list(_map(_find_partition_overlaps, args, num_workers))
+    finally:
+        shutil.rmtree(path_partitions_dir, ignore_errors=True)
+
+    # Unique overlapping patches
+    if not pairs:
+        return np.zeros(0, dtype=np.int64)
+    return np.unique(np.concatenate(pairs))
+
+
+def _map(function, args: list[tuple], num_workers: int):
+    """
+    Apply a function to a list of argument tuples, serially or spread over a process pool.
+    """
+    if num_workers > 1:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            yield from map_with_metrics(executor, function, *zip(*args)) if args else []
+    else:
+        for arg in args:
+            yield function(*arg)
+
+
+def _partition_files(chunk_idx: int, chunk: list[tuple[int, str]], cell_size: float, path_partitions_dir: str) -> set[str]:
+    """
+    Assign the geometries of a chunk of files to the grid cells and write one fragment
+    per partition. Runs in a worker process of find_overlapping_patches_partitioned.
+
+    Returns:
+        set[str]: Names of the partitions written.
+    """
+    fragments = {}
+
+    for file_idx, file_path in chunk:
+        # Ensure the GeoParquet file exists before proceeding; raise an error if not found.
+        assert os.path.isfile(file_path), f"File not found: {file_path}"
+
+        # Load the geometries of the GeoParquet file
+        gdf = gpd.read_parquet(file_path, columns=["geometry"])
+        if gdf.empty:
+            continue
+        geometries = gdf["geometry"].to_numpy()
+
+        # Range of grid cells touched by the bounding box of each geometry
+        bounds = shapely.bounds(geometries)
+        cells_min = np.floor(bounds[:, :2] / cell_size).astype(np.int64)
+        cells_max = np.floor(bounds[:, 2:] / cell_size).astype(np.int64)
+        wkb = shapely.to_wkb(geometries)
+
+        for geom_idx in range(len(geometries)):
+            for cell_x in range(cells_min[geom_idx, 0], cells_max[geom_idx, 0] + 1):
+                for cell_y in range(cells_min[geom_idx, 1], cells_max[geom_idx, 1] + 1):
+                    fragment = fragments.setdefault(f"{cell_x}_{cell_y}", ([], []))
+                    fragment[0].append(wkb[geom_idx])
+                    fragment[1].append(file_idx)
+
+    # Write one fragment per partition
+    for partition, (wkb, file_idx) in fragments.items():
+        path_partition = os.path.join(path_partitions_dir, partition)
+        os.makedirs(path_partition, exist_ok=True)
+        table = pa.table({"wkb": pa.array(wkb, type=pa.binary()), "file_idx": pa.array(file_idx, type=pa.int64())})
+        pq.write_table(table, os.path.join(path_partition, f"{chunk_idx}.parquet"))
+
+    return set(fragments)
+
+
+def _find_partition_overlaps(path_partition: str, cell_size: float, predicate: str) -> np.ndarray:
+    """
+    Find the overlapping pairs of a partition and return the patches of the pairs this
+    partition is responsible for. Runs in a worker process of find_overlapping_patches_partitioned.
+
+    Returns:
+        np.ndarray: Indices of the files of the overlapping geometries.
+    """
+    # Cell of the partition, from its name "<cell_x>_<cell_y>"
+    cell_x, cell_y = os.path.basename(path_partition).split("_")
+
+    # Read all fragments of the partition
+    table = pq.read_table(path_partition)
+    geometries = shapely.from_wkb(table.column("wkb").to_numpy(zero_copy_only=False))
+    file_idx = table.column("file_idx").to_numpy()
+
+    left, right = find_overlapping_pairs(geometries, predicate=predicate)
+
+    # Keep only the pairs whose reference point (lower left corner of the intersection
+    # of the bounding boxes) lies in the cell of this partition
+    bounds = shapely.bounds(geometries)
+    reference = np.maximum(bounds[left, :2], bounds[right, :2])
+    cells = np.floor(reference / cell_size).astype(np.int64)
+    mask = (cells[:, 0] == int(cell_x)) & (cells[:, 1] == int(cell_y))
+
+    return np.concatenate([file_idx[left[mask]], file_idx[right[mask]]])
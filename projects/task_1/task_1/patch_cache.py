@@ -0,0 +1,230 @@
+import os
+import glob
+import contextlib
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from task_1.bands import EXPECTED_RESOLUTIONS, get_band
+from task_1.raster_reader import read_band_file
+
+
+class PatchCache:
+    """
+    In-memory LRU cache of decoded patch bands, keyed by patch ID and bounded by a byte budget.
+
+    Each entry holds the decoded bands of a patch (pixels and NO_DATA value per band). When the
+    total size of the cached pixels exceeds max_bytes, the least recently used patches are evicted.
+    An optional second tier stores every decoded band as a .npy file in path_cache_dir, which is
+    memory-mapped on a hit, so evicted patches (and patches decoded by earlier runs) are not
+    decoded again. Memory-mapped bands are not kept in the in-memory tier, their pages belong to
+    the page cache of the OS and do not count against the byte budget.
+
+    Like in ResultCache, a band is only served from either tier for the same source file: the
+    entries are keyed by the absolute path, size and modification time of the .tif file as well,
+    so a modified file or another dataset with the same patch IDs is decoded again.
+
+    The cache is thread-safe, the bands are decoded outside of the lock.
+    """
+
+    def __init__(self, max_bytes: int = 512 * 2**20, path_cache_dir: str | None = None) -> None:
+        """
+        Args:
+            max_bytes (int): Byte budget of the in-memory tier.
+            path_cache_dir (str | None): Directory of the on-disk tier, no on-disk tier if None.
+        """
+        # Create the directory of the on-disk tier if it doesn't exist
+        if path_cache_dir is not None:
+            os.makedirs(path_cache_dir, exist_ok=True)
+
+        self.max_bytes = max_bytes
+        self.path_cache_dir = path_cache_dir
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """
+        Number of patches in the in-memory tier.
+        """
+        return len(self.entries)
+
+    def __contains__(self, patch_id: str) -> bool:
+        """
+        Check whether a patch is part of the in-memory tier.
+        """
+        return patch_id in self.entries
+
+    def stats(self) -> dict:
+        """
+        Return the counters of the cache.
+
+        Returns:
+            dict: hits (in-memory tier), disk-hits (on-disk tier), misses (decoded bands),
+                evictions (evicted patches), patches and bytes of the in-memory tier.
+        """
+        return {
+            "hits": self.hits,
+            "disk-hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "patches": len(self.entries),
+            "bytes": self.nbytes,
+        }
+
+    def read_band(self, patch_id: str, band: str, path_tif: str) -> tuple[np.ndarray, float | None]:
+        """
+        Return a band of a patch from the cache, decoding the .tif file on a miss.
+        The returned pixels are shared with the cache and must not be modified.
+
+        Args:
+            patch_id (str): Patch ID.
+            band (str): Band name, e.g. "B02".
+            path_tif (str): Path to the .tif file of the band.
+
+        Returns:
+            tuple[np.ndarray, float | None]: Pixels of the band and its NO_DATA value.
+        """
+        # Key of the source file, a cached band of another or a modified file is not served
+        key = get_file_key(path_tif)
+
+        # Look up the in-memory tier and mark the patch as most recently used
+        with self.lock:
+            entry = self.entries.get(patch_id)
+            if entry is not None and band in entry and entry[band][0] == key:
+                self.entries.move_to_end(patch_id)
+                self.hits += 1
+                return entry[band][1]
+
+        # Look up the on-disk tier, the memory-mapped band is returned without charging the byte budget
+        result = self._load(patch_id, band, key)
+        if result is not None:
+            with self.lock:
+                self.disk_hits += 1
+            return result
+
+        # Decode the .tif file
+        with self.lock:
+            self.misses += 1
+        result = read_band_file(path_tif)
+        self._save(patch_id, band, key, result)
+        self._insert(patch_id, band, key, result)
+        return result
+
+    def read_patch(self, patch_id: str, path_patch_dir: str) -> dict[str, tuple[np.ndarray, float | None]]:
+        """
+        Return all bands of a patch, see read_band.
+
+        Args:
+            patch_id (str): Patch ID.
+            path_patch_dir (str): Path to the patch directory with the .tif files.
+
+        Returns:
+            dict[str, tuple[np.ndarray, float | None]]: Pixels and NO_DATA value of each band.
+        """
+        # Ensure the patch directory exists before proceeding; raise an error if not found.
+        assert os.path.isdir(path_patch_dir), f"Directory not found: {path_patch_dir}"
+
+        bands = {}
+        for tif_file in sorted(os.listdir(path_patch_dir)):
+            # Extract band from filename
+            band = get_band(tif_file) if tif_file.endswith(".tif") else None
+            if band in EXPECTED_RESOLUTIONS:
+                bands[band] = self.read_band(patch_id, band, os.path.join(path_patch_dir, tif_file))
+        return bands
+
+    def clear(self) -> None:
+        """
+        Remove all patches from the in-memory tier, the on-disk tier is kept.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def _insert(self, patch_id: str, band: str, key: str, result: tuple[np.ndarray, float | None]) -> None:
+        """
+        Insert a band into the in-memory tier and evict the least recently used patches
+        until the tier fits into the byte budget again.
+        """
+        with self.lock:
+            entry = self.entries.setdefault(patch_id, {})
+            if band in entry:
+                # Replace the band of another or a modified file
+                self.nbytes -= entry[band][1][0].nbytes
+            entry[band] = (key, result)
+            self.nbytes += result[0].nbytes
+            self.entries.move_to_end(patch_id)
+
+            while self.nbytes > self.max_bytes and self.entries:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= sum(data.nbytes for _, (data, _) in evicted.values())
+                self.evictions += 1
+
+    def _path_band(self, patch_id: str, band: str, key: str) -> str:
+        """
+        Return the path to the .npy file of a band of a source file in the on-disk tier.
+        """
+        return os.path.join(self.path_cache_dir, patch_id, f"{band}_{key}.npy")
+
+    def _load(self, patch_id: str, band: str, key: str) -> tuple[np.ndarray, float | None] | None:
+        """
+        Load a band from the on-disk tier as memory-mapped array, None if it is not stored.
+        The NO_DATA value is stored next to the pixels as a one-element .npy file (NaN for None).
+        """
+        if self.path_cache_dir is None:
+            return None
+        path_band = self._path_band(patch_id, band, key)
+        path_nodata = path_band[:-len(".npy")] + "_nodata.npy"
+        if not (os.path.isfile(path_band) and os.path.isfile(path_nodata)):
+            return None
+        value_no_data = float(np.load(path_nodata)[0])
+        return np.load(path_band, mmap_mode="r"), None if np.isnan(value_no_data) else value_no_data
+
+    def _save(self, patch_id: str, band: str, key: str, result: tuple[np.ndarray, float | None]) -> None:
+        """
+        Store a band in the on-disk tier, the files are written to a temporary file first,
+        so concurrent readers never see partially written files. The files of the band of
+        an earlier version of the source file are removed.
+        """
+        if self.path_cache_dir is None:
+            return
+        data, value_no_data = result
+        path_band = self._path_band(patch_id, band, key)
+        path_nodata = path_band[:-len(".npy")] + "_nodata.npy"
+        os.makedirs(os.path.dirname(path_band), exist_ok=True)
+
+        for path, array in [
+            (path_band, data),
+            (path_nodata, np.array([np.nan if value_no_data is None else value_no_data], dtype=np.float64)),
+        ]:
+            path_tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(path_tmp, "wb") as file:
+                np.save(file, array)
+            os.replace(path_tmp, path)
+
+        # Remove the files of the band of earlier versions of the source file (same path, other size or modification time)
+        path_hash = key.split("_")[0]
+        for path in glob.glob(os.path.join(os.path.dirname(path_band), f"{band}_{path_hash}_*.npy")):
+            if path not in (path_band, path_nodata):
+                # Another thread may have removed the file already
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+
+
+def get_file_key(path_tif: str) -> str:
+    """
+    Return the key of a source file in the cache: a hash of its absolute path, its size and its modification time.
+
+    Args:
+        path_tif (str): Path to the .tif file.
+
+    Returns:
+        str: Key of the file, e.g. "3f2a9c1e0b7d4e65_29341_1693550400000000000".
+    """
+    stat = os.stat(path_tif)
+    path_hash = hashlib.sha1(os.path.abspath(path_tif).encode()).hexdigest()[:16]
+    return f"{path_hash}_{stat.st_size}_{stat.st_mtime_ns}"
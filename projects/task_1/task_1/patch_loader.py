@@ -0,0 +1,265 @@
+import os
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from task_1.bands import BANDS, EXPECTED_RESOLUTIONS
+from task_1.patch_store import PatchStore, RESOLUTION_GROUPS
+from task_1.patch_cache import PatchCache
+from task_1.raster_reader import read_band_file
+
+
+# Size (in pixels) of the common grid of the stacked bands
+PATCH_SIZE = 120
+
+
+def get_patch_dir(path_dataset: str, patch_id: str) -> str:
+    """
+    Return the directory of a patch in a BigEarthNet directory tree (tile/patch/patch_band.tif),
+    the tile is the patch ID without the trailing row and column, e.g.
+    "S2B_MSIL2A_20170808T094029_N9999_R036_T35ULA_33_29" -> "S2B_MSIL2A_20170808T094029_N9999_R036_T35ULA".
+
+    Args:
+        path_dataset (str): Path to the directory containing the tiles and patches.
+        patch_id (str): Patch ID.
+
+    Returns:
+        str: Path to the patch directory.
+    """
+    return os.path.join(path_dataset, patch_id.rsplit("_", 2)[0], patch_id)
+
+
+def upsample_batch(data: np.ndarray, size: int, method: str = "nearest") -> np.ndarray:
+    """
+    Upsample a batch of bands to a common size with one vectorized operation.
+
+    Nearest neighbor repeats each pixel, bilinear interpolates between the pixel centers
+    (half-pixel aligned, the borders are clamped), both separately along the rows and columns.
+
+    Args:
+        data (np.ndarray): Bands with shape (..., height, width).
+        size (int): Size (in pixels) of the output.
+        method (str): "nearest" or "bilinear".
+
+    Returns:
+        np.ndarray: Bands with shape (..., size, size), float32 for bilinear.
+
+    Raises:
+        AssertionError: If the method is unknown.
+    """
+    # Ensure the method is known
+    assert method in ("nearest", "bilinear"), f"Unknown resampling method: {method}"
+
+    height, width = data.shape[-2:]
+    if (height, width) == (size, size):
+        return data
+
+    if method == "nearest":
+        # Source pixel of each output pixel
+        rows = np.arange(size) * height // size
+        cols = np.arange(size) * width // size
+        return data[..., rows[:, None], cols[None, :]]
+
+    # Source position, neighbors and weights of each output row and column
+    def weights(length: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        position = np.clip((np.arange(size) + 0.5) * length / size - 0.5, 0, length - 1)
+        low = np.floor(position).astype(np.intp)
+        high = np.minimum(low + 1, length - 1)
+        return low, high, (position - low).astype(np.float32)
+
+    row_low, row_high, row_weight = weights(height)
+    col_low, col_high, col_weight = weights(width)
+
+    data = data.astype(np.float32, copy=False)
+    data = data[..., row_low, :] * (1 - row_weight[:, None]) + data[..., row_high, :] * row_weight[:, None]
+    return data[..., col_low] * (1 - col_weight) + data[..., col_high] * col_weight
+
+
+def stack_patches(
+    groups: dict[int, np.ndarray],
+    method: str = "nearest",
+    mean: np.ndarray | None = None,
+    std: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Stack the resolution groups of a batch of patches into a (B, 12, 120, 120) float32 cube.
+
+    Each group is normalized at its native resolution and then upsampled directly into its
+    channels of the output. Both resampling methods are weighted averages with weights summing
+    to 1, so normalizing before upsampling gives the same result as normalizing afterwards,
+    with 4x (60 px) and 36x (20 px) fewer operations for the low-resolution bands.
+
+    Args:
+        groups (dict[int, np.ndarray]): Bands of each resolution group (see RESOLUTION_GROUPS)
+            with shape (B, bands of the group, size, size).
+        method (str): Resampling method of the low-resolution bands, "nearest" or "bilinear".
+        mean (np.ndarray | None): Per-band mean (in the order of BANDS) subtracted from the bands.
+        std (np.ndarray | None): Per-band standard deviation (in the order of BANDS) the bands are divided by.
+
+    Returns:
+        np.ndarray: Bands with shape (B, 12, 120, 120) in the order of BANDS.
+    """
+    batch_size = len(next(iter(groups.values())))
+    cube = np.empty((batch_size, len(BANDS), PATCH_SIZE, PATCH_SIZE), dtype=np.float32)
+
+    for size, data in groups.items():
+        channels = [BANDS.index(band) for band in RESOLUTION_GROUPS[size]]
+        data = data.astype(np.float32)
+
+        # Normalize at the native resolution of the group
+        if mean is not None:
+            data -= np.asarray(mean, dtype=np.float32)[channels][:, None, None]
+        if std is not None:
+            data /= np.asarray(std, dtype=np.float32)[channels][:, None, None]
+
+        cube[:, channels] = upsample_batch(data, PATCH_SIZE, method=method)
+
+    return cube
+
+
+def load_batch(
+    patch_ids: list[str],
+    path_dataset: str | None = None,
+    store: PatchStore | None = None,
+    method: str = "nearest",
+    mean: np.ndarray | None = None,
+    std: np.ndarray | None = None,
+    cache: PatchCache | None = None,
+) -> np.ndarray:
+    """
+    Load a batch of patches as a (B, 12, 120, 120) float32 cube, see stack_patches.
+
+    Args:
+        patch_ids (list[str]): Patch IDs of the batch.
+        path_dataset (str | None): Path to a BigEarthNet directory tree, used if store is None.
+        store (PatchStore | None): Packed patch store (see pack_patch_store) to read from.
+        method (str): Resampling method of the low-resolution bands, "nearest" or "bilinear".
+        mean (np.ndarray | None): Per-band mean for the normalization.
+        std (np.ndarray | None): Per-band standard deviation for the normalization.
+        cache (PatchCache | None): Cache of decoded bands, used when reading .tif files.
+
+    Returns:
+        np.ndarray: Bands with shape (B, 12, 120, 120) in the order of BANDS.
+
+    Raises:
+        AssertionError: If a band is missing or does not have the expected size.
+    """
+    groups = {}
+
+    if store is not None:
+        # Read the group arrays of the rows of the batch in one fancy-indexing call per group
+        rows = np.array([store.patch_rows[patch_id] for patch_id in patch_ids])
+        for band in BANDS:
+            # Ensure all bands are stored in their group array, i.e. have the expected size
+            assert (store.offsets[band][rows] == -1).all(), f"Band {band} is missing or has an unexpected size in the batch."
+        for size in RESOLUTION_GROUPS:
+            groups[size] = store.group_arrays[size][rows]
+        return stack_patches(groups, method=method, mean=mean, std=std)
+
+    # Read the .tif files of the batch into one array per group
+    for size, bands in RESOLUTION_GROUPS.items():
+        groups[size] = np.empty((len(patch_ids), len(bands), size, size), dtype=np.uint16)
+    for patch_idx, patch_id in enumerate(patch_ids):
+        path_patch = get_patch_dir(path_dataset, patch_id)
+        for size, bands in RESOLUTION_GROUPS.items():
+            for band_idx, band in enumerate(bands):
+                path_tif = os.path.join(path_patch, f"{patch_id}_{band}.tif")
+                data, _ = cache.read_band(patch_id, band, path_tif) if cache is not None else read_band_file(path_tif)
+
+                # Ensure the band has the expected size
+                assert data.shape == EXPECTED_RESOLUTIONS[band], f"Unexpected size of band {band} of patch {patch_id}: {data.shape}"
+
+                groups[size][patch_idx, band_idx] = data
+
+    return stack_patches(groups, method=method, mean=mean, std=std)
+
+
+class PatchLoader:
+    """
+    Iterates over batches of patches as (B, 12, 120, 120) float32 cubes.
+
+    The batches are assembled by a pool of worker threads (reading and decoding the bands
+    as well as resampling release the GIL), up to `prefetch` batches ahead of the consumer.
+    The batches are yielded in the order of the patch IDs.
+    """
+
+    def __init__(
+        self,
+        patch_ids: list[str],
+        path_dataset: str | None = None,
+        path_patch_store: str | None = None,
+        batch_size: int = 32,
+        method: str = "nearest",
+        mean: np.ndarray | None = None,
+        std: np.ndarray | None = None,
+        num_workers: int = 4,
+        prefetch: int = 2,
+        cache: PatchCache | None = None,
+    ) -> None:
+        """
+        Args:
+            patch_ids (list[str]): Patch IDs to load.
+            path_dataset (str | None): Path to a BigEarthNet directory tree.
+            path_patch_store (str | None): Path to a packed patch store, used instead of path_dataset if given.
+            batch_size (int): Number of patches per batch, the last batch may be smaller.
+            method (str): Resampling method of the low-resolution bands, "nearest" or "bilinear".
+            mean (np.ndarray | None): Per-band mean (in the order of BANDS) for the normalization.
+            std (np.ndarray | None): Per-band standard deviation (in the order of BANDS) for the normalization.
+            num_workers (int): Number of worker threads assembling batches.
+            prefetch (int): Number of batches assembled ahead per worker.
+            cache (PatchCache | None): Cache of decoded bands shared by the epochs (iterations)
+                of the loader, used when reading .tif files.
+
+        Raises:
+            AssertionError: If neither a dataset nor a store is given, or the batch size is invalid.
+        """
+        # Ensure a source of the patches is given
+        assert path_dataset is not None or path_patch_store is not None, "Either path_dataset or path_patch_store is required."
+
+        # Ensure the batch size is valid
+        assert batch_size >= 1, f"Invalid batch size: {batch_size}"
+
+        self.patch_ids = list(patch_ids)
+        self.path_dataset = path_dataset
+        self.store = PatchStore(path_patch_store) if path_patch_store else None
+        self.batch_size = batch_size
+        self.method = method
+        self.mean = mean
+        self.std = std
+        self.num_workers = num_workers
+        self.prefetch = prefetch
+        self.cache = cache
+
+    def __len__(self) -> int:
+        """
+        Number of batches.
+        """
+        return -(-len(self.patch_ids) // self.batch_size)
+
+    def __iter__(self):
+        """
+        Yields:
+            tuple[list[str], np.ndarray]: Patch IDs and cube of each batch.
+        """
+        batches = (
+            self.patch_ids[start:start + self.batch_size]
+            for start in range(0, len(self.patch_ids), self.batch_size)
+        )
+
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            # Queue of the batches being assembled, bounded to keep the memory bounded
+            pending = deque()
+            try:
+                for batch in batches:
+                    pending.append((batch, executor.submit(
+                        load_batch, batch, self.path_dataset, self.store, self.method, self.mean, self.std, self.cache,
+                    )))
+                    if len(pending) >= self.num_workers * self.prefetch:
+                        patch_ids, future = pending.popleft()
+                        yield patch_ids, future.result()
+                while pending:
+                    patch_ids, future = pending.popleft()
+                    yield patch_ids, future.result()
+            finally:
+                # Cancel the batches which were not started yet, e.g. if the consumer stops early
+                for _, future in pending:
+                    future.cancel()
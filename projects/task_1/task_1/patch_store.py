@@ -0,0 +1,280 @@
+import os
+import rasterio
+import numpy as np
+import pandas as pd
+from task_1.bands import BANDS, EXPECTED_RESOLUTIONS, get_band
+
+
+# Bands grouped by resolution (in pixels), one packed array per group
+RESOLUTION_GROUPS = {
+    size: [band for band in BANDS if EXPECTED_RESOLUTIONS[band] == (size, size)]
+    for size in sorted({height for height, _ in EXPECTED_RESOLUTIONS.values()}, reverse=True)
+}
+
+# Data type of the packed bands
+STORE_DTYPE = np.uint16
+
+
+def pack_patch_store(path_dataset: str, path_store: str) -> int:
+    """
+    Packs a BigEarthNet directory tree (tile/patch/patch_band.tif) into a contiguous,
+    memory-mappable patch store.
+
+    The store directory contains:
+        - bands_120.npy, bands_60.npy, bands_20.npy: One array per resolution group with
+          shape (patches, bands of the group, size, size).
+        - overflow.npy: Flat array with the pixels of bands which do not have the expected
+          size and therefore do not fit into their group array.
+        - index.parquet: Offset index with one row per patch (patch_id, tile and the row in
+          the group arrays) and for each band its height, width, NO_DATA value and offset
+          into overflow.npy (-1 if the band is stored in its group array, -2 if it is missing).
+
+    Args:
+        path_dataset (str): Path to the directory containing the tiles and patches.
+        path_store (str): Path to the output directory of the store.
+
+    Returns:
+        int: Number of packed patches.
+
+    Raises:
+        AssertionError: If essential files or directories are not found.
+    """
+    # Ensure the dataset directory exists before proceeding; raise an error if not found.
+    assert os.path.isdir(path_dataset), f"Directory not found: {path_dataset}"
+
+    # Create the output directory if it doesn't exist
+    os.makedirs(path_store, exist_ok=True)
+
+    # Recursively walk through the directory to find patch directories (containing .tif files)
+    patch_dirs = []
+    for dirpath, dirnames, filenames in os.walk(path_dataset):
+        dirnames.sort()
+        tif_files = {get_band(f): f for f in filenames if f.endswith(".tif")}
+        if tif_files:
+            patch_dirs.append((dirpath, tif_files))
+
+    num_patches = len(patch_dirs)
+
+    # Allocate one memory-mapped array per resolution group
+    group_arrays = {
+        size: np.lib.format.open_memmap(
+            os.path.join(path_store, f"bands_{size}.npy"),
+            mode="w+",
+            dtype=STORE_DTYPE,
+            shape=(num_patches, len(bands), size, size),
+        )
+        for size, bands in RESOLUTION_GROUPS.items()
+    }
+
+    # Index columns and the pixels of bands with unexpected size
+    index = {"patch_id": [], "tile": [], "row": []}
+    for band in BANDS:
+        index.update({f"{band}_height": [], f"{band}_width": [], f"{band}_nodata": [], f"{band}_offset": []})
+    overflow = []
+    overflow_size = 0
+
+    for row, (dirpath, tif_files) in enumerate(patch_dirs):
+        index["patch_id"].append(os.path.basename(dirpath))
+        index["tile"].append(os.path.basename(os.path.dirname(dirpath)))
+        index["row"].append(row)
+
+        for size, bands in RESOLUTION_GROUPS.items():
+            for band_idx, band in enumerate(bands):
+                # Missing band
+                if band not in tif_files:
+                    index[f"{band}_height"].append(0)
+                    index[f"{band}_width"].append(0)
+                    index[f"{band}_nodata"].append(np.nan)
+                    index[f"{band}_offset"].append(-2)
+                    continue
+
+                # Open the .tif file and read its pixel data
+                with rasterio.open(os.path.join(dirpath, tif_files[band])) as src:
+                    # Read the first (only) band of the .tif file
+                    data = src.read(1)
+                    value_no_data = src.nodata
+
+                # Ensure the pixels can be stored without loss
+                assert data.dtype == STORE_DTYPE, f"Data type {data.dtype} of {tif_files[band]} is not supported, {np.dtype(STORE_DTYPE)} is expected."
+
+                index[f"{band}_height"].append(data.shape[0])
+                index[f"{band}_width"].append(data.shape[1])
+                index[f"{band}_nodata"].append(np.nan if value_no_data is None else value_no_data)
+
+                # Bands of the expected size go into the group array, others into the overflow
+                if data.shape == (size, size):
+                    group_arrays[size][row, band_idx] = data
+                    index[f"{band}_offset"].append(-1)
+                else:
+                    overflow.append(data.ravel())
+                    index[f"{band}_offset"].append(overflow_size)
+                    overflow_size += data.size
+
+    # Flush the group arrays and write the overflow and the index
+    for array in group_arrays.values():
+        array.flush()
+    np.save(os.path.join(path_store, "overflow.npy"), np.concatenate(overflow) if overflow else np.zeros(0, dtype=STORE_DTYPE))
+    pd.DataFrame(index).to_parquet(os.path.join(path_store, "index.parquet"), index=False)
+
+    return num_patches
+
+
+class PatchStore:
+    """
+    Reader of a packed patch store written by pack_patch_store().
+
+    The group arrays are memory-mapped, so reading a band returns a zero-copy view
+    and only the pages actually touched are loaded from disk.
+    """
+
+    def __init__(self, path_store: str) -> None:
+        """
+        Args:
+            path_store (str): Path to the directory of the store.
+
+        Raises:
+            AssertionError: If the store is not found.
+        """
+        path_index = os.path.join(path_store, "index.parquet")
+
+        # Ensure the index of the store exists before proceeding; raise an error if not found.
+        assert os.path.isfile(path_index), f"File not found: {path_index}"
+
+        self.path_store = path_store
+        self.index = pd.read_parquet(path_index)
+        self.patch_rows = {patch_id: row for row, patch_id in enumerate(self.index["patch_id"])}
+        self.group_arrays = {
+            size: np.load(os.path.join(path_store, f"bands_{size}.npy"), mmap_mode="r")
+            for size in RESOLUTION_GROUPS
+        }
+        self.overflow = np.load(os.path.join(path_store, "overflow.npy"), mmap_mode="r")
+
+        # Group and position inside the group of each band
+        self.band_positions = {
+            band: (size, band_idx)
+            for size, bands in RESOLUTION_GROUPS.items()
+            for band_idx, band in enumerate(bands)
+        }
+
+        # Index columns as arrays for fast access by row
+        self.heights = {band: self.index[f"{band}_height"].to_numpy() for band in BANDS}
+        self.widths = {band: self.index[f"{band}_width"].to_numpy() for band in BANDS}
+        self.nodatas = {band: self.index[f"{band}_nodata"].to_numpy() for band in BANDS}
+        self.offsets = {band: self.index[f"{band}_offset"].to_numpy() for band in BANDS}
+
+    def __len__(self) -> int:
+        """
+        Number of patches in the store.
+        """
+        return len(self.index)
+
+    def __contains__(self, patch_id: str) -> bool:
+        """
+        Check whether a patch is part of the store.
+        """
+        return patch_id in self.patch_rows
+
+    def read_band(self, patch_id: str, band: str) -> np.ndarray:
+        """
+        Return a zero-copy view of a band of a patch.
+
+        Args:
+            patch_id (str): Patch ID.
+            band (str): Band name, e.g. "B02".
+
+        Returns:
+            np.ndarray: Pixels of the band with shape (height, width).
+
+        Raises:
+            AssertionError: If the patch or the band is not part of the store.
+        """
+        # Ensure the patch is part of the store
+        assert patch_id in self.patch_rows, f"Patch not found in the store: {patch_id}"
+
+        row = self.patch_rows[patch_id]
+        offset = self.offsets[band][row]
+
+        # Ensure the band is part of the patch
+        assert offset != -2, f"Band {band} not found in the store for patch: {patch_id}"
+
+        if offset == -1:
+            size, band_idx = self.band_positions[band]
+            return self.group_arrays[size][row, band_idx]
+        shape = (int(self.heights[band][row]), int(self.widths[band][row]))
+        return self.overflow[offset:offset + shape[0] * shape[1]].reshape(shape)
+
+    def read_patch(self, patch_id: str) -> dict[str, np.ndarray]:
+        """
+        Return zero-copy views of all bands of a patch.
+
+        Args:
+            patch_id (str): Patch ID.
+
+        Returns:
+            dict[str, np.ndarray]: Pixels of each band of the patch.
+        """
+        row = self.patch_rows[patch_id]
+        return {band: self.read_band(patch_id, band) for band in BANDS if self.offsets[band][row] != -2}
+
+    def nodata(self, patch_id: str, band: str) -> float | None:
+        """
+        Return the NO_DATA value of a band of a patch.
+
+        Args:
+            patch_id (str): Patch ID.
+            band (str): Band name, e.g. "B02".
+
+        Returns:
+            float | None: NO_DATA value, None if the band has no NO_DATA value.
+        """
+        value_no_data = self.nodatas[band][self.patch_rows[patch_id]]
+        return None if np.isnan(value_no_data) else value_no_data
+
+    def wrong_size(self) -> np.ndarray:
+        """
+        Check all patches for bands with an incorrect number of pixels.
+
+        Returns:
+            np.ndarray: Boolean flag for each patch (in the order of the index).
+        """
+        wrong_size = np.zeros(len(self), dtype=bool)
+        for band in BANDS:
+            present = self.offsets[band] != -2
+            expected_height, expected_width = EXPECTED_RESOLUTIONS[band]
+            wrong_size |= present & ((self.heights[band] != expected_height) | (self.widths[band] != expected_width))
+        return wrong_size
+
+    def with_no_data(self, rows: np.ndarray | None = None, chunk_size: int = 1024) -> np.ndarray:
+        """
+        Check patches for the presence of NO_DATA pixels, vectorized over chunks of patches.
+
+        Args:
+            rows (np.ndarray | None): Boolean mask of the patches to check, all patches if None.
+            chunk_size (int): Number of patches checked at once.
+
+        Returns:
+            np.ndarray: Boolean flag for each patch (in the order of the index), False for
+                the patches not checked.
+        """
+        with_no_data = np.zeros(len(self), dtype=bool)
+        rows = np.ones(len(self), dtype=bool) if rows is None else rows
+
+        # Bands stored in the group arrays
+        for size, bands in RESOLUTION_GROUPS.items():
+            array = self.group_arrays[size]
+            nodata = np.stack([self.nodatas[band] for band in bands], axis=1)
+            in_group = np.stack([self.offsets[band] == -1 for band in bands], axis=1)
+            for start in range(0, len(self), chunk_size):
+                stop = min(start + chunk_size, len(self))
+                if not rows[start:stop].any():
+                    continue
+                hits = (array[start:stop] == nodata[start:stop, :, None, None]).any(axis=(2, 3))
+                with_no_data[start:stop] |= (hits & in_group[start:stop]).any(axis=1)
+
+        # Bands stored in the overflow
+        for band in BANDS:
+            for row in np.flatnonzero(self.offsets[band] >= 0):
+                patch_id = self.index["patch_id"].iat[row]
+                with_no_data[row] |= bool((self.read_band(patch_id, band) == self.nodatas[band][row]).any())
+
+        return with_no_data & rows
@@ -0,0 +1,130 @@
+import os
+import time
+import rasterio
+import numpy as np
+from rasterio.io import MemoryFile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from task_1.metrics import record
+
+
+def read_band_file(path_tif: str) -> tuple[np.ndarray, float | None]:
+    """
+    Read the first (only) band of a .tif file.
+
+    Args:
+        path_tif (str): Path to the .tif file.
+
+    Returns:
+        tuple[np.ndarray, float | None]: Pixels of the band and its NO_DATA value.
+
+    Raises:
+        AssertionError: If the .tif file is not found.
+    """
+    # Ensure the .tif file exists before proceeding; raise an error if not found.
+    assert os.path.isfile(path_tif), f"File not found: {path_tif}"
+
+    time_start = time.perf_counter()
+    with rasterio.open(path_tif) as src:
+        data, nodata = src.read(1), src.nodata
+
+    # Count the file, its size and the time to open and decode it
+    record("raster.read", files_opened=1, bytes_read=os.path.getsize(path_tif), decode_seconds=time.perf_counter() - time_start, items=1)
+    return data, nodata
+
+
+def read_band_bytes(data: bytes) -> tuple[np.ndarray, float | None]:
+    """
+    Read the first (only) band of a .tif file from its content in memory, e.g. a member of a
+    dataset archive (see dataset_source.TarSource), without writing it to disk.
+
+    Args:
+        data (bytes): Content of the .tif file.
+
+    Returns:
+        tuple[np.ndarray, float | None]: Pixels of the band and its NO_DATA value.
+    """
+    time_start = time.perf_counter()
+    with MemoryFile(data) as memfile, memfile.open() as src:
+        band, nodata = src.read(1), src.nodata
+
+    # Count the file, its size and the time to decode it
+    record("raster.read", files_opened=1, bytes_read=len(data), decode_seconds=time.perf_counter() - time_start, items=1)
+    return band, nodata
+
+
+def iter_bands(items, num_threads: int = 4, prefetch: int = 16, ordered: bool = True, cache=None):
+    """
+    Read band files with a pool of threads and yield them while the next ones are read.
+
+    GDAL releases the GIL while reading and decompressing, so the reads of the threads overlap
+    with each other and with the processing of the caller. At most `prefetch` bands are in
+    flight or read but not yet consumed; new reads are only started when the caller consumes
+    a band (backpressure), so the memory stays bounded independently of the number of files.
+
+    Args:
+        items: Iterable of (patch_id, band, path_tif) tuples, consumed lazily. Instead of its path,
+            the content of a .tif file (bytes, e.g. read from a dataset archive) can be given.
+        num_threads (int): Number of reader threads.
+        prefetch (int): Maximum number of bands in flight (at least num_threads is useful).
+        ordered (bool): Whether to yield the bands in the order of items, otherwise in the
+            order the reads complete.
+        cache (PatchCache | None): Cache of decoded bands (see patch_cache.PatchCache), bands found
+            in the cache are not decoded again. Not used for bands given as bytes.
+
+    Yields:
+        tuple[str, str, np.ndarray, float | None]: patch_id, band, pixels and NO_DATA value.
+
+    Raises:
+        AssertionError: If the number of threads or the prefetch depth is invalid.
+    """
+    # Ensure the number of threads and the prefetch depth are valid
+    assert num_threads >= 1, f"Invalid number of threads: {num_threads}"
+    assert prefetch >= 1, f"Invalid prefetch depth: {prefetch}"
+
+    items = iter(items)
+
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        def submit() -> bool:
+            # Start the read of the next item, if there is one
+            item = next(items, None)
+            if item is None:
+                return False
+            patch_id, band, path_tif = item
+            if isinstance(path_tif, bytes):
+                future = executor.submit(read_band_bytes, path_tif)
+            elif cache is not None:
+                future = executor.submit(cache.read_band, patch_id, band, path_tif)
+            else:
+                future = executor.submit(read_band_file, path_tif)
+            pending.append((patch_id, band, future))
+            return True
+
+        try:
+            if ordered:
+                # Queue of the reads in the order of the items
+                pending = deque()
+                while len(pending) < prefetch and submit():
+                    pass
+                while pending:
+                    patch_id, band, future = pending.popleft()
+                    submit()
+                    data, nodata = future.result()
+                    yield patch_id, band, data, nodata
+            else:
+                # Reads in flight, yielded as soon as they complete
+                pending = []
+                while len(pending) < prefetch and submit():
+                    pass
+                while pending:
+                    done, _ = wait([future for _, _, future in pending], return_when=FIRST_COMPLETED)
+                    finished = [entry for entry in pending if entry[2] in done]
+                    pending = [entry for entry in pending if entry[2] not in done]
+                    for patch_id, band, future in finished:
+                        submit()
+                        data, nodata = future.result()
+                        yield patch_id, band, data, nodata
+        finally:
+            # Cancel the reads which were not started yet, e.g. if the caller stops early
+            for _, _, future in pending:
+                future.cancel()
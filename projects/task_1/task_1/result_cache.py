@@ -0,0 +1,92 @@
+import os
+import sqlite3
+
+
+# Per-file results stored in the cache
+RESULT_FIELDS = ["height", "width", "has_no_data", "count", "mean", "var"]
+
+
+class ResultCache:
+    """
+    Persistent on-disk cache of per-file results, stored in a SQLite database.
+
+    Results of a .tif file are keyed by its path, size and modification time, so a file
+    is only opened again if it is new or has been modified since its results were cached.
+    The cached results are:
+        - height, width: Size of the band (in pixels)
+        - has_no_data: Presence of NO_DATA pixels (NULL if not checked yet)
+        - count, mean, var: Partial band accumulator of the valid pixels, i.e. count,
+          mean and sum of squared deviations (NULL if not computed yet)
+    """
+
+    def __init__(self, path_cache_db: str) -> None:
+        """
+        Args:
+            path_cache_db (str): Path to the SQLite database, created if it does not exist.
+        """
+        # Create the directory of the database if it doesn't exist
+        os.makedirs(os.path.dirname(os.path.abspath(path_cache_db)), exist_ok=True)
+
+        self.path_cache_db = path_cache_db
+        self.connection = sqlite3.connect(path_cache_db)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS tif_results ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, "
+            "height INTEGER, width INTEGER, has_no_data INTEGER, "
+            "count INTEGER, mean REAL, var REAL)"
+        )
+
+    def __enter__(self) -> "ResultCache":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def get(self, path_tif: str) -> dict | None:
+        """
+        Return the cached results of a file, if the file has not changed since they were cached.
+
+        Args:
+            path_tif (str): Path to the .tif file.
+
+        Returns:
+            dict | None: Cached results (values not computed yet are None),
+                or None if the file is not cached or has been modified.
+        """
+        stat = os.stat(path_tif)
+        row = self.connection.execute(
+            f"SELECT size, mtime_ns, {', '.join(RESULT_FIELDS)} FROM tif_results WHERE path = ?",
+            (os.path.abspath(path_tif),),
+        ).fetchone()
+        if row is None or row[0] != stat.st_size or row[1] != stat.st_mtime_ns:
+            return None
+        results = dict(zip(RESULT_FIELDS, row[2:]))
+        if results["has_no_data"] is not None:
+            results["has_no_data"] = bool(results["has_no_data"])
+        return results
+
+    def put(self, path_tif: str, results: dict) -> None:
+        """
+        Store results of a file. Results cached earlier for the same, unmodified file are kept
+        unless they are overwritten by the given ones.
+
+        Args:
+            path_tif (str): Path to the .tif file.
+            results (dict): Results to store, a subset of RESULT_FIELDS.
+        """
+        stat = os.stat(path_tif)
+        results_merged = dict.fromkeys(RESULT_FIELDS)
+        results_merged.update(self.get(path_tif) or {})
+        results_merged.update({field: value for field, value in results.items() if value is not None})
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO tif_results (path, size, mtime_ns, {', '.join(RESULT_FIELDS)}) "
+            f"VALUES ({', '.join(['?'] * (len(RESULT_FIELDS) + 3))})",
+            (os.path.abspath(path_tif), stat.st_size, stat.st_mtime_ns, *[results_merged[field] for field in RESULT_FIELDS]),
+        )
+
+    def close(self) -> None:
+        """
+        Commit the stored results and close the database.
+        """
+        self.connection.commit()
+        self.connection.close()
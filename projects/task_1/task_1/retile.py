@@ -0,0 +1,352 @@
+import os
+import time
+import string
+import rasterio
+import rasterio.shutil
+from concurrent.futures import ProcessPoolExecutor
+from rasterio.io import MemoryFile
+from rasterio.windows import Window
+from rasterio.transform import Affine
+from task_1.metrics import record, map_with_metrics
+
+
+def get_tile_windows(
+    height: int,
+    width: int,
+    grid: tuple[int, int] | None = None,
+    tile_size: tuple[int, int] | None = None,
+    edge: str = "shrink",
+) -> list[Window]:
+    """
+    Compute the windows of the tiles of a raster, in row-major order.
+
+    The tiles are defined either by a grid (rows, cols) or by a fixed tile size
+    (height, width). With a grid the tile size is the raster size divided by the
+    number of rows/cols, rounded up (rounded down with edge="drop"). Tiles at the
+    right and bottom edge which do not have the full tile size are handled as:
+        - "pad": Kept with the full tile size, the missing pixels are filled with NO_DATA.
+        - "drop": Skipped.
+        - "shrink": Kept with the remaining (smaller) size.
+
+    Args:
+        height (int): Height of the raster (in pixels).
+        width (int): Width of the raster (in pixels).
+        grid (tuple[int, int] | None): Number of tile rows and cols.
+        tile_size (tuple[int, int] | None): Height and width of a tile (in pixels).
+        edge (str): Handling of the edge tiles, "pad", "drop" or "shrink".
+
+    Returns:
+        list[Window]: Windows of the tiles, padded windows reach beyond the raster.
+
+    Raises:
+        AssertionError: If the arguments are invalid.
+    """
+    # Ensure exactly one of grid and tile size is given and the edge handling is valid
+    assert (grid is None) != (tile_size is None), "Exactly one of grid and tile_size must be given."
+    assert edge in ("pad", "drop", "shrink"), f"Invalid edge handling: {edge}"
+
+    if grid is not None:
+        rows, cols = grid
+        assert rows > 0 and cols > 0, f"Invalid grid: {grid}"
+        assert rows <= height and cols <= width, f"Raster of size {height}x{width} can not be split into a grid of {rows}x{cols} tiles."
+        if edge == "drop":
+            tile_height, tile_width = height // rows, width // cols
+        else:
+            tile_height, tile_width = -(-height // rows), -(-width // cols)
+        row_offsets = [row * tile_height for row in range(rows)]
+        col_offsets = [col * tile_width for col in range(cols)]
+    else:
+        tile_height, tile_width = tile_size
+        row_offsets = list(range(0, height, tile_height)) if tile_height > 0 else []
+        col_offsets = list(range(0, width, tile_width)) if tile_width > 0 else []
+
+    # Ensure the tiles are not empty
+    assert tile_height > 0 and tile_width > 0, f"Raster of size {height}x{width} can not be split into tiles of size {tile_height}x{tile_width}."
+
+    windows = []
+    for row_offset in row_offsets:
+        for col_offset in col_offsets:
+            window_height = min(tile_height, height - row_offset)
+            window_width = min(tile_width, width - col_offset)
+
+            # Handle the tiles at the edge of the raster
+            if window_height < tile_height or window_width < tile_width:
+                if edge == "drop" or (edge == "shrink" and (window_height <= 0 or window_width <= 0)):
+                    continue
+                if edge == "pad":
+                    window_height, window_width = tile_height, tile_width
+
+            windows.append(Window(col_offset, row_offset, window_width, window_height))
+
+    return windows
+
+
+def get_tile_suffix(tile_idx: int, num_tiles: int) -> str:
+    """
+    Return the suffix of a tile: a letter (A, B, C, ...) in row-major order if there are at
+    most 26 tiles (e.g. A, B, C, D for a 2x2 split), else the zero-padded tile number.
+
+    Args:
+        tile_idx (int): Index of the tile in row-major order.
+        num_tiles (int): Number of tiles.
+
+    Returns:
+        str: Suffix of the tile.
+    """
+    if num_tiles <= len(string.ascii_uppercase):
+        return string.ascii_uppercase[tile_idx]
+    return f"{tile_idx:0{len(str(num_tiles - 1))}d}"
+
+
+def milestone01_task_1_4_3_check(src, dst, transform=None) -> None:
+    """
+    Perform integrity checks on the original and newly generated sub-patch GeoTIFFs 
+    to ensure they retain the correct geographical information. The checks include:
+
+    - Verifying that the Coordinate Reference System (CRS) matches between the source 
+      and destination images.
+    - Checking that the spatial transform is updated and consistent for each patch 
+      (ensuring accurate geographical referencing).
+
+    Args:
+        src: The source raster (original tile).
+        dst: The destination raster (sub-patch).
+        transform: The expected transform of the sub-patch, if known.
+    """
+    # Check if the Coordinate Reference System (CRS) of the patch matches the original image
+    assert dst.crs == src.crs, f"CRS mismatch: {dst.crs} vs {src.crs}"
+
+    # Check the affine transformation against the expected one, which covers the origin tile
+    # as well (its window starts at (0, 0)) whatever the suffix of the tile is
+    if transform is not None:
+        assert dst.transform == transform, f"Transform mismatch: {dst.transform} vs {transform}"
+        return
+
+    # Check the affine transformation:
+    # Patch "_A.tif" should retain the original transform, others should differ.
+    if "_A.tif" in dst.name:
+        assert dst.transform == src.transform, f"Transform should be the same: {dst.transform} vs {src.transform}"
+    else:
+        assert dst.transform != src.transform, f"Transform should be different: {dst.transform} vs {src.transform}"
+
+
+def retile(
+    path_tile_original: str,
+    path_output_dir: str,
+    grid: tuple[int, int] | None = None,
+    tile_size: tuple[int, int] | None = None,
+    edge: str = "shrink",
+    compress: str | None = None,
+    predictor: int | None = None,
+    blocksize: int | None = None,
+    cog: bool = False,
+    skip_existing: bool = False,
+) -> list[str]:
+    """
+    Splits a GeoTIFF image into tiles of a grid or of a fixed size (see get_tile_windows)
+    and exports them as new GeoTIFF files with a suffix per tile (see get_tile_suffix).
+
+    Each tile is read and written through a rasterio window, so at most one tile is held
+    in memory. The transform of a tile is the original transform translated by the offset
+    of its window, and every exported tile is verified with milestone01_task_1_4_3_check.
+
+    By default the tiles are written as uncompressed strip GeoTIFFs. With compress and/or
+    blocksize they are internally tiled and compressed, with cog as Cloud Optimized GeoTIFFs.
+    Tiles are written to a temporary file first and renamed when complete, so an interrupted
+    run never leaves a partial tile behind and can be resumed with skip_existing.
+
+    Args:
+        path_tile_original (str): Path to the GeoTIFF file to split.
+        path_output_dir (str): Output directory of the tiles, created if it doesn't exist.
+        grid (tuple[int, int] | None): Number of tile rows and cols.
+        tile_size (tuple[int, int] | None): Height and width of a tile (in pixels).
+        edge (str): Handling of the edge tiles, "pad", "drop" or "shrink".
+        compress (str | None): Compression of the tiles, e.g. "deflate" or "zstd".
+        predictor (int | None): Predictor of the compression, 2 (horizontal differencing)
+            for integer bands, 3 for floating point bands.
+        blocksize (int | None): Size of the internal tiles (in pixels), a multiple of 16.
+            Defaults to 256 if compress or cog is given.
+        cog (bool): Whether to write Cloud Optimized GeoTIFFs.
+        skip_existing (bool): Whether to skip tiles whose output file already exists.
+
+    Returns:
+        list[str]: Paths to the exported tiles, in row-major order.
+
+    Raises:
+        AssertionError: If essential files are not found or a tile fails the integrity checks.
+    """
+    # Ensure the .tif file exists before proceeding; raise an error if not found.
+    assert os.path.isfile(path_tile_original), f"File not found: {path_tile_original}"
+
+    # Create the output directory if it doesn't exist
+    os.makedirs(path_output_dir, exist_ok=True)
+
+    # Extract the base filename and extension from the original tile path
+    file_name, file_ext = os.path.splitext(os.path.basename(path_tile_original))
+
+    # Creation options of the tiles
+    if blocksize is None and (compress or cog):
+        blocksize = 256
+    creation_options = {}
+    if compress:
+        creation_options["compress"] = compress
+    if predictor:
+        creation_options["predictor"] = predictor
+
+    paths_output_file = []
+    num_tiles_written = 0
+    time_start = time.perf_counter()
+
+    # Open the original GeoTIFF file, the pixels are read per tile
+    with rasterio.open(path_tile_original) as src:
+        windows = get_tile_windows(src.height, src.width, grid=grid, tile_size=tile_size, edge=edge)
+
+        for tile_idx, window in enumerate(windows):
+            # Define the output filename by appending the tile suffix to the original filename
+            path_output_file = os.path.join(path_output_dir, f"{file_name}_{get_tile_suffix(tile_idx, len(windows))}{file_ext}")
+            paths_output_file.append(path_output_file)
+
+            # Skip tiles written by an earlier run
+            if skip_existing and os.path.isfile(path_output_file):
+                continue
+
+            # Shift the transform to the upper left corner of the tile
+            tile_transform = src.transform * Affine.translation(window.col_off, window.row_off)
+
+            # Read the pixels of the tile, padded windows are filled with NO_DATA
+            is_padded = window.row_off + window.height > src.height or window.col_off + window.width > src.width
+            tile_data = src.read(window=window, boundless=is_padded, fill_value=src.nodata if src.nodata is not None else 0)
+
+            # Metadata of the new GeoTIFF file
+            profile = {
+                "driver": "GTiff",
+                "width": tile_data.shape[2],
+                "height": tile_data.shape[1],
+                "count": src.count,
+                "crs": src.crs,
+                "transform": tile_transform,
+                "dtype": src.dtypes[0],
+                "nodata": src.nodata,
+            }
+
+            # Internal tiling, the blocks are clipped to the (rounded up) tile size
+            if blocksize and not cog:
+                profile.update(
+                    tiled=True,
+                    blockxsize=min(blocksize, -(-tile_data.shape[2] // 16) * 16),
+                    blockysize=min(blocksize, -(-tile_data.shape[1] // 16) * 16),
+                )
+
+            # Write the tile to a temporary file, it is renamed once complete
+            path_tmp_file = f"{path_output_file}.tmp"
+            if cog:
+                # The COG driver can only copy a complete dataset, the tile is written to memory first
+                with MemoryFile() as memfile:
+                    with memfile.open(**profile) as mem:
+                        mem.write(tile_data)
+                    cog_options = {"blocksize": blocksize, **creation_options}
+                    if predictor:
+                        cog_options["predictor"] = "YES"
+                    rasterio.shutil.copy(memfile.name, path_tmp_file, driver="COG", **cog_options)
+            else:
+                # Create a new GeoTIFF file for the tile with the appropriate metadata
+                with rasterio.open(path_tmp_file, mode='w', **profile, **creation_options) as dst:
+                    # Write the tile data to the new GeoTIFF file
+                    dst.write(tile_data)
+            os.replace(path_tmp_file, path_output_file)
+
+            # After writing the tile, open the new GeoTIFF file to verify its integrity
+            with rasterio.open(path_output_file) as dst:
+                milestone01_task_1_4_3_check(src, dst, transform=tile_transform)
+            num_tiles_written += 1
+
+    # Count the file, its size, the time to split it and the written tiles
+    record("retile", files_opened=1, bytes_read=os.path.getsize(path_tile_original), compute_seconds=time.perf_counter() - time_start, items=num_tiles_written)
+    return paths_output_file
+
+
+def retile_dataset(
+    path_dataset: str,
+    path_output_dir: str,
+    grid: tuple[int, int] | None = None,
+    tile_size: tuple[int, int] | None = None,
+    edge: str = "shrink",
+    num_workers: int = 1,
+    compress: str | None = "deflate",
+    predictor: int | None = 2,
+    blocksize: int | None = 256,
+    cog: bool = False,
+    skip_existing: bool = True,
+) -> int:
+    """
+    Re-tiles every band of every patch of a dataset tree (see retile), spread over a
+    process pool. The output directory mirrors the dataset tree, i.e. the tiles of
+    dataset/tile/patch/patch_band.tif are written to output/tile/patch/patch_band_A.tif, ...
+
+    The tiles are written as internally tiled, compressed GeoTIFFs (DEFLATE with horizontal
+    differencing predictor by default, optionally as COG). Existing tiles are skipped by
+    default, so an interrupted run can be resumed.
+
+    Args:
+        path_dataset (str): Path to the directory containing the tiles and patches.
+        path_output_dir (str): Output directory of the re-tiled dataset.
+        grid (tuple[int, int] | None): Number of tile rows and cols.
+        tile_size (tuple[int, int] | None): Height and width of a tile (in pixels).
+        edge (str): Handling of the edge tiles, "pad", "drop" or "shrink".
+        num_workers (int): Number of worker processes, 1 re-tiles in the current process.
+        compress (str | None): Compression of the tiles, e.g. "deflate" or "zstd".
+        predictor (int | None): Predictor of the compression.
+        blocksize (int | None): Size of the internal tiles (in pixels), a multiple of 16.
+        cog (bool): Whether to write Cloud Optimized GeoTIFFs.
+        skip_existing (bool): Whether to skip tiles whose output file already exists.
+
+    Returns:
+        int: Number of re-tiled .tif files.
+
+    Raises:
+        AssertionError: If essential files or directories are not found.
+    """
+    # Ensure the dataset directory exists before proceeding; raise an error if not found.
+    assert os.path.isdir(path_dataset), f"Directory not found: {path_dataset}"
+
+    # Recursively walk through the directory to find the .tif files and their output directories
+    paths_tif = []
+    paths_tif_output_dir = []
+    for dirpath, dirnames, filenames in os.walk(path_dataset):
+        for filename in sorted(filenames):
+            if filename.endswith(".tif"):
+                paths_tif.append(os.path.join(dirpath, filename))
+                paths_tif_output_dir.append(os.path.join(path_output_dir, os.path.relpath(dirpath, path_dataset)))
+
+    # Options shared by all files
+    options = [
+        {
+            "grid": grid,
+            "tile_size": tile_size,
+            "edge": edge,
+            "compress": compress,
+            "predictor": predictor,
+            "blocksize": blocksize,
+            "cog": cog,
+            "skip_existing": skip_existing,
+        }
+    ] * len(paths_tif)
+
+    # Re-tile the files, serially or spread over a process pool
+    if num_workers > 1:
+        chunksize = max(1, len(paths_tif) // (num_workers * 16))
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            for _ in map_with_metrics(executor, _retile_file, paths_tif, paths_tif_output_dir, options, chunksize=chunksize):
+                pass
+    else:
+        for _ in map(_retile_file, paths_tif, paths_tif_output_dir, options):
+            pass
+
+    return len(paths_tif)
+
+
+def _retile_file(path_tif: str, path_tif_output_dir: str, options: dict) -> list[str]:
+    """
+    Re-tiles a single file in a worker process of retile_dataset.
+    """
+    return retile(path_tile_original=path_tif, path_output_dir=path_tif_output_dir, **options)
@@ -0,0 +1,257 @@
+import os
+import sys
+import json
+import zlib
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from task_1.bands import BANDS
+from task_1.band_stats import merge_stats
+from task_1.metadata_catalog import get_metadata_catalog
+from task_1.dataset_scan import scan_dataset, find_patch_dirs, SizeCheckConsumer, NoDataCheckConsumer, BandStatsConsumer
+from task_1.footprint_index import REFERENCE_MAP_SUFFIX
+from task_1.milestone01_task_1_5 import count_labels
+
+
+def get_shard(tile: str, num_shards: int) -> int:
+    """
+    Return the shard of a tile. The partitioning is deterministic (CRC32 of the tile name),
+    so every node of a run assigns the same tiles to the same shard, and all patches of a tile
+    are processed by the same shard.
+
+    Args:
+        tile (str): Tile name, e.g. "S2B_MSIL2A_20170808T094029_N9999_R036_T35ULA".
+        num_shards (int): Number of shards.
+
+    Returns:
+        int: Shard of the tile, in [0, num_shards).
+    """
+    return zlib.crc32(tile.encode()) % num_shards
+
+
+def run_shard(
+    shard: int,
+    num_shards: int,
+    path_partial: str,
+    num_workers: int = 1,
+    num_threads: int = 4,
+) -> dict:
+    """
+    Runs the work of milestone01_task_1_4_1, milestone01_task_1_4_2 and milestone01_task_1_5_1
+    for the tiles of one shard and writes the partial results to a JSON file, see reduce_shards.
+
+    The partial results are mergeable: the counters of the patch checks (wrong-size, with-no-data,
+    not-part-of-dataset), the band accumulators (mean, sum of squared deviations and count, see
+    band_stats.merge_stats) of the statistics patches, the number of bands found of each statistics
+    patch and the number of valid unique labels of each patch. The file is written atomically,
+    so a partial file is either complete or missing.
+
+    Args:
+        shard (int): Shard processed by this run, in [0, num_shards).
+        num_shards (int): Number of shards.
+        path_partial (str): Path to the JSON file of the partial results.
+        num_workers (int): Number of worker processes scanning the patches and threads reading the reference maps.
+        num_threads (int): Number of reader threads (per worker process) prefetching the bands.
+
+    Returns:
+        dict: The partial results.
+
+    Raises:
+        AssertionError: If the shard is invalid or essential files or directories are not found.
+    """
+    # Ensure the shard is valid
+    assert 0 <= shard < num_shards, f"Invalid shard: {shard} of {num_shards}"
+
+    # Path to the metadata Parquet file
+    path_metadata_parquet = "untracked-files/milestone01/metadata.parquet"
+
+    # Path to the BigEarthNet-v2.0-S2-with-errors directory containing the patches
+    path_big_earth_net_errors = "untracked-files/milestone01/BigEarthNet-v2.0-S2-with-errors"
+
+    # Path to the CSV file containing patch information
+    path_patches_for_stats = "untracked-files/milestone01/patches_for_stats.csv.gz"
+
+    # Directory containing the GeoParquet files
+    path_geoparquets_dir = "untracked-files/milestone01/geoparquets"
+
+    # Ensure the directories and files exist before proceeding; raise an error if not found.
+    assert os.path.isdir(path_big_earth_net_errors), f"Directory not found: {path_big_earth_net_errors}"
+    assert os.path.isfile(path_patches_for_stats), f"File not found: {path_patches_for_stats}"
+    assert os.path.isdir(path_geoparquets_dir), f"Directory not found: {path_geoparquets_dir}"
+
+    # Load the shared metadata catalog, it provides a hashed index of the patch IDs
+    metadata = get_metadata_catalog(path_metadata_parquet)
+
+    # Patch directories of the tiles of the shard, only the directories of these tiles are walked
+    patch_dirs = []
+    for tile in sorted(os.listdir(path_big_earth_net_errors)):
+        path_tile = os.path.join(path_big_earth_net_errors, tile)
+        if os.path.isdir(path_tile) and get_shard(tile, num_shards) == shard:
+            patch_dirs.extend(find_patch_dirs(path_tile))
+
+    # Statistics patches of the tiles of the shard
+    patches_df = pd.read_csv(path_patches_for_stats, compression='gzip')
+    patch_ids_stats = [
+        patch_id for tile, patch_id in zip(patches_df["tile"], patches_df["patch_id"])
+        if get_shard(tile, num_shards) == shard
+    ]
+
+    # Scan the patches of the shard once and feed every band to all checks
+    size_check, no_data_check, band_stats = scan_dataset(
+        path_big_earth_net_errors,
+        [SizeCheckConsumer(), NoDataCheckConsumer(), BandStatsConsumer(patch_ids_stats)],
+        num_workers=num_workers,
+        patch_dirs=patch_dirs,
+        num_threads=num_threads,
+    )
+
+    # Reference maps of the tiles of the shard, the tile is the patch ID without the trailing row and column
+    patch_ids_labels = sorted(
+        filename[:-len(REFERENCE_MAP_SUFFIX)] for filename in os.listdir(path_geoparquets_dir)
+        if filename.endswith(REFERENCE_MAP_SUFFIX) and get_shard(filename[:-len(REFERENCE_MAP_SUFFIX)].rsplit("_", 2)[0], num_shards) == shard
+    )
+    file_paths = [os.path.join(path_geoparquets_dir, patch_id + REFERENCE_MAP_SUFFIX) for patch_id in patch_ids_labels]
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        num_labels_unique = list(executor.map(count_labels, file_paths))
+
+    partial = {
+        "shard": shard,
+        "num-shards": num_shards,
+        "wrong-size": size_check.report()["wrong-size"],
+        "with-no-data": no_data_check.report()["with-no-data"],
+        "not-part-of-dataset": sum(os.path.basename(dirpath) not in metadata for dirpath in patch_dirs),
+        "band-stats": {band: list(band_stats.band_stats[band]) for band in BANDS},
+        "stats-patches": {patch_id: band_stats.num_bands.get(patch_id, 0) for patch_id in patch_ids_stats},
+        "label-counts": dict(zip(patch_ids_labels, num_labels_unique)),
+    }
+
+    # Write the partial results to a temporary file first, so a partial file is never incomplete
+    os.makedirs(os.path.dirname(os.path.abspath(path_partial)), exist_ok=True)
+    path_tmp = f"{path_partial}.tmp"
+    with open(path_tmp, "w") as file:
+        json.dump(partial, file)
+    os.replace(path_tmp, path_partial)
+
+    return partial
+
+
+def merge_partials(partials: list[dict]) -> dict:
+    """
+    Merge the partial results of shards (see run_shard) into the results of their union.
+
+    Args:
+        partials (list[dict]): Partial results of shards of the same run, or merged results of such partials.
+
+    Returns:
+        dict: Merged results, with "shards", the merged shards, instead of "shard". They can be merged again.
+
+    Raises:
+        AssertionError: If there are no partials, the number of shards differs or a shard is given twice.
+    """
+    # Ensure the partials belong to the same partitioning and no shard is counted twice
+    assert partials, "No partial results given."
+    num_shards = partials[0]["num-shards"]
+    assert all(partial["num-shards"] == num_shards for partial in partials), "Partial results of different numbers of shards."
+    shards = sorted(shard for partial in partials for shard in partial.get("shards", [partial.get("shard")]))
+    assert len(set(shards)) == len(shards), f"Shards given more than once: {shards}"
+
+    merged = {
+        "shards": shards,
+        "num-shards": num_shards,
+        "wrong-size": 0,
+        "with-no-data": 0,
+        "not-part-of-dataset": 0,
+        "band-stats": {band: (0.0, 0.0, 0) for band in BANDS},
+        "stats-patches": {},
+        "label-counts": {},
+    }
+    for partial in partials:
+        # Add the counters and merge the band accumulators exactly (Chan et al.)
+        for key in ("wrong-size", "with-no-data", "not-part-of-dataset"):
+            merged[key] += partial[key]
+        for band in BANDS:
+            merged["band-stats"][band] = merge_stats(*merged["band-stats"][band], *partial["band-stats"][band])
+        merged["stats-patches"].update(partial["stats-patches"])
+        merged["label-counts"].update(partial["label-counts"])
+
+    return merged
+
+
+def reduce_shards(path_partials: list[str]) -> dict:
+    """
+    Combines the partial results of any set of shards (see run_shard) and prints the final report
+    of milestone01_task_1_4_1, milestone01_task_1_4_2 and milestone01_task_1_5_1 in their format.
+    With the partials of all shards the report is the same as the one of the tasks (up to the
+    floating-point rounding of the merge order); shards missing in the set are reported on stderr.
+
+    Args:
+        path_partials (list[str]): Paths to the JSON files of the partial results.
+
+    Returns:
+        dict: Merged results, see merge_partials.
+
+    Raises:
+        AssertionError: If a file is not found, the partials do not match or statistics patches are missing.
+    """
+    partials = []
+    for path_partial in path_partials:
+        # Ensure the partial file exists before proceeding; raise an error if not found.
+        assert os.path.isfile(path_partial), f"File not found: {path_partial}"
+
+        with open(path_partial) as file:
+            partials.append(json.load(file))
+
+    merged = merge_partials(partials)
+
+    # Report the shards which are not part of the set
+    shards_missing = sorted(set(range(merged["num-shards"])) - set(merged["shards"]))
+    if shards_missing:
+        print(f"Shards missing in the partial results: {shards_missing}", file=sys.stderr)
+
+    # Print the results of milestone01_task_1_4_1
+    print(f"wrong-size: {merged['wrong-size']}")
+    print(f"with-no-data: {merged['with-no-data']}")
+    print(f"not-part-of-dataset: {merged['not-part-of-dataset']}")
+
+    # Ensure all bands of the statistics patches were found
+    patches_missing = sorted(patch_id for patch_id, num_bands in merged["stats-patches"].items() if num_bands < len(BANDS))
+    assert not patches_missing, f"Patches not found: {patches_missing}"
+
+    # Print the results of milestone01_task_1_4_2
+    for band in BANDS:
+        mean, var, count = merged["band-stats"][band]
+        std_dev = float(np.sqrt(var / (count - 1))) if count > 1 else 0
+        print(f"{band} mean: {round(mean) if count > 1 else 0}")
+        print(f"{band} std-dev: {round(std_dev)}")
+
+    # Ensure there were valid patches processed
+    num_labels_unique = list(merged["label-counts"].values())
+    assert num_labels_unique, "No valid patches processed in the partial results."
+
+    # Print the results of milestone01_task_1_5_1
+    average_num_labels = round(sum(num_labels_unique) / len(num_labels_unique), 2)
+    print(f"geom-average-num-labels: {average_num_labels:.2f}")
+
+    return merged
+
+
+if __name__ == "__main__":
+    # Run a shard:            python -m task_1.shard run --shard 0 --num-shards 8 --output partials/shard_0.json
+    # Reduce the partials:    python -m task_1.shard reduce partials/shard_*.json
+    parser = argparse.ArgumentParser(description="Shard-and-reduce mode of the milestone01 tasks 1.4.1, 1.4.2 and 1.5.1.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    parser_run = subparsers.add_parser("run", help="Process the tiles of one shard and write the partial results.")
+    parser_run.add_argument("--shard", type=int, required=True)
+    parser_run.add_argument("--num-shards", type=int, required=True)
+    parser_run.add_argument("--output", required=True)
+    parser_run.add_argument("--num-workers", type=int, default=1)
+    parser_run.add_argument("--num-threads", type=int, default=4)
+    parser_reduce = subparsers.add_parser("reduce", help="Combine partial results and print the report.")
+    parser_reduce.add_argument("partials", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run_shard(args.shard, args.num_shards, args.output, num_workers=args.num_workers, num_threads=args.num_threads)
+    else:
+        reduce_shards(args.partials)
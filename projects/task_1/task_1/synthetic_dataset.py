@@ -0,0 +1,173 @@
+import os
+import datetime
+import rasterio
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+from rasterio.transform import from_origin
+from shapely.geometry import box
+from task_1.bands import BANDS, EXPECTED_RESOLUTIONS
+from task_1.milestone01_task_1_5 import UNLABELED_CLASS_IDS
+
+
+# Labels of the BigEarthNet-v2.0 nomenclature (19 classes)
+LABELS = [
+    "Urban fabric", "Industrial or commercial units", "Arable land", "Permanent crops", "Pastures",
+    "Complex cultivation patterns", "Land principally occupied by agriculture, with significant areas of natural vegetation",
+    "Agro-forestry areas", "Broad-leaved forest", "Coniferous forest", "Mixed forest",
+    "Natural grassland and sparsely vegetated areas", "Moors, heathland and sclerophyllous vegetation",
+    "Transitional woodland, shrub", "Beaches, dunes, sands", "Inland wetlands", "Coastal wetlands",
+    "Inland waters", "Marine waters",
+]
+
+# Labeled CORINE Land Cover class IDs of the reference maps
+CLASS_IDS = [111, 112, 121, 211, 212, 213, 221, 222, 223, 231, 241, 242, 243, 244, 311, 312, 313, 321, 322, 323, 324, 333, 411, 412, 421, 511, 512, 521, 522, 523]
+
+# Tile of the first patch, the patch "..._33_29" of this tile is the default tile of milestone01_task_1_4_3
+FIRST_TILE = "S2B_MSIL2A_20170808T094029_N9999_R036_T35ULA"
+
+# Size of a patch in meters (120 pixels of 10 m)
+PATCH_METERS = 1200
+
+# NO_DATA value of the bands
+NO_DATA = 7
+
+
+def generate_dataset(
+    path_root: str,
+    num_patches: int = 1000,
+    patches_per_tile: int = 100,
+    wrong_size_rate: float = 0.01,
+    no_data_rate: float = 0.01,
+    not_part_rate: float = 0.01,
+    overlap_rate: float = 0.01,
+    stats_rate: float = 0.1,
+    seed: int = 42,
+) -> dict:
+    """
+    Writes a synthetic BigEarthNet-like dataset in the layout expected by the milestone01 tasks:
+        path_root/untracked-files/milestone01/
+            BigEarthNet-v2.0-S2-with-errors/<tile>/<patch_id>/<patch_id>_<band>.tif
+            geoparquets/<patch_id>_reference_map.parquet
+            metadata.parquet
+            patches_for_stats.csv.gz
+
+    The bands have the sizes of EXPECTED_RESOLUTIONS. Errors are injected into random patches:
+    a band with one pixel more per side (wrong size), NO_DATA pixels in a band, a missing row in
+    the metadata (not part of the dataset), and reference-map geometries shifted by half a patch
+    into the neighboring patch (overlap). The patches of a tile are laid out on a grid starting at
+    row 33, column 29, the tiles are placed apart from each other, and the acquisition date (and
+    with it the season) changes from tile to tile.
+
+    Args:
+        path_root (str): Root directory, the tasks are run with this directory as working directory.
+        num_patches (int): Number of patches.
+        patches_per_tile (int): Number of patches per tile.
+        wrong_size_rate (float): Fraction of the patches with a band of wrong size.
+        no_data_rate (float): Fraction of the patches with NO_DATA pixels.
+        not_part_rate (float): Fraction of the patches missing in the metadata.
+        overlap_rate (float): Fraction of the patches whose geometries overlap a neighboring patch.
+        stats_rate (float): Fraction of the error-free patches listed in patches_for_stats.csv.gz.
+        seed (int): Seed of the random generator, the dataset is deterministic for a given seed.
+
+    Returns:
+        dict: Expected results of the dataset: number of patches, wrong-size, with-no-data,
+            not-part-of-dataset, geom-num-overlaps, geom-average-num-labels (unrounded)
+            and the number of patches for the statistics.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Paths of the dataset
+    path_milestone = os.path.join(path_root, "untracked-files", "milestone01")
+    path_big_earth_net_errors = os.path.join(path_milestone, "BigEarthNet-v2.0-S2-with-errors")
+    path_geoparquets_dir = os.path.join(path_milestone, "geoparquets")
+    os.makedirs(path_geoparquets_dir, exist_ok=True)
+
+    # Grid of the patches of a tile
+    num_cols = int(np.ceil(np.sqrt(patches_per_tile)))
+    num_rows = int(np.ceil(patches_per_tile / num_cols))
+
+    # Injected errors, the first patch (default tile of task 1.4.3) is always valid
+    wrong_size = rng.random(num_patches) < wrong_size_rate
+    with_no_data = rng.random(num_patches) < no_data_rate
+    not_part = rng.random(num_patches) < not_part_rate
+    wrong_size[0] = with_no_data[0] = not_part[0] = False
+
+    # Overlaps only from even columns into their (unshifted) right neighbor of the same tile
+    patch_idx = np.arange(num_patches)
+    col = (patch_idx % patches_per_tile) % num_cols
+    has_neighbor = (col + 1 < num_cols) & (patch_idx % patches_per_tile + 1 < patches_per_tile) & (patch_idx + 1 < num_patches)
+    overlap = (rng.random(num_patches) < overlap_rate) & (col % 2 == 0) & has_neighbor
+
+    metadata_rows = []
+    stats_rows = []
+    num_labels_unique = []
+    date_first = datetime.date(2017, 8, 8)
+
+    for idx in range(num_patches):
+        # Tile and patch ID, the acquisition date changes from tile to tile
+        tile_idx, tile_patch_idx = divmod(idx, patches_per_tile)
+        date = date_first + datetime.timedelta(days=37 * tile_idx)
+        tile = FIRST_TILE if tile_idx == 0 else f"S2{'AB'[tile_idx % 2]}_MSIL2A_{date:%Y%m%d}T094029_N9999_R036_T35ULA"
+        row, col_patch = divmod(tile_patch_idx, num_cols)
+        patch_id = f"{tile}_{33 + row}_{29 + col_patch}"
+
+        # Upper left corner of the patch, the tiles are placed apart from each other
+        x_min = 500000 + col_patch * PATCH_METERS
+        y_max = 6000000 - (tile_idx * (num_rows + 1) + row) * PATCH_METERS
+
+        # Write the bands
+        path_patch = os.path.join(path_big_earth_net_errors, tile, patch_id)
+        os.makedirs(path_patch, exist_ok=True)
+        band_wrong_size = BANDS[rng.integers(len(BANDS))] if wrong_size[idx] else None
+        band_no_data = BANDS[rng.integers(len(BANDS))] if with_no_data[idx] else None
+        for band in BANDS:
+            height, width = EXPECTED_RESOLUTIONS[band]
+            if band == band_wrong_size:
+                height, width = height + 1, width + 1
+            data = rng.integers(NO_DATA + 1, 10000, size=(height, width), dtype=np.uint16)
+            if band == band_no_data:
+                data[rng.integers(height), :rng.integers(1, width)] = NO_DATA
+            with rasterio.open(
+                os.path.join(path_patch, f"{patch_id}_{band}.tif"), "w", driver="GTiff",
+                width=width, height=height, count=1, dtype="uint16", nodata=NO_DATA, crs="EPSG:32635",
+                transform=from_origin(x_min, y_max, PATCH_METERS / width, PATCH_METERS / height),
+            ) as dst:
+                dst.write(data, 1)
+
+        # Reference map: vertical stripes of the patch with random (partly unlabeled) classes
+        num_stripes = int(rng.integers(1, 5))
+        class_ids = np.where(
+            rng.random(num_stripes) < 0.1,
+            rng.choice(UNLABELED_CLASS_IDS, size=num_stripes),
+            rng.choice(CLASS_IDS, size=num_stripes),
+        ).astype(np.uint16)
+        x_shift = PATCH_METERS / 2 if overlap[idx] else 0
+        edges = x_min + x_shift + np.linspace(0, PATCH_METERS, num_stripes + 1)
+        geometries = [box(edges[i], y_max - PATCH_METERS, edges[i + 1], y_max) for i in range(num_stripes)]
+        gpd.GeoDataFrame({"DN": class_ids}, geometry=geometries, crs="EPSG:32635").to_parquet(
+            os.path.join(path_geoparquets_dir, f"{patch_id}_reference_map.parquet")
+        )
+        num_labels_unique.append(len(np.unique(class_ids[~np.isin(class_ids, UNLABELED_CLASS_IDS)])))
+
+        # Metadata and patches for the statistics
+        if not not_part[idx]:
+            labels = list(rng.choice(LABELS, size=rng.integers(1, 5), replace=False))
+            metadata_rows.append({"patch_id": patch_id, "labels": labels, "split": rng.choice(["train", "validation", "test"])})
+        if idx == 0 or (not wrong_size[idx] and not with_no_data[idx] and rng.random() < stats_rate):
+            stats_rows.append({"tile": tile, "patch_id": patch_id})
+
+    pd.DataFrame(metadata_rows, columns=["patch_id", "labels", "split"]).to_parquet(os.path.join(path_milestone, "metadata.parquet"))
+    pd.DataFrame(stats_rows, columns=["tile", "patch_id"]).to_csv(
+        os.path.join(path_milestone, "patches_for_stats.csv.gz"), index=False, compression="gzip"
+    )
+
+    return {
+        "patches": num_patches,
+        "wrong-size": int(wrong_size.sum()),
+        "with-no-data": int(with_no_data.sum()),
+        "not-part-of-dataset": int(not_part.sum()),
+        "geom-num-overlaps": int(2 * overlap.sum()),
+        "geom-average-num-labels": float(np.mean(num_labels_unique)) if num_labels_unique else 0.0,
+        "patches-for-stats": len(stats_rows),
+    }
@@ -0,0 +1,189 @@
+import io
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, the process peak RSS is not reported there
+    resource = None
+
+
+class _ThreadLocalStdout:
+    """
+    Stand-in for sys.stdout which writes the output of each task into the buffer of the task
+    (bound to the thread running it) and everything else to the original stdout.
+    """
+
+    def __init__(self, stdout) -> None:
+        self.stdout = stdout
+        self.local = threading.local()
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self.local, "buffer", None)
+        return (buffer if buffer is not None else self.stdout).write(text)
+
+    def flush(self) -> None:
+        buffer = getattr(self.local, "buffer", None)
+        (buffer if buffer is not None else self.stdout).flush()
+
+    def __getattr__(self, name: str):
+        return getattr(self.stdout, name)
+
+
+class TaskRunner:
+    """
+    Runs tasks declared as a DAG, independent tasks concurrently on a pool of worker threads.
+
+    A task can depend on other tasks (its inputs). Expensive inputs, e.g. loading the metadata
+    table, are declared as tasks of their own, run once and shared by all dependent tasks;
+    their return values are available in results. Tasks run in threads of the same process, so
+    caches like the metadata catalog are shared, and the raster and Parquet readers release the GIL.
+
+    The output (stdout) of each task is buffered and printed in the order the tasks were added,
+    as soon as the task and all tasks added before it are finished, so the output is the same as
+    running the tasks sequentially. The timings of the tasks are printed to stderr.
+
+    The tasks share the process, so only the wall time is a measure of a single task: the CPU
+    time is the one of the thread running the task and the peak RSS is the high-water mark of
+    the whole process, see print_timings.
+    """
+
+    def __init__(self, num_workers: int = 1) -> None:
+        """
+        Args:
+            num_workers (int): Number of worker threads, with 1 the tasks run one after another
+                in the order they were added (respecting their inputs).
+        """
+        self.num_workers = num_workers
+        self.tasks = {}
+        self.results = {}
+        self.timings = {}
+
+    def add(self, name: str, function, inputs: list[str] | tuple = (), kwargs: dict | None = None) -> None:
+        """
+        Add a task.
+
+        Args:
+            name (str): Name of the task.
+            function: Function of the task, called with the given keyword arguments.
+            inputs (list[str]): Names of the tasks which must finish before this task starts.
+            kwargs (dict | None): Keyword arguments of the function.
+
+        Raises:
+            AssertionError: If the name is already used or an input is unknown.
+        """
+        # Ensure the name is unique and the inputs exist, which also rules out cycles
+        assert name not in self.tasks, f"Task already added: {name}"
+        for input_name in inputs:
+            assert input_name in self.tasks, f"Unknown input of task {name}: {input_name}"
+
+        self.tasks[name] = (function, list(inputs), kwargs or {})
+
+    def run(self, print_timings: bool = True) -> dict:
+        """
+        Run all tasks.
+
+        Args:
+            print_timings (bool): Whether to print the per-task timings to stderr.
+
+        Returns:
+            dict: Return value of each task.
+
+        Raises:
+            Exception: The first exception raised by a task, after the running tasks finished.
+        """
+        names = list(self.tasks)
+        buffers = {name: io.StringIO() for name in names}
+        done = set()
+        num_printed = 0
+        error = None
+
+        stdout = sys.stdout
+        sys.stdout = _ThreadLocalStdout(stdout)
+        try:
+            with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+                running = {}
+                while True:
+                    # Start the tasks whose inputs are finished, in the order they were added
+                    if error is None:
+                        for name in names:
+                            if name in done or name in running.values() or len(running) >= self.num_workers:
+                                continue
+                            if all(input_name in done for input_name in self.tasks[name][1]):
+                                running[executor.submit(self._run_task, name, buffers[name])] = name
+                    if not running:
+                        break
+
+                    # Wait for a task to finish
+                    finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        name = running.pop(future)
+                        try:
+                            self.results[name] = future.result()
+                            done.add(name)
+                        except Exception as exception:
+                            error = error or exception
+
+                    # Print the output of the finished tasks, in the order they were added
+                    while num_printed < len(names) and names[num_printed] in done:
+                        stdout.write(buffers[names[num_printed]].getvalue())
+                        num_printed += 1
+                    stdout.flush()
+        finally:
+            sys.stdout = stdout
+
+        # Print the output of the tasks finished after an error
+        for name in names[num_printed:]:
+            stdout.write(buffers[name].getvalue())
+
+        if print_timings:
+            self.print_timings()
+        if error is not None:
+            raise error
+        return self.results
+
+    def _run_task(self, name: str, buffer: io.StringIO):
+        """
+        Run a task in a worker thread, with its output bound to its buffer, and record its timings.
+        """
+        function, _, kwargs = self.tasks[name]
+        sys.stdout.local.buffer = buffer
+        time_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            return function(**kwargs)
+        finally:
+            self.timings[name] = {
+                "wall": time.perf_counter() - time_start,
+                "thread-cpu": time.thread_time() - cpu_start,
+                "process-peak-rss": get_peak_rss(),
+            }
+            sys.stdout.local.buffer = None
+
+    def print_timings(self) -> None:
+        """
+        Print the timings of the finished tasks to stderr:
+            - wall: Wall time of the task
+            - thread-cpu: CPU time of the thread running the task, the work of worker threads
+              and processes started by the task is not included
+            - process-peak-rss: Peak RSS of the process (since its start) when the task finished,
+              it includes the memory of the tasks running before and at the same time
+        """
+        for name, timing in self.timings.items():
+            peak_rss = f"{timing['process-peak-rss'] / 2**20:.0f} MiB" if timing["process-peak-rss"] is not None else "n/a"
+            print(f"{name}: wall {timing['wall']:.2f} s, thread-cpu {timing['thread-cpu']:.2f} s, process-peak-rss {peak_rss}", file=sys.stderr)
+
+
+def get_peak_rss() -> int | None:
+    """
+    Return the peak resident set size of the process (the high-water mark since its start) in bytes, None if not available.
+    """
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is given in bytes on macOS and in kilobytes on Linux
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
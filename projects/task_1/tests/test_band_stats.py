@@ -0,0 +1,69 @@
+import unittest
+
+import numpy as np
+
+from task_1.band_stats import update_stats, merge_stats, update_histogram, histogram_stats
+
+
+class TestBandStats(unittest.TestCase):
+    """
+    """
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        rng = np.random.default_rng(42)
+        self.batches = [rng.integers(0, 10000, size=size, dtype=np.uint16) for size in (14400, 3600, 400, 1)]
+        self.pixels = np.concatenate(self.batches).astype(np.float64)
+
+    def test_update_stats(self):
+        """
+        """
+        mean, var, count = 0.0, 0.0, 0
+        for batch in self.batches:
+            mean, var, count = update_stats(mean, var, count, batch)
+        self.assertEqual(count, self.pixels.size)
+        self.assertAlmostEqual(mean, self.pixels.mean(), places=6)
+        self.assertAlmostEqual(np.sqrt(var / (count - 1)), self.pixels.std(ddof=1), places=6)
+
+    def test_update_stats_empty(self):
+        """
+        """
+        self.assertEqual(update_stats(1.0, 2.0, 3, np.array([], dtype=np.uint16)), (1.0, 2.0, 3))
+
+    def test_merge_stats(self):
+        """
+        """
+        partials = [update_stats(0.0, 0.0, 0, batch) for batch in self.batches]
+        mean, var, count = 0.0, 0.0, 0
+        for partial in reversed(partials):
+            mean, var, count = merge_stats(mean, var, count, *partial)
+        self.assertEqual(count, self.pixels.size)
+        self.assertAlmostEqual(mean, self.pixels.mean(), places=6)
+        self.assertAlmostEqual(var, np.square(self.pixels - self.pixels.mean()).sum(), delta=1e-6 * var)
+
+    def test_histogram_stats(self):
+        """
+        """
+        histogram = None
+        for batch in self.batches:
+            histogram = update_histogram(histogram, batch)
+
+        # The histogram is updated in place, an empty batch adds nothing
+        self.assertIs(update_histogram(histogram, np.zeros(0, dtype=np.uint16)), histogram)
+        self.assertEqual(histogram.shape, (65536,))
+
+        stats = histogram_stats(histogram, percentiles=(2, 98))
+        self.assertEqual(stats["count"], self.pixels.size)
+        self.assertAlmostEqual(stats["mean"], self.pixels.mean(), places=6)
+        self.assertAlmostEqual(stats["std-dev"], self.pixels.std(ddof=1), places=6)
+        self.assertEqual(stats["min"], self.pixels.min())
+        self.assertEqual(stats["max"], self.pixels.max())
+        self.assertAlmostEqual(stats["median"], np.median(self.pixels))
+        for percentile in (2, 98):
+            self.assertAlmostEqual(stats["percentiles"][percentile], np.percentile(self.pixels, percentile))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from task_1.bands import EXPECTED_RESOLUTIONS
+from task_1.dataset_scan import scan_dataset, ScanConsumer, SizeCheckConsumer, NoDataCheckConsumer, BandStatsConsumer
+
+
+class TestDatasetScan(unittest.TestCase):
+    """
+    """
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path_dataset = os.path.join(self.tmp_dir.name, "dataset")
+        self.bands = {}
+
+        # Three patches, the second with a wrong-size band, the third with NO_DATA pixels
+        rng = np.random.default_rng(42)
+        for patch_id in ["tile_0_0", "tile_0_1", "tile_0_2"]:
+            path_patch = os.path.join(self.path_dataset, "tile", patch_id)
+            os.makedirs(path_patch)
+            for band, (height, width) in EXPECTED_RESOLUTIONS.items():
+                if patch_id == "tile_0_1" and band == "B05":
+                    height, width = height + 1, width + 1
+                data = rng.integers(10, 10000, size=(height, width), dtype=np.uint16)
+                if patch_id == "tile_0_2" and band == "B02":
+                    data[0, :3] = 7
+                self.bands[(patch_id, band)] = data
+                with rasterio.open(
+                    os.path.join(path_patch, f"{patch_id}_{band}.tif"), "w", driver="GTiff",
+                    width=width, height=height, count=1, dtype="uint16", nodata=7,
+                    crs="EPSG:32635", transform=from_origin(0, 1200, 1200 / width, 1200 / height),
+                ) as dst:
+                    dst.write(data, 1)
+
+    def tearDown(self) -> None:
+        """
+        This method is called after each test.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_checks(self):
+        """
+        """
+        for num_workers in (1, 2):
+            size_check, no_data_check = scan_dataset(self.path_dataset, [SizeCheckConsumer(), NoDataCheckConsumer()], num_workers=num_workers)
+            self.assertEqual(size_check.report(), {"wrong-size": 1})
+            self.assertEqual(no_data_check.report(), {"with-no-data": 1})
+
+    def test_band_stats(self):
+        """
+        """
+        pixels = np.concatenate([self.bands[(patch_id, "B02")].ravel() for patch_id in ["tile_0_0", "tile_0_2"]])
+        pixels = pixels[pixels != 7]
+        for num_workers in (1, 2):
+            band_stats, = scan_dataset(self.path_dataset, [BandStatsConsumer(["tile_0_0", "tile_0_2", "tile_9_9"])], num_workers=num_workers)
+            report = band_stats.report()
+            self.assertEqual(report["B02"]["count"], pixels.size)
+            self.assertAlmostEqual(report["B02"]["mean"], pixels.mean(), places=6)
+            self.assertAlmostEqual(report["B02"]["std-dev"], pixels.std(ddof=1), places=6)
+            self.assertEqual(report["patches-missing"], ["tile_9_9"])
+
+    def test_incomplete_consumer(self):
+        """
+        """
+        class CountConsumer(ScanConsumer):
+            def consume_patch(self, patch_id: str) -> None:
+                pass
+
+            def report(self) -> dict:
+                return {}
+
+        # A consumer without merge() fails when it is created, not at the end of a parallel scan
+        with self.assertRaises(TypeError):
+            CountConsumer()
+
+
+if __name__ == "__main__":
+    unittest.main()
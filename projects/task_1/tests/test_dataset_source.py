@@ -0,0 +1,197 @@
+import os
+import tarfile
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.transform import from_origin
+
+from task_1.bands import EXPECTED_RESOLUTIONS
+from task_1.dataset_scan import scan_dataset, scan_source, SizeCheckConsumer, NoDataCheckConsumer, BandStatsConsumer, PatchIdsConsumer
+from task_1.dataset_source import DatasetSource, DirectorySource, TarSource, build_tar_index, open_dataset_source, zstandard
+from task_1.raster_reader import read_band_bytes
+from task_1.metrics import get_metrics, reset_metrics
+from task_1.milestone01_task_1_4 import iter_stats_bands_archive
+
+
+class TestDatasetSource(unittest.TestCase):
+    """
+    """
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path_dataset = os.path.join(self.tmp_dir.name, "dataset")
+
+        # Three patches, the second with a wrong-size band, the third with NO_DATA pixels
+        rng = np.random.default_rng(42)
+        for patch_id in ["tile_0_0", "tile_0_1", "tile_0_2"]:
+            path_patch = os.path.join(self.path_dataset, "tile", patch_id)
+            os.makedirs(path_patch)
+            for band, (height, width) in EXPECTED_RESOLUTIONS.items():
+                if patch_id == "tile_0_1" and band == "B05":
+                    height, width = height + 1, width + 1
+                data = rng.integers(10, 10000, size=(height, width), dtype=np.uint16)
+                if patch_id == "tile_0_2" and band == "B02":
+                    data[0, :3] = 7
+                with rasterio.open(
+                    os.path.join(path_patch, f"{patch_id}_{band}.tif"), "w", driver="GTiff",
+                    width=width, height=height, count=1, dtype="uint16", nodata=7,
+                    crs="EPSG:32635", transform=from_origin(0, 1200, 1200 / width, 1200 / height),
+                ) as dst:
+                    dst.write(data, 1)
+
+        # Archives of the dataset directory, uncompressed and compressed
+        self.path_tar = os.path.join(self.tmp_dir.name, "dataset.tar")
+        self.path_tar_gz = os.path.join(self.tmp_dir.name, "dataset.tar.gz")
+        for path_archive, mode in [(self.path_tar, "w"), (self.path_tar_gz, "w:gz")]:
+            with tarfile.open(path_archive, mode) as tar:
+                tar.add(self.path_dataset, arcname="dataset")
+
+    def tearDown(self) -> None:
+        """
+        This method is called after each test.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_members(self):
+        """
+        """
+        directory = DirectorySource(self.path_dataset)
+        names = directory.list_members(suffix=".tif")
+        self.assertEqual(len(names), 3 * len(EXPECTED_RESOLUTIONS))
+        self.assertEqual(names[0], "tile/tile_0_0/tile_0_0_B01.tif")
+
+        # The archive contains the same files under its root directory, with the same content
+        for path_archive in (self.path_tar, self.path_tar_gz):
+            source = open_dataset_source(path_archive)
+            self.assertIsInstance(source, TarSource)
+            members = dict(source.iter_members(suffix=".tif"))
+            self.assertEqual(sorted(members), [f"dataset/{name}" for name in names])
+            self.assertEqual(members[f"dataset/{names[0]}"], directory.read_member(names[0]))
+
+        # The band is decoded from memory
+        data, nodata = read_band_bytes(directory.read_member(names[0]))
+        self.assertEqual(data.shape, EXPECTED_RESOLUTIONS["B01"])
+        self.assertEqual(nodata, 7)
+
+    def test_incomplete_source(self):
+        """
+        """
+        class ListSource(DatasetSource):
+            def iter_members(self, suffix: str = ""):
+                yield from []
+
+            def list_members(self, suffix: str = "") -> list[str]:
+                return []
+
+        # A source without read_member() and stat_member() fails when it is created
+        with self.assertRaises(TypeError):
+            ListSource()
+
+    def test_tar_index(self):
+        """
+        """
+        path_index = os.path.join(self.tmp_dir.name, "index", "dataset.parquet")
+        self.assertEqual(build_tar_index(self.path_tar, path_index), 3 * len(EXPECTED_RESOLUTIONS))
+
+        # Random access with the prebuilt index and with an index built on first use
+        directory = DirectorySource(self.path_dataset)
+        name = "tile/tile_0_1/tile_0_1_B05.tif"
+        for source in (TarSource(self.path_tar, path_index=path_index), TarSource(self.path_tar)):
+            self.assertEqual(source.read_member(f"dataset/{name}"), directory.read_member(name))
+            with self.assertRaises(AssertionError):
+                source.read_member("dataset/missing.tif")
+
+        # A compressed archive can only be streamed
+        with self.assertRaises(AssertionError):
+            TarSource(self.path_tar_gz).read_member(f"dataset/{name}")
+        with self.assertRaises(AssertionError):
+            build_tar_index(self.path_tar_gz, path_index)
+
+    def test_read_members(self):
+        """
+        """
+        path_index = os.path.join(self.tmp_dir.name, "index", "dataset.parquet")
+        build_tar_index(self.path_tar, path_index)
+
+        # A subset of the members, read with random access or picked from a single streaming pass
+        directory = DirectorySource(self.path_dataset)
+        names = ["tile/tile_0_2/tile_0_2_B02.tif", "tile/tile_0_0/tile_0_0_B12.tif"]
+        for source in (TarSource(self.path_tar, path_index=path_index), TarSource(self.path_tar), TarSource(self.path_tar_gz)):
+            members = dict(source.read_members([f"dataset/{name}" for name in names]))
+            self.assertEqual(members, {f"dataset/{name}": directory.read_member(name) for name in names})
+            with self.assertRaises(AssertionError):
+                dict(source.read_members(["dataset/missing.tif"]))
+
+        # Size and modification time of a member, the archive keeps the modification time with less precision
+        size, mtime_ns = directory.stat_member(names[0])
+        size_tar, mtime_ns_tar = TarSource(self.path_tar, path_index=path_index).stat_member(f"dataset/{names[0]}")
+        self.assertEqual(size_tar, size)
+        self.assertAlmostEqual(mtime_ns_tar, mtime_ns, delta=10**9)
+        self.assertFalse(TarSource(self.path_tar_gz).random_access)
+
+    def test_stats_bands_archive(self):
+        """
+        """
+        patches_df = pd.DataFrame({"tile": ["tile"], "patch_id": ["tile_0_0"]})
+        directory = DirectorySource(self.path_dataset)
+        for source in (TarSource(self.path_tar), TarSource(self.path_tar_gz)):
+            reset_metrics()
+            bands = {band: data for _, band, data, _ in iter_stats_bands_archive(source, patches_df, num_threads=2)}
+            self.assertEqual(sorted(bands), sorted(EXPECTED_RESOLUTIONS))
+            np.testing.assert_array_equal(bands["B02"], read_band_bytes(directory.read_member("tile/tile_0_0/tile_0_0_B02.tif"))[0])
+
+            # The archive is not read after the bands of the first patch, also when it is compressed
+            self.assertEqual(get_metrics()["source.read"]["items"], len(EXPECTED_RESOLUTIONS))
+
+        # A missing patch is reported
+        with self.assertRaises(AssertionError):
+            list(iter_stats_bands_archive(TarSource(self.path_tar_gz), pd.DataFrame({"tile": ["tile"], "patch_id": ["tile_9_9"]})))
+        reset_metrics()
+
+    def test_scan_source(self):
+        """
+        """
+        size_check, no_data_check, band_stats = scan_dataset(
+            self.path_dataset, [SizeCheckConsumer(), NoDataCheckConsumer(), BandStatsConsumer(["tile_0_0", "tile_0_2"])],
+        )
+        for path_archive in (self.path_tar, self.path_tar_gz):
+            for num_threads in (1, 4):
+                size_check_tar, no_data_check_tar, band_stats_tar, patch_ids = scan_source(
+                    open_dataset_source(path_archive),
+                    [SizeCheckConsumer(), NoDataCheckConsumer(), BandStatsConsumer(["tile_0_0", "tile_0_2"]), PatchIdsConsumer()],
+                    num_threads=num_threads,
+                )
+                self.assertEqual(size_check_tar.report(), size_check.report())
+                self.assertEqual(no_data_check_tar.report(), no_data_check.report())
+                self.assertEqual(band_stats_tar.report(), band_stats.report())
+                self.assertEqual(patch_ids.report(), {"patch-ids": ["tile_0_0", "tile_0_1", "tile_0_2"]})
+
+    def test_scan_source_not_contiguous(self):
+        """
+        """
+        # The bands of a patch are interrupted by a band of another patch
+        path_archive = os.path.join(self.tmp_dir.name, "shuffled.tar")
+        with tarfile.open(path_archive, "w") as tar:
+            for patch_id, band in [("tile_0_0", "B01"), ("tile_0_1", "B01"), ("tile_0_0", "B02")]:
+                tar.add(os.path.join(self.path_dataset, "tile", patch_id, f"{patch_id}_{band}.tif"), arcname=f"tile/{patch_id}/{patch_id}_{band}.tif")
+        with self.assertRaises(AssertionError):
+            scan_source(TarSource(path_archive), [SizeCheckConsumer()])
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_tar_zst(self):
+        """
+        """
+        path_tar_zst = os.path.join(self.tmp_dir.name, "dataset.tar.zst")
+        with open(self.path_tar, "rb") as src, open(path_tar_zst, "wb") as dst:
+            zstandard.ZstdCompressor().copy_stream(src, dst)
+        self.assertEqual(dict(TarSource(path_tar_zst).iter_members()), dict(TarSource(self.path_tar).iter_members()))
+
+
+if __name__ == "__main__":
+    unittest.main()
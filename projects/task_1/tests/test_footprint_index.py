@@ -0,0 +1,133 @@
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+import geopandas as gpd
+from shapely.geometry import box
+
+from task_1.footprint_index import build_footprint_index, FootprintIndex
+from task_1.milestone01_task_1_5 import milestone01_task_1_5_2
+from task_1.metrics import get_metrics, reset_metrics
+
+
+class TestFootprintIndex(unittest.TestCase):
+    """
+    """
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path_geoparquets_dir = os.path.join(self.tmp_dir.name, "geoparquets")
+        self.path_index = os.path.join(self.tmp_dir.name, "index", "footprints.npz")
+        os.makedirs(self.path_geoparquets_dir)
+
+        # patch_a and patch_b share an interior, patch_c touches patch_b, patch_d is apart
+        footprints = {
+            "patch_a": [box(0, 0, 1, 2), box(1, 0, 2, 2)],
+            "patch_b": [box(1.5, 0, 3, 2)],
+            "patch_c": [box(3, 0, 4, 2)],
+            "patch_d": [box(10, 10, 11, 11)],
+        }
+        for patch_id, geometries in footprints.items():
+            gpd.GeoDataFrame({"DN": [211] * len(geometries)}, geometry=geometries, crs="EPSG:32635").to_parquet(
+                os.path.join(self.path_geoparquets_dir, f"{patch_id}_reference_map.parquet")
+            )
+
+    def tearDown(self) -> None:
+        """
+        This method is called after each test.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_query(self):
+        """
+        """
+        self.assertEqual(build_footprint_index(self.path_geoparquets_dir, self.path_index), 4)
+        index = FootprintIndex(self.path_index)
+        self.assertEqual(index.query((0.5, 0.5, 1.6, 1.0)), ["patch_a", "patch_b"])
+        self.assertEqual(index.query(box(9, 9, 12, 12), crs="EPSG:32635"), ["patch_d"])
+        self.assertEqual(index.query(box(9, 9, 12, 12), crs="EPSG:32634"), [])
+        self.assertEqual(index.neighbors("patch_b"), ["patch_a", "patch_c"])
+
+    def test_overlap_candidates(self):
+        """
+        """
+        build_footprint_index(self.path_geoparquets_dir, self.path_index)
+        index = FootprintIndex(self.path_index)
+        self.assertEqual(index.overlap_candidates(), ["patch_a", "patch_b"])
+        self.assertEqual(index.overlap_candidates(predicate="intersects"), ["patch_a", "patch_b", "patch_c"])
+
+    def write_patch(self, patch_id: str, geometries: list) -> None:
+        """
+        Write the reference map of a patch.
+        """
+        gpd.GeoDataFrame({"DN": [211] * len(geometries)}, geometry=geometries, crs="EPSG:32635").to_parquet(
+            os.path.join(self.path_geoparquets_dir, f"{patch_id}_reference_map.parquet")
+        )
+
+    def count_overlaps(self, path_source: str | None = None, **kwargs) -> str:
+        """
+        Run milestone01_task_1_5_2 on the test directory (or another source) and return its output.
+        """
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            milestone01_task_1_5_2(path_source=path_source or self.path_geoparquets_dir, **kwargs)
+        return stdout.getvalue()
+
+    def test_self_overlap(self):
+        """
+        """
+        # The geometries of patch_e touch each other, its footprint is apart from the others
+        self.write_patch("patch_e", [box(20, 20, 21, 21), box(21, 20, 22, 21)])
+        build_footprint_index(self.path_geoparquets_dir, self.path_index)
+        self.assertIn("patch_e", FootprintIndex(self.path_index).overlap_candidates(predicate="intersects"))
+        self.assertNotIn("patch_e", FootprintIndex(self.path_index).overlap_candidates(predicate="interior"))
+        for predicate in ("interior", "intersects"):
+            self.assertEqual(
+                self.count_overlaps(predicate=predicate, path_footprint_index=self.path_index),
+                self.count_overlaps(predicate=predicate),
+            )
+
+    def test_stale_index(self):
+        """
+        """
+        build_footprint_index(self.path_geoparquets_dir, self.path_index)
+
+        # patch_e is added after the index was built and overlaps the indexed patch_d
+        self.write_patch("patch_e", [box(10.5, 10.5, 12, 12)])
+        self.assertEqual(self.count_overlaps(), "geom-num-overlaps: 4\n")
+        self.assertEqual(self.count_overlaps(path_footprint_index=self.path_index), "geom-num-overlaps: 4\n")
+
+        # patch_c is modified after the index was built and now overlaps patch_d
+        self.write_patch("patch_e", [box(30, 30, 31, 31)])
+        self.write_patch("patch_c", [box(3, 0, 4, 2), box(10.5, 10.5, 12, 12)])
+        self.assertEqual(self.count_overlaps(), self.count_overlaps(path_footprint_index=self.path_index))
+
+    def test_archive(self):
+        """
+        """
+        path_tar = os.path.join(self.tmp_dir.name, "geoparquets.tar")
+        with tarfile.open(path_tar, "w") as tar:
+            tar.add(self.path_geoparquets_dir, arcname="geoparquets")
+        self.assertEqual(build_footprint_index(path_tar, self.path_index), 4)
+
+        # Only the candidates patch_a and patch_b are read from the archive
+        reset_metrics()
+        self.assertEqual(self.count_overlaps(path_source=path_tar, path_footprint_index=self.path_index), "geom-num-overlaps: 2\n")
+        self.assertEqual(get_metrics()["task_1_5_2.read"]["files_opened"], 2)
+
+        # The index of the directory is stale for the archive (other modification times), all patches are read
+        build_footprint_index(self.path_geoparquets_dir, self.path_index)
+        reset_metrics()
+        self.assertEqual(self.count_overlaps(path_source=path_tar, path_footprint_index=self.path_index), "geom-num-overlaps: 2\n")
+        self.assertEqual(get_metrics()["task_1_5_2.read"]["files_opened"], 4)
+        reset_metrics()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from task_1.label_split import build_label_incidence, get_row_labels, stratified_split, save_split, SplitIndex, TRAIN, TEST, UNASSIGNED
+
+
+class TestLabelSplit(unittest.TestCase):
+    """
+    """
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        rng = np.random.default_rng(0)
+        names = ["Forest", "Water", "Urban", "Arable", "Wetland"]
+        self.labels = pd.Series([
+            list(rng.choice(names, size=rng.integers(1, 4), replace=False, p=[0.4, 0.3, 0.15, 0.1, 0.05]))
+            for _ in range(2000)
+        ] + [[]] * 10)
+
+    def test_incidence(self):
+        """
+        """
+        indptr, indices, label_names = build_label_incidence(pd.Series([["b", "a", "b"], [], ["c"]]))
+        self.assertEqual(list(label_names), ["a", "b", "c"])
+        self.assertEqual(list(indptr), [0, 2, 2, 3])
+        self.assertEqual(list(indices), [0, 1, 2])
+        self.assertEqual(list(get_row_labels(indptr, indices, np.array([2, 0]))), [2, 0, 1])
+
+    def test_deterministic(self):
+        """
+        """
+        indptr, indices, label_names = build_label_incidence(self.labels)
+        assignment_a = stratified_split(indptr, indices, len(label_names), seed=1)
+        assignment_b = stratified_split(indptr, indices, len(label_names), seed=1)
+        assignment_c = stratified_split(indptr, indices, len(label_names), seed=2)
+        np.testing.assert_array_equal(assignment_a, assignment_b)
+        self.assertFalse(np.array_equal(assignment_a, assignment_c))
+
+    def test_ratio(self):
+        """
+        """
+        indptr, indices, label_names = build_label_incidence(self.labels)
+        assignment = stratified_split(indptr, indices, len(label_names), ratio_train=0.8)
+
+        # Every patch is assigned, including the patches without labels
+        self.assertTrue(np.isin(assignment, [TRAIN, TEST]).all())
+        self.assertAlmostEqual((assignment == TRAIN).mean(), 0.8, delta=0.01)
+
+        # The ratio of each label is close to the overall ratio
+        rows = np.repeat(np.arange(len(assignment)), np.diff(indptr))
+        label_counts = np.bincount(indices, minlength=len(label_names))
+        train_counts = np.bincount(indices[assignment[rows] == TRAIN], minlength=len(label_names))
+        np.testing.assert_allclose(train_counts / label_counts, 0.8, atol=0.03)
+
+    def test_balance_baseline(self):
+        """
+        """
+        indptr, indices, label_names = build_label_incidence(self.labels)
+        assignment = stratified_split(indptr, indices, len(label_names), ratio_train=0.8)
+
+        # Baseline split of milestone01_task_1_6: labels in alphabetical order, patches already
+        # assigned by an earlier label keep their split
+        metadata = pd.DataFrame({"patch_id": np.arange(len(self.labels)), "labels": self.labels})
+        patches_train = set()
+        patches_test = set()
+        for label in label_names:
+            patches_with_label = metadata[metadata["labels"].apply(lambda x: label in x)]["patch_id"]
+            shuffled_patches = patches_with_label.sample(frac=1, random_state=42).reset_index(drop=True)
+            split_idx = int(len(shuffled_patches) * 0.8)
+            patches_train.update(patch for patch in shuffled_patches[:split_idx] if patch not in patches_test)
+            patches_test.update(patch for patch in shuffled_patches[split_idx:] if patch not in patches_train)
+        baseline = np.isin(np.arange(len(self.labels)), list(patches_train))
+
+        # The largest deviation of the per-label train ratio from 0.8 is smaller than the baseline's
+        rows = np.repeat(np.arange(len(assignment)), np.diff(indptr))
+        label_counts = np.bincount(indices, minlength=len(label_names))
+        deviation = np.abs(np.bincount(indices[assignment[rows] == TRAIN], minlength=len(label_names)) / label_counts - 0.8).max()
+        deviation_baseline = np.abs(np.bincount(indices[baseline[rows]], minlength=len(label_names)) / label_counts - 0.8).max()
+        self.assertLess(deviation, 0.005)
+        self.assertGreater(deviation_baseline, 0.02)
+        self.assertLess(deviation, deviation_baseline / 10)
+
+    def test_incremental(self):
+        """
+        """
+        indptr, indices, label_names = build_label_incidence(self.labels)
+        assignment = stratified_split(indptr, indices, len(label_names))
+
+        # Drop the assignment of some patches, the others are kept fixed
+        partial = assignment.copy()
+        partial[:100] = -1
+        extended = stratified_split(indptr, indices, len(label_names), assignment=partial)
+        np.testing.assert_array_equal(extended[100:], assignment[100:])
+        self.assertTrue(np.isin(extended, [TRAIN, TEST]).all())
+
+    def test_split_index(self):
+        """
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path_split_parquet = os.path.join(tmp_dir, "split.parquet")
+            patch_ids = np.array(["patch_a", "patch_b", "patch_c", "patch_d"])
+            save_split(path_split_parquet, patch_ids, np.array([TRAIN, TEST, UNASSIGNED, TRAIN]))
+
+            index = SplitIndex(path_split_parquet)
+            self.assertEqual(len(index), 3)
+            self.assertIn("patch_a", index)
+            self.assertNotIn("patch_c", index)
+            self.assertEqual(index.get_split("patch_b"), "test")
+            self.assertIsNone(index.get_split("patch_c"))
+            self.assertEqual(list(index.get_patches("train")), ["patch_a", "patch_d"])
+            self.assertEqual(list(index.lookup(["patch_d", "patch_e", "patch_b"])), [TRAIN, UNASSIGNED, TEST])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from task_1.metadata_catalog import MetadataCatalog, get_metadata_catalog
+
+
+class TestMetadataCatalog(unittest.TestCase):
+    """
+    """
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path_metadata_parquet = os.path.join(self.tmp_dir.name, "metadata.parquet")
+        pd.DataFrame({
+            "patch_id": ["patch_a", "patch_b", "patch_c"],
+            "labels": [["Forest"], ["Forest", "Water"], []],
+            "split": ["train", "test", "validation"],
+        }).to_parquet(self.path_metadata_parquet)
+
+    def tearDown(self) -> None:
+        """
+        This method is called after each test.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_read_columns(self):
+        """
+        """
+        catalog = MetadataCatalog(self.path_metadata_parquet)
+        metadata = catalog.read(columns=["labels", "patch_id"])
+        self.assertEqual(list(metadata.columns), ["labels", "patch_id"])
+        self.assertEqual(set(catalog._columns), {"labels", "patch_id"})
+        with self.assertRaises(AssertionError):
+            catalog.read(columns=["missing"])
+
+    def test_patch_index(self):
+        """
+        """
+        catalog = MetadataCatalog(self.path_metadata_parquet)
+        self.assertIn("patch_b", catalog)
+        self.assertNotIn("patch_d", catalog)
+        self.assertEqual(catalog.patch_index["patch_c"], 2)
+        self.assertEqual(len(catalog), 3)
+
+    def test_shared_catalog(self):
+        """
+        """
+        self.assertIs(get_metadata_catalog(self.path_metadata_parquet), get_metadata_catalog(self.path_metadata_parquet))
+
+
+if __name__ == "__main__":
+    unittest.main()
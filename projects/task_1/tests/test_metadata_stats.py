@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+import pyarrow as pa
+
+from task_1.milestone01_task_1_3 import count_metadata_stats, merge_metadata_stats, get_season, SEASONS, MONTH_TO_SEASON
+
+
+class TestMetadataStats(unittest.TestCase):
+    """
+    """
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        self.patch_ids = pa.array([
+            "S2A_MSIL2A_20170415T094029_N9999_R036_T35ULA_0_1",
+            "S2B_MSIL2A_20170808T094029_N9999_R036_T35ULA_1_0",
+            "S2B_MSIL2A_20171220T094029_N9999_R036_T35ULA_2_0",
+            "S2B_MSIL2A_20171020T094029_N9999_R036_T35ULA_3_0",
+            "no_date",
+            None,
+        ])
+        self.labels = pa.array([["Forest"], ["Forest", "Water"], [], None, ["Urban", "Water", "Forest"], ["Water"]])
+
+    def test_lookup(self):
+        """
+        """
+        for month in range(1, 13):
+            self.assertEqual(SEASONS[MONTH_TO_SEASON[month]], get_season(month))
+
+    def test_count(self):
+        """
+        """
+        stats = count_metadata_stats(self.patch_ids, self.labels)
+        self.assertEqual(list(stats["season_counts"]), [1, 1, 1, 1, 2])
+        self.assertEqual(stats["count"], 5)
+        self.assertEqual(stats["label_sum"], 6)
+        self.assertEqual(stats["label_max"], 3)
+
+    def test_merge(self):
+        """
+        """
+        stats = count_metadata_stats(self.patch_ids, self.labels)
+        merged = merge_metadata_stats(
+            count_metadata_stats(self.patch_ids[:2], self.labels[:2]),
+            count_metadata_stats(self.patch_ids[2:], self.labels[2:]),
+        )
+        np.testing.assert_array_equal(merged["season_counts"], stats["season_counts"])
+        for key in ["count", "label_sum", "label_max"]:
+            self.assertEqual(merged[key], stats[key])
+
+
+if __name__ == "__main__":
+    unittest.main()
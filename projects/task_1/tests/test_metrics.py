@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from task_1.metrics import (
+    record,
+    timer,
+    get_metrics,
+    reset_metrics,
+    set_metrics_enabled,
+    export_json_lines,
+    export_prometheus,
+    SamplingProfiler,
+)
+from task_1.bands import EXPECTED_RESOLUTIONS
+from task_1.dataset_scan import scan_dataset, SizeCheckConsumer
+from task_1.raster_reader import read_band_file
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    """
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        reset_metrics()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        """
+        This method is called after each test.
+        """
+        reset_metrics()
+        set_metrics_enabled(True)
+        self.tmp_dir.cleanup()
+
+    def test_record(self):
+        """
+        """
+        record("stage", files_opened=1, bytes_read=100)
+        record("stage", files_opened=2, items=5)
+        with timer("stage", items=3):
+            time.sleep(0.01)
+        metrics = get_metrics()
+        self.assertEqual(metrics["stage"]["files_opened"], 3)
+        self.assertEqual(metrics["stage"]["bytes_read"], 100)
+        self.assertEqual(metrics["stage"]["items"], 8)
+        self.assertEqual(metrics["stage"]["decode_seconds"], 0)
+        self.assertGreater(metrics["stage"]["compute_seconds"], 0)
+
+        # Nothing is recorded while disabled
+        set_metrics_enabled(False)
+        record("stage", files_opened=1)
+        self.assertEqual(get_metrics()["stage"]["files_opened"], 3)
+
+        reset_metrics()
+        self.assertEqual(get_metrics(), {})
+
+    def test_read_band_file(self):
+        """
+        """
+        path_tif = os.path.join(self.tmp_dir.name, "band.tif")
+        with rasterio.open(
+            path_tif, "w", driver="GTiff", width=20, height=20, count=1, dtype="uint16",
+            crs="EPSG:32635", transform=from_origin(0, 0, 60, 60),
+        ) as dst:
+            dst.write(np.ones((20, 20), dtype=np.uint16), 1)
+        read_band_file(path_tif)
+        read_band_file(path_tif)
+        metrics = get_metrics()["raster.read"]
+        self.assertEqual(metrics["files_opened"], 2)
+        self.assertEqual(metrics["bytes_read"], 2 * os.path.getsize(path_tif))
+        self.assertEqual(metrics["items"], 2)
+
+    def test_process_pool(self):
+        """
+        """
+        # Two patches with all bands
+        for patch_id in ["tile_0_0", "tile_0_1"]:
+            path_patch = os.path.join(self.tmp_dir.name, "dataset", "tile", patch_id)
+            os.makedirs(path_patch)
+            for band, (height, width) in EXPECTED_RESOLUTIONS.items():
+                with rasterio.open(
+                    os.path.join(path_patch, f"{patch_id}_{band}.tif"), "w", driver="GTiff", width=width, height=height,
+                    count=1, dtype="uint16", crs="EPSG:32635", transform=from_origin(0, 1200, 1200 / width, 1200 / height),
+                ) as dst:
+                    dst.write(np.ones((height, width), dtype=np.uint16), 1)
+
+        # The counters of the worker processes are added to the counters of this process
+        for num_workers in (1, 2):
+            reset_metrics()
+            scan_dataset(os.path.join(self.tmp_dir.name, "dataset"), [SizeCheckConsumer()], num_workers=num_workers)
+            metrics = get_metrics()
+            self.assertEqual(metrics["raster.read"]["files_opened"], 2 * len(EXPECTED_RESOLUTIONS))
+            self.assertEqual(metrics["scan.consumers"]["items"], 2 * len(EXPECTED_RESOLUTIONS))
+            self.assertGreater(metrics["raster.read"]["decode_seconds"], 0)
+
+    def test_export(self):
+        """
+        """
+        record("raster.read", files_opened=12, bytes_read=1024)
+        record("metadata.read", files_opened=1)
+
+        # JSON lines are appended, one line per stage
+        path_jsonl = os.path.join(self.tmp_dir.name, "metrics.jsonl")
+        export_json_lines(path_jsonl)
+        export_json_lines(path_jsonl)
+        with open(path_jsonl) as file:
+            lines = [json.loads(line) for line in file]
+        self.assertEqual([line["stage"] for line in lines], ["metadata.read", "raster.read"] * 2)
+        self.assertEqual(lines[1]["files_opened"], 12)
+        self.assertEqual(lines[1]["bytes_read"], 1024)
+
+        # Prometheus text, one counter per metric with the stage as label
+        text = export_prometheus()
+        self.assertIn("# TYPE task_1_files_opened_total counter", text)
+        self.assertIn('task_1_files_opened_total{stage="raster.read"} 12', text)
+        self.assertIn('task_1_bytes_read_total{stage="metadata.read"} 0', text)
+
+    def test_sampling_profiler(self):
+        """
+        """
+        def busy_function() -> None:
+            time_end = time.perf_counter() + 0.2
+            while time.perf_counter() < time_end:
+                pass
+
+        with SamplingProfiler(interval=0.002) as profiler:
+            busy_function()
+        self.assertGreater(profiler.num_samples, 0)
+        self.assertTrue(any("busy_function" in stack for stack in profiler.stacks))
+
+        path_profile = os.path.join(self.tmp_dir.name, "profile.txt")
+        text = profiler.export_collapsed(path_profile)
+        with open(path_profile) as file:
+            self.assertEqual(file.read(), text)
+        self.assertEqual(sum(int(line.rsplit(" ", 1)[1]) for line in text.splitlines()), sum(profiler.stacks.values()))
+        self.assertLessEqual(len(profiler.top(3)), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
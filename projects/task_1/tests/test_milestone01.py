@@ -3,7 +3,7 @@ import unittest
 from task_1.main import main
 from task_1.milestone01 import milestone01_tasks
 from task_1.milestone01_task_1_3 import milestone01_task_1_3
-from task_1.milestone01_task_1_4 import milestone01_task_1_4, milestone01_task_1_4_1, milestone01_task_1_4_2, milestone01_task_1_4_3
+from task_1.milestone01_task_1_4 import milestone01_task_1_4, milestone01_task_1_4_1, milestone01_task_1_4_2, milestone01_task_1_4_2_histogram, milestone01_task_1_4_3, milestone01_task_1_4_fused
 from task_1.milestone01_task_1_5 import milestone01_task_1_5, milestone01_task_1_5_1, milestone01_task_1_5_2
 from task_1.milestone01_task_1_6 import milestone01_task_1_6
 
@@ -54,12 +54,45 @@ class TestMilestone01(unittest.TestCase):
         milestone01_task_1_4_1()
         self.assertTrue(True)
 
+    def test_milestone_task_1_4_1_parallel(self):
+        """
+        """
+        milestone01_task_1_4_1(num_workers=2)
+        self.assertTrue(True)
+
+    def test_milestone_task_1_4_1_size_only(self):
+        """
+        """
+        milestone01_task_1_4_1(no_data_check="off")
+        self.assertTrue(True)
+
     def test_milestone_task_1_4_2(self):
         """
         """
         milestone01_task_1_4_2()
         self.assertTrue(True)
 
+    def test_milestone_task_1_4_2_histogram(self):
+        """
+        """
+        milestone01_task_1_4_2_histogram(percentiles=(2, 98))
+        self.assertTrue(True)
+
+    def test_milestone_task_1_4_cached(self):
+        """
+        """
+        path_cache_db = "untracked-files/cache/results.sqlite"
+        milestone01_task_1_4_1(path_cache_db=path_cache_db)
+        milestone01_task_1_4_1(path_cache_db=path_cache_db)
+        milestone01_task_1_4_2(path_cache_db=path_cache_db)
+        self.assertTrue(True)
+
+    def test_milestone_task_1_4_fused(self):
+        """
+        """
+        milestone01_task_1_4_fused(num_workers=2)
+        self.assertTrue(True)
+
     def test_milestone_task_1_4_3(self):
         """
         """
@@ -78,6 +111,12 @@ class TestMilestone01(unittest.TestCase):
         milestone01_task_1_5_1()
         self.assertTrue(True)
 
+    def test_milestone_task_1_5_1_parallel(self):
+        """
+        """
+        milestone01_task_1_5_1(num_workers=4)
+        self.assertTrue(True)
+
     def test_milestone_task_1_5_2(self):
         """
         """
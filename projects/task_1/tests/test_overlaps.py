@@ -0,0 +1,73 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+import numpy as np
+import geopandas as gpd
+from shapely.geometry import box
+
+from task_1.milestone01_task_1_5 import find_overlapping_pairs, milestone01_task_1_5_2
+from task_1.overlap_partitions import find_overlapping_patches_partitioned
+
+
+class TestOverlaps(unittest.TestCase):
+    """
+    """
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        # Box 1 touches box 0 at an edge, box 2 shares an interior with box 1, box 3 is apart
+        self.geometries = np.array([box(0, 0, 1, 1), box(1, 0, 2, 1), box(1.5, 0.5, 2.5, 1.5), box(5, 5, 6, 6)])
+
+    def test_interior(self):
+        """
+        """
+        left, right = find_overlapping_pairs(self.geometries, predicate="interior")
+        self.assertEqual(list(zip(left, right)), [(1, 2)])
+
+    def test_intersects(self):
+        """
+        """
+        left, right = find_overlapping_pairs(self.geometries, predicate="intersects")
+        self.assertEqual(sorted(zip(left, right)), [(0, 1), (1, 2)])
+
+    def test_partitioned(self):
+        """
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # One file per geometry, i.e. one patch per geometry
+            file_paths = []
+            for idx, geometry in enumerate(self.geometries):
+                file_paths.append(os.path.join(tmp_dir, f"patch_{idx}_reference_map.parquet"))
+                gpd.GeoDataFrame({"DN": [211]}, geometry=[geometry], crs="EPSG:32635").to_parquet(file_paths[-1])
+
+            for cell_size in (0.3, 1.0, 100.0):
+                overlaps = find_overlapping_patches_partitioned(file_paths, cell_size=cell_size, files_per_chunk=2, path_tmp_dir=tmp_dir)
+                self.assertEqual(list(overlaps), [1, 2])
+
+    def test_partitioned_crs(self):
+        """
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Two patches of different UTM zones whose coordinates overlap
+            for patch_id, crs in [("patch_0", "EPSG:32633"), ("patch_1", "EPSG:32634")]:
+                gpd.GeoDataFrame({"DN": [211]}, geometry=[box(0, 0, 10, 10) if patch_id == "patch_0" else box(5, 5, 15, 15)], crs=crs).to_parquet(
+                    os.path.join(tmp_dir, f"{patch_id}_reference_map.parquet")
+                )
+
+            # The out-of-core mode gives the same result as the in-memory mode
+            outputs = []
+            for partition_size in (None, 100.0, 3.0):
+                stdout = io.StringIO()
+                with redirect_stdout(stdout):
+                    milestone01_task_1_5_2(partition_size=partition_size, path_source=tmp_dir)
+                outputs.append(stdout.getvalue())
+            self.assertEqual(outputs, ["geom-num-overlaps: 2\n"] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from task_1.patch_cache import PatchCache
+from task_1.raster_reader import iter_bands
+
+
+class TestPatchCache(unittest.TestCase):
+    """
+    """
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path_cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        self.paths = {}
+        self.bands = {}
+
+        # Three patches with one 120 x 120 uint16 band (28800 bytes) each
+        rng = np.random.default_rng(42)
+        for patch_id in ["tile_0_0", "tile_0_1", "tile_0_2"]:
+            path_patch = os.path.join(self.tmp_dir.name, "dataset", patch_id)
+            os.makedirs(path_patch)
+            data = rng.integers(10, 10000, size=(120, 120), dtype=np.uint16)
+            self.paths[patch_id] = os.path.join(path_patch, f"{patch_id}_B02.tif")
+            self.bands[patch_id] = data
+            with rasterio.open(
+                self.paths[patch_id], "w", driver="GTiff", width=120, height=120, count=1, dtype="uint16",
+                nodata=7, crs="EPSG:32635", transform=from_origin(0, 1200, 10, 10),
+            ) as dst:
+                dst.write(data, 1)
+
+    def tearDown(self) -> None:
+        """
+        This method is called after each test.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_lru(self):
+        """
+        """
+        cache = PatchCache(max_bytes=2 * 28800)
+        for patch_id in ["tile_0_0", "tile_0_1", "tile_0_0", "tile_0_2"]:
+            data, nodata = cache.read_band(patch_id, "B02", self.paths[patch_id])
+            np.testing.assert_array_equal(data, self.bands[patch_id])
+            self.assertEqual(nodata, 7)
+
+        # tile_0_1 was the least recently used patch when tile_0_2 was inserted
+        self.assertEqual(cache.stats(), {"hits": 1, "disk-hits": 0, "misses": 3, "evictions": 1, "patches": 2, "bytes": 2 * 28800})
+        self.assertIn("tile_0_0", cache)
+        self.assertNotIn("tile_0_1", cache)
+
+    def test_disk_tier(self):
+        """
+        """
+        cache = PatchCache(max_bytes=0, path_cache_dir=self.path_cache_dir)
+        cache.read_band("tile_0_0", "B02", self.paths["tile_0_0"])
+
+        # A new cache (e.g. of a later run) finds the band on disk
+        cache = PatchCache(max_bytes=10**6, path_cache_dir=self.path_cache_dir)
+        data, nodata = cache.read_band("tile_0_0", "B02", self.paths["tile_0_0"])
+        np.testing.assert_array_equal(data, self.bands["tile_0_0"])
+        self.assertEqual(nodata, 7)
+        self.assertEqual(cache.stats()["disk-hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 0)
+
+    def test_modified_file(self):
+        """
+        """
+        cache = PatchCache(path_cache_dir=self.path_cache_dir)
+        cache.read_band("tile_0_0", "B02", self.paths["tile_0_0"])
+
+        # Rewrite the band with other pixels and a later modification time
+        data = self.bands["tile_0_0"] + 1
+        with rasterio.open(self.paths["tile_0_0"], "r+") as dst:
+            dst.write(data, 1)
+        stat = os.stat(self.paths["tile_0_0"])
+        os.utime(self.paths["tile_0_0"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        # Neither the in-memory tier nor the on-disk tier (of a later run) serve the old pixels
+        np.testing.assert_array_equal(cache.read_band("tile_0_0", "B02", self.paths["tile_0_0"])[0], data)
+        cache = PatchCache(path_cache_dir=self.path_cache_dir)
+        np.testing.assert_array_equal(cache.read_band("tile_0_0", "B02", self.paths["tile_0_0"])[0], data)
+        self.assertEqual(cache.stats()["disk-hits"], 1)
+
+        # The files of the old pixels were replaced
+        self.assertEqual(len(os.listdir(os.path.join(self.path_cache_dir, "tile_0_0"))), 2)
+
+    def test_same_patch_id(self):
+        """
+        """
+        # A band with the same patch ID in another dataset is not served from the cache
+        cache = PatchCache(path_cache_dir=self.path_cache_dir)
+        cache.read_band("tile_0_0", "B02", self.paths["tile_0_0"])
+        data, _ = cache.read_band("tile_0_0", "B02", self.paths["tile_0_1"])
+        np.testing.assert_array_equal(data, self.bands["tile_0_1"])
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_disk_hits_budget(self):
+        """
+        """
+        cache = PatchCache(max_bytes=28800, path_cache_dir=self.path_cache_dir)
+        cache.read_band("tile_0_0", "B02", self.paths["tile_0_0"])
+        cache.read_band("tile_0_1", "B02", self.paths["tile_0_1"])
+
+        # Memory-mapped bands of the on-disk tier do not evict the decoded band of the in-memory tier
+        for _ in range(2):
+            cache.read_band("tile_0_0", "B02", self.paths["tile_0_0"])
+        self.assertEqual(cache.stats(), {"hits": 0, "disk-hits": 2, "misses": 2, "evictions": 1, "patches": 1, "bytes": 28800})
+        self.assertIn("tile_0_1", cache)
+
+    def test_iter_bands(self):
+        """
+        """
+        cache = PatchCache()
+        items = [(patch_id, "B02", path_tif) for patch_id, path_tif in self.paths.items()]
+        for _ in range(2):
+            for patch_id, band, data, nodata in iter_bands(items, num_threads=2, cache=cache):
+                np.testing.assert_array_equal(data, self.bands[patch_id])
+        self.assertEqual(cache.stats()["hits"], 3)
+        self.assertEqual(cache.stats()["misses"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
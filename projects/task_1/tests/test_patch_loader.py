@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from task_1.bands import BANDS, EXPECTED_RESOLUTIONS
+from task_1.patch_store import pack_patch_store
+from task_1.patch_loader import upsample_batch, PatchLoader
+from task_1.patch_cache import PatchCache
+
+
+class TestPatchLoader(unittest.TestCase):
+    """
+    """
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path_dataset = os.path.join(self.tmp_dir.name, "dataset")
+        self.path_store = os.path.join(self.tmp_dir.name, "store")
+        self.patch_ids = [f"S2A_MSIL2A_20170415T094029_N9999_R036_T35ULA_0_{idx}" for idx in range(5)]
+        self.bands = {}
+
+        rng = np.random.default_rng(42)
+        for patch_id in self.patch_ids:
+            path_patch = os.path.join(self.path_dataset, "S2A_MSIL2A_20170415T094029_N9999_R036_T35ULA", patch_id)
+            os.makedirs(path_patch)
+            for band, (height, width) in EXPECTED_RESOLUTIONS.items():
+                data = rng.integers(10, 10000, size=(height, width), dtype=np.uint16)
+                self.bands[(patch_id, band)] = data
+                with rasterio.open(
+                    os.path.join(path_patch, f"{patch_id}_{band}.tif"), "w", driver="GTiff",
+                    width=width, height=height, count=1, dtype="uint16", nodata=7,
+                    crs="EPSG:32635", transform=from_origin(0, 1200, 1200 / width, 1200 / height),
+                ) as dst:
+                    dst.write(data, 1)
+
+    def tearDown(self) -> None:
+        """
+        This method is called after each test.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_upsample(self):
+        """
+        """
+        data = np.arange(2 * 3 * 20 * 20, dtype=np.float32).reshape(2, 3, 20, 20)
+
+        # Nearest neighbor repeats each pixel
+        np.testing.assert_array_equal(upsample_batch(data, 120), data.repeat(6, axis=-2).repeat(6, axis=-1))
+
+        # Bilinear keeps constant bands and linear ramps (away from the clamped borders)
+        np.testing.assert_allclose(upsample_batch(np.full((1, 1, 60, 60), 5.0), 120, method="bilinear"), 5.0)
+        ramp = np.tile(np.arange(60, dtype=np.float32), (60, 1))
+        upsampled = upsample_batch(ramp, 120, method="bilinear")
+        np.testing.assert_allclose(upsampled[:, 1:-1], np.tile((np.arange(1, 119) + 0.5) / 2 - 0.5, (120, 1)), atol=1e-5)
+
+    def test_loader(self):
+        """
+        """
+        mean = np.arange(len(BANDS), dtype=np.float32) * 100
+        std = np.full(len(BANDS), 2.0, dtype=np.float32)
+        loader = PatchLoader(self.patch_ids, path_dataset=self.path_dataset, batch_size=2, mean=mean, std=std, num_workers=2)
+        self.assertEqual(len(loader), 3)
+
+        batches = list(loader)
+        self.assertEqual([len(patch_ids) for patch_ids, _ in batches], [2, 2, 1])
+        patch_ids, cube = batches[1]
+        self.assertEqual(cube.shape, (2, 12, 120, 120))
+        self.assertEqual(cube.dtype, np.float32)
+        for channel, band in enumerate(BANDS):
+            factor = 120 // EXPECTED_RESOLUTIONS[band][0]
+            expected = self.bands[(patch_ids[1], band)].repeat(factor, axis=0).repeat(factor, axis=1)
+            np.testing.assert_allclose(cube[1, channel], (expected - mean[channel]) / std[channel], rtol=1e-6)
+
+    def test_loader_store(self):
+        """
+        """
+        pack_patch_store(self.path_dataset, self.path_store)
+        for method in ("nearest", "bilinear"):
+            cubes_tif = [cube for _, cube in PatchLoader(self.patch_ids, path_dataset=self.path_dataset, batch_size=3, method=method)]
+            cubes_store = [cube for _, cube in PatchLoader(self.patch_ids, path_patch_store=self.path_store, batch_size=3, method=method)]
+            for cube_tif, cube_store in zip(cubes_tif, cubes_store):
+                np.testing.assert_array_equal(cube_tif, cube_store)
+
+    def test_loader_cache(self):
+        """
+        """
+        cache = PatchCache()
+        loader = PatchLoader(self.patch_ids, path_dataset=self.path_dataset, batch_size=2, cache=cache)
+        cubes_first = [cube for _, cube in loader]
+        cubes_second = [cube for _, cube in loader]
+        for cube_first, cube_second in zip(cubes_first, cubes_second):
+            np.testing.assert_array_equal(cube_first, cube_second)
+        self.assertEqual(cache.stats()["misses"], len(self.patch_ids) * len(BANDS))
+        self.assertEqual(cache.stats()["hits"], len(self.patch_ids) * len(BANDS))
+
+
+if __name__ == "__main__":
+    unittest.main()
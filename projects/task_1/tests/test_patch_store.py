@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from task_1.bands import EXPECTED_RESOLUTIONS
+from task_1.patch_store import pack_patch_store, PatchStore
+
+
+class TestPatchStore(unittest.TestCase):
+    """
+    """
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path_dataset = os.path.join(self.tmp_dir.name, "dataset")
+        self.path_store = os.path.join(self.tmp_dir.name, "store")
+        self.bands = {}
+
+        # Two patches, the second with a wrong-size band and NO_DATA pixels
+        rng = np.random.default_rng(42)
+        for patch_id in ["tile_0_0", "tile_0_1"]:
+            path_patch = os.path.join(self.path_dataset, "tile", patch_id)
+            os.makedirs(path_patch)
+            for band, (height, width) in EXPECTED_RESOLUTIONS.items():
+                if patch_id == "tile_0_1" and band == "B05":
+                    height, width = height + 1, width + 1
+                data = rng.integers(10, 10000, size=(height, width), dtype=np.uint16)
+                if patch_id == "tile_0_1" and band == "B02":
+                    data[0, 0] = 7
+                self.bands[(patch_id, band)] = data
+                with rasterio.open(
+                    os.path.join(path_patch, f"{patch_id}_{band}.tif"), "w", driver="GTiff",
+                    width=width, height=height, count=1, dtype="uint16", nodata=7,
+                    crs="EPSG:32635", transform=from_origin(0, 1200, 1200 / width, 1200 / height),
+                ) as dst:
+                    dst.write(data, 1)
+
+    def tearDown(self) -> None:
+        """
+        This method is called after each test.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_pack_and_read(self):
+        """
+        """
+        self.assertEqual(pack_patch_store(self.path_dataset, self.path_store), 2)
+        store = PatchStore(self.path_store)
+        self.assertIn("tile_0_1", store)
+        for (patch_id, band), data in self.bands.items():
+            np.testing.assert_array_equal(store.read_band(patch_id, band), data)
+            self.assertEqual(store.nodata(patch_id, band), 7)
+        self.assertEqual(len(store.read_patch("tile_0_0")), 12)
+
+    def test_validation(self):
+        """
+        """
+        pack_patch_store(self.path_dataset, self.path_store)
+        store = PatchStore(self.path_store)
+        np.testing.assert_array_equal(store.wrong_size(), [False, True])
+        np.testing.assert_array_equal(store.with_no_data(), [False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from task_1.raster_reader import iter_bands
+
+
+class TestRasterReader(unittest.TestCase):
+    """
+    """
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.items = []
+        self.bands = {}
+
+        rng = np.random.default_rng(42)
+        for idx in range(20):
+            patch_id = f"tile_0_{idx}"
+            path_tif = os.path.join(self.tmp_dir.name, f"{patch_id}_B02.tif")
+            data = rng.integers(10, 10000, size=(120, 120), dtype=np.uint16)
+            with rasterio.open(
+                path_tif, "w", driver="GTiff", width=120, height=120, count=1, dtype="uint16",
+                nodata=7, crs="EPSG:32635", transform=from_origin(0, 1200, 10, 10),
+            ) as dst:
+                dst.write(data, 1)
+            self.items.append((patch_id, "B02", path_tif))
+            self.bands[patch_id] = data
+
+    def tearDown(self) -> None:
+        """
+        This method is called after each test.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_ordered(self):
+        """
+        """
+        results = list(iter_bands(self.items, num_threads=4, prefetch=6))
+        self.assertEqual([patch_id for patch_id, _, _, _ in results], [patch_id for patch_id, _, _ in self.items])
+        for patch_id, band, data, nodata in results:
+            np.testing.assert_array_equal(data, self.bands[patch_id])
+            self.assertEqual(nodata, 7)
+
+    def test_unordered(self):
+        """
+        """
+        results = list(iter_bands(self.items, num_threads=4, prefetch=6, ordered=False))
+        self.assertEqual(sorted(patch_id for patch_id, _, _, _ in results), sorted(self.bands))
+
+    def test_backpressure(self):
+        """
+        """
+        num_pulled = []
+
+        def items():
+            for idx, item in enumerate(self.items):
+                num_pulled.append(idx)
+                yield item
+
+        # Only the prefetched items are pulled before the first band is consumed
+        for ordered in (True, False):
+            num_pulled.clear()
+            bands = iter_bands(items(), num_threads=2, prefetch=3, ordered=ordered)
+            next(bands)
+            self.assertLessEqual(len(num_pulled), 4)
+            bands.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from task_1.result_cache import ResultCache
+
+
+class TestResultCache(unittest.TestCase):
+    """
+    """
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path_cache_db = os.path.join(self.tmp_dir.name, "cache", "results.sqlite")
+        self.path_tif = os.path.join(self.tmp_dir.name, "patch_B02.tif")
+        with open(self.path_tif, "wb") as file:
+            file.write(b"band")
+
+    def tearDown(self) -> None:
+        """
+        This method is called after each test.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_put_get(self):
+        """
+        """
+        with ResultCache(self.path_cache_db) as cache:
+            self.assertIsNone(cache.get(self.path_tif))
+            cache.put(self.path_tif, {"height": 120, "width": 120, "has_no_data": None})
+            cache.put(self.path_tif, {"has_no_data": True, "count": 10, "mean": 1.5, "var": 2.0})
+
+        # Results are persisted and merged
+        with ResultCache(self.path_cache_db) as cache:
+            self.assertEqual(
+                cache.get(self.path_tif),
+                {"height": 120, "width": 120, "has_no_data": True, "count": 10, "mean": 1.5, "var": 2.0},
+            )
+
+    def test_modified_file(self):
+        """
+        """
+        with ResultCache(self.path_cache_db) as cache:
+            cache.put(self.path_tif, {"height": 120, "width": 120})
+            with open(self.path_tif, "ab") as file:
+                file.write(b"modified")
+            self.assertIsNone(cache.get(self.path_tif))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from task_1.retile import get_tile_windows, retile, retile_dataset
+
+
+class TestRetile(unittest.TestCase):
+    """
+    """
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path_tif = os.path.join(self.tmp_dir.name, "patch_B02.tif")
+        self.data = np.arange(7 * 5, dtype=np.uint16).reshape(7, 5) + 10
+        with rasterio.open(
+            self.path_tif, "w", driver="GTiff", width=5, height=7, count=1, dtype="uint16", nodata=7,
+            crs="EPSG:32635", transform=from_origin(500000, 6000000, 10, 10),
+        ) as dst:
+            dst.write(self.data, 1)
+
+    def tearDown(self) -> None:
+        """
+        This method is called after each test.
+        """
+        self.tmp_dir.cleanup()
+
+    def test_get_tile_windows(self):
+        """
+        """
+        shapes = {
+            edge: [(w.row_off, w.col_off, w.height, w.width) for w in get_tile_windows(7, 5, grid=(2, 2), edge=edge)]
+            for edge in ("pad", "drop", "shrink")
+        }
+        self.assertEqual(shapes["pad"], [(0, 0, 4, 3), (0, 3, 4, 3), (4, 0, 4, 3), (4, 3, 4, 3)])
+        self.assertEqual(shapes["drop"], [(0, 0, 3, 2), (0, 2, 3, 2), (3, 0, 3, 2), (3, 2, 3, 2)])
+        self.assertEqual(shapes["shrink"], [(0, 0, 4, 3), (0, 3, 4, 2), (4, 0, 3, 3), (4, 3, 3, 2)])
+        self.assertEqual(len(get_tile_windows(7, 5, tile_size=(2, 2), edge="drop")), 6)
+
+        # A grid with more rows/cols than the raster has pixels is rejected for every edge handling
+        for edge in ("pad", "drop", "shrink"):
+            with self.assertRaises(AssertionError):
+                get_tile_windows(3, 3, grid=(4, 4), edge=edge)
+            with self.assertRaises(AssertionError):
+                get_tile_windows(3, 5, grid=(2, 6), edge=edge)
+        self.assertEqual(len(get_tile_windows(3, 3, grid=(3, 3), edge="pad")), 9)
+
+    def test_retile_pad(self):
+        """
+        """
+        paths = retile(self.path_tif, os.path.join(self.tmp_dir.name, "tiles"), grid=(2, 2), edge="pad")
+        self.assertEqual([os.path.basename(path) for path in paths], [f"patch_B02_{suffix}.tif" for suffix in "ABCD"])
+        with rasterio.open(paths[3]) as dst:
+            tile = dst.read(1)
+            self.assertEqual(tile.shape, (4, 3))
+            np.testing.assert_array_equal(tile[:3, :2], self.data[4:, 3:])
+            self.assertTrue((tile[3, :] == 7).all() and (tile[:, 2] == 7).all())
+            self.assertEqual(dst.transform, from_origin(500030, 5999960, 10, 10))
+
+    def test_retile_many_tiles(self):
+        """
+        """
+        # More than 26 tiles get numeric suffixes, the origin tile is "_00.tif"
+        paths = retile(self.path_tif, os.path.join(self.tmp_dir.name, "tiles"), tile_size=(1, 1))
+        self.assertEqual(len(paths), 35)
+        self.assertEqual(os.path.basename(paths[0]), "patch_B02_00.tif")
+        with rasterio.open(paths[0]) as dst:
+            self.assertEqual(dst.transform, from_origin(500000, 6000000, 10, 10))
+        with rasterio.open(paths[-1]) as dst:
+            self.assertEqual(dst.read(1)[0, 0], self.data[6, 4])
+
+    def test_retile_dataset(self):
+        """
+        """
+        path_dataset = os.path.join(self.tmp_dir.name, "dataset", "tile", "patch")
+        path_output_dir = os.path.join(self.tmp_dir.name, "re-tiled")
+        os.makedirs(path_dataset)
+        os.replace(self.path_tif, os.path.join(path_dataset, "patch_B02.tif"))
+
+        self.assertEqual(retile_dataset(os.path.dirname(os.path.dirname(path_dataset)), path_output_dir, grid=(2, 2), edge="shrink", num_workers=2), 1)
+        path_tile = os.path.join(path_output_dir, "tile", "patch", "patch_B02_A.tif")
+        with rasterio.open(path_tile) as dst:
+            self.assertEqual(dst.compression.name, "deflate")
+            self.assertTrue(dst.profile["tiled"])
+            np.testing.assert_array_equal(dst.read(1), self.data[:4, :3])
+
+        # Existing tiles are skipped
+        mtime_ns = os.stat(path_tile).st_mtime_ns
+        retile_dataset(os.path.dirname(os.path.dirname(path_dataset)), path_output_dir, grid=(2, 2), edge="shrink")
+        self.assertEqual(os.stat(path_tile).st_mtime_ns, mtime_ns)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from task_1.metadata_catalog import clear_metadata_catalogs
+from task_1.milestone01_task_1_4 import milestone01_task_1_4_fused
+from task_1.milestone01_task_1_5 import milestone01_task_1_5_1
+from task_1.shard import get_shard, run_shard, merge_partials, reduce_shards
+from task_1.synthetic_dataset import generate_dataset
+
+
+class TestShard(unittest.TestCase):
+    """
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """
+        This method is called once before the tests, it generates a small dataset of several tiles.
+        """
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.expected = generate_dataset(
+            cls.tmp_dir.name, num_patches=40, patches_per_tile=8,
+            wrong_size_rate=0.1, no_data_rate=0.1, not_part_rate=0.1, stats_rate=0.5,
+        )
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """
+        This method is called once after the tests.
+        """
+        cls.tmp_dir.cleanup()
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        self.path_cwd = os.getcwd()
+        os.chdir(self.tmp_dir.name)
+        clear_metadata_catalogs()
+
+    def tearDown(self) -> None:
+        """
+        This method is called after each test.
+        """
+        os.chdir(self.path_cwd)
+        clear_metadata_catalogs()
+
+    def run_task(self, task, *args, **kwargs) -> str:
+        """
+        Run a task and return its output.
+        """
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            task(*args, **kwargs)
+        return stdout.getvalue()
+
+    def test_get_shard(self):
+        """
+        """
+        tile = "S2B_MSIL2A_20170808T094029_N9999_R036_T35ULA"
+        self.assertEqual(get_shard(tile, 4), get_shard(tile, 4))
+        self.assertTrue(all(0 <= get_shard(f"{tile}{idx}", 4) < 4 for idx in range(100)))
+        self.assertEqual(len({get_shard(f"{tile}{idx}", 4) for idx in range(100)}), 4)
+
+    def test_shard_and_reduce(self):
+        """
+        """
+        expected = self.run_task(milestone01_task_1_4_fused) + self.run_task(milestone01_task_1_5_1)
+
+        # The shards partition the patches and the reduced report equals the report of the tasks
+        path_partials = [os.path.join("partials", f"shard_{shard}.json") for shard in range(3)]
+        partials = [run_shard(shard, 3, path_partial) for shard, path_partial in enumerate(path_partials)]
+        self.assertEqual(sum(len(partial["label-counts"]) for partial in partials), self.expected["patches"])
+        self.assertEqual(sum(partial["wrong-size"] for partial in partials), self.expected["wrong-size"])
+        with open(path_partials[0]) as file:
+            self.assertEqual(json.load(file)["label-counts"], partials[0]["label-counts"])
+        self.assertEqual(self.run_task(reduce_shards, path_partials), expected)
+
+        # The partials can be reduced in any order and grouping
+        merged = merge_partials([merge_partials(partials[:2]), partials[2]])
+        self.assertEqual(merged["wrong-size"], self.expected["wrong-size"])
+        self.assertEqual(len(merged["label-counts"]), self.expected["patches"])
+        self.assertEqual(merged["shards"], [0, 1, 2])
+
+        # A shard must not be counted twice
+        with self.assertRaises(AssertionError):
+            merge_partials([partials[0], partials[0]])
+        with self.assertRaises(AssertionError):
+            run_shard(3, 3, path_partials[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
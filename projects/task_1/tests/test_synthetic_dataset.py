@@ -0,0 +1,112 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from task_1.benchmark import run_benchmarks
+from task_1.metadata_catalog import clear_metadata_catalogs
+from task_1.metrics import get_metrics, reset_metrics
+from task_1.milestone01_task_1_4 import milestone01_task_1_4_1, milestone01_task_1_4_fused, inspect_patch
+from task_1.milestone01_task_1_5 import milestone01_task_1_5_1, milestone01_task_1_5_2
+from task_1.synthetic_dataset import generate_dataset
+
+
+class TestSyntheticDataset(unittest.TestCase):
+    """
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """
+        This method is called once before the tests, it generates a small dataset with many errors.
+        """
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.expected = generate_dataset(
+            cls.tmp_dir.name, num_patches=40, patches_per_tile=16,
+            wrong_size_rate=0.1, no_data_rate=0.1, not_part_rate=0.1, overlap_rate=0.3,
+        )
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        """
+        This method is called once after the tests.
+        """
+        cls.tmp_dir.cleanup()
+
+    def setUp(self) -> None:
+        """
+        This method is called before each test.
+        """
+        self.path_cwd = os.getcwd()
+        os.chdir(self.tmp_dir.name)
+        clear_metadata_catalogs()
+
+    def tearDown(self) -> None:
+        """
+        This method is called after each test.
+        """
+        os.chdir(self.path_cwd)
+        clear_metadata_catalogs()
+
+    def run_task(self, task, **kwargs) -> dict:
+        """
+        Run a task and parse its "key: value" output.
+        """
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            task(**kwargs)
+        return dict(line.split(": ") for line in stdout.getvalue().splitlines())
+
+    def test_validation(self):
+        """
+        """
+        self.assertGreater(self.expected["wrong-size"], 0)
+        for task in (milestone01_task_1_4_1, milestone01_task_1_4_fused):
+            output = self.run_task(task)
+            for key in ["wrong-size", "with-no-data", "not-part-of-dataset"]:
+                self.assertEqual(int(output[key]), self.expected[key])
+
+    def test_no_data_early_exit(self):
+        """
+        """
+        # The bands after the first band with NO_DATA pixels are not decoded
+        num_skipped = 0
+        for dirpath, _, filenames in os.walk(self.tmp_dir.name):
+            tif_files = sorted(filename for filename in filenames if filename.endswith(".tif"))
+            has_no_data = [result["has_no_data"] for result in inspect_patch(dirpath, tif_files).values()]
+            if True in has_no_data:
+                self.assertTrue(all(value is None for value in has_no_data[has_no_data.index(True) + 1:]))
+                num_skipped += len(has_no_data) - has_no_data.index(True) - 1
+        self.assertGreater(num_skipped, 0)
+
+        # The bands not decoded are not opened again with the result cache, the second run opens no file
+        with tempfile.TemporaryDirectory() as path_cache_dir:
+            path_cache_db = os.path.join(path_cache_dir, "results.db")
+            for _ in range(2):
+                reset_metrics()
+                output = self.run_task(milestone01_task_1_4_1, path_cache_db=path_cache_db)
+                self.assertEqual(int(output["with-no-data"]), self.expected["with-no-data"])
+            self.assertNotIn("task_1_4_1.inspect", get_metrics())
+        reset_metrics()
+
+    def test_geometries(self):
+        """
+        """
+        self.assertGreater(self.expected["geom-num-overlaps"], 0)
+        output = self.run_task(milestone01_task_1_5_1)
+        self.assertEqual(output["geom-average-num-labels"], f"{round(self.expected['geom-average-num-labels'], 2):.2f}")
+        output = self.run_task(milestone01_task_1_5_2)
+        self.assertEqual(int(output["geom-num-overlaps"]), self.expected["geom-num-overlaps"])
+
+    def test_benchmark(self):
+        """
+        """
+        os.chdir(self.path_cwd)
+        results = run_benchmarks(scales=[12], tasks=["milestone01_task_1_3", "milestone01_task_1_5_2"])
+        self.assertEqual(list(results["task"]), ["milestone01_task_1_3", "milestone01_task_1_5_2"])
+        self.assertTrue((results["patches_per_second"] > 0).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
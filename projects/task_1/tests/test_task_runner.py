@@ -0,0 +1,77 @@
+import io
+import time
+import unittest
+from contextlib import redirect_stdout
+
+from task_1.task_runner import TaskRunner
+
+
+class TestTaskRunner(unittest.TestCase):
+    """
+    """
+
+    def test_output_order(self):
+        """
+        """
+        def task(text: str, delay: float) -> str:
+            time.sleep(delay)
+            print(text)
+            return text
+
+        # The first task finishes last, its output is still printed first
+        runner = TaskRunner(num_workers=3)
+        runner.add("a", task, kwargs={"text": "a", "delay": 0.2})
+        runner.add("b", task, kwargs={"text": "b", "delay": 0.0})
+        runner.add("c", task, kwargs={"text": "c", "delay": 0.1})
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            results = runner.run(print_timings=False)
+        self.assertEqual(stdout.getvalue(), "a\nb\nc\n")
+        self.assertEqual(results, {"a": "a", "b": "b", "c": "c"})
+        self.assertEqual(set(runner.timings), {"a", "b", "c"})
+        self.assertLess(runner.timings["b"]["wall"], runner.timings["a"]["wall"])
+        self.assertEqual(set(runner.timings["a"]), {"wall", "thread-cpu", "process-peak-rss"})
+
+    def test_inputs(self):
+        """
+        """
+        calls = []
+        shared = {}
+
+        def load() -> None:
+            calls.append("load")
+            shared["value"] = 42
+
+        def use(name: str) -> int:
+            calls.append(name)
+            return shared["value"]
+
+        # The shared input is loaded once, before the tasks using it
+        runner = TaskRunner(num_workers=2)
+        runner.add("load", load)
+        runner.add("first", use, inputs=["load"], kwargs={"name": "first"})
+        runner.add("second", use, inputs=["load"], kwargs={"name": "second"})
+        results = runner.run(print_timings=False)
+        self.assertEqual(calls[0], "load")
+        self.assertEqual(calls.count("load"), 1)
+        self.assertEqual((results["first"], results["second"]), (42, 42))
+
+        with self.assertRaises(AssertionError):
+            runner.add("third", use, inputs=["unknown"], kwargs={"name": "third"})
+
+    def test_error(self):
+        """
+        """
+        def fail() -> None:
+            raise ValueError("failed")
+
+        runner = TaskRunner(num_workers=2)
+        runner.add("fail", fail)
+        runner.add("after", print, inputs=["fail"])
+        with self.assertRaises(ValueError):
+            runner.run(print_timings=False)
+        self.assertNotIn("after", runner.timings)
+
+
+if __name__ == "__main__":
+    unittest.main()